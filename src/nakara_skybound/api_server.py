@@ -0,0 +1,481 @@
+"""Headless JSON API for the game, without Streamlit.
+
+Plain asyncio HTTP/1.1 with keep-alive and no dependencies beyond the
+game itself. Each session's requests go through its own actor queue, so
+they run one at a time in arrival order while different sessions run in
+parallel on a thread pool.
+
+    python -m nakara_skybound.api_server --port 8080
+
+    POST /sessions                 {"name": "...", "character_class": "sage"}
+    GET  /sessions/<id>
+    POST /sessions/<id>/decide     {"choice": "explore"}
+    POST /sessions/<id>/travel     {"era": "past"}
+    POST /sessions/<id>/loop
+    POST /sessions/<id>/save       {"name": "slot1"}
+    POST /sessions/<id>/load       {"name": "slot1"}
+    GET  /metrics                  Prometheus text (with NAKARA_TRACE=1)
+
+POST /sessions returns the session's id and token. Every /sessions/<id>
+route needs that token in an X-Session-Token header.
+
+Request bodies are limited to MAX_BODY_BYTES.
+
+Admin routes need an X-Admin-Token header matching NAKARA_ADMIN_TOKEN:
+
+    POST /admin/profile            {"session_id": "...", "turns": 5}
+    GET  /admin/profiles           recent profile captures
+    GET  /admin/usage?by=call_type&limit=10   top LLM spenders
+"""
+
+import argparse
+import asyncio
+import hmac
+import json
+import os
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from enum import Enum
+from http import HTTPStatus
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+from urllib.parse import parse_qsl
+
+from .game.character import CharacterClass, Item
+from .game.commands import (
+    CreateCharacter,
+    TakeAction,
+    TravelThroughTime,
+    TriggerLoop,
+)
+from .game.event_log import item_to_data
+from .game.game_engine import GameEngine, GameState
+from .game.persistent import PMap, PVector
+from .game.profiling import get_profiler
+from .game.save_system import SaveSystem
+from .game.session_store import (
+    SessionStore,
+    check_session_token,
+    get_session_store,
+    session_token,
+)
+from .game.time_system import TimeEra
+from .game.tracing import get_tracer
+from .game.usage import DIMENSIONS, get_usage_ledger
+
+SAVE_NAME = re.compile(r"^[\w-]{1,64}$")
+MAX_BODY_BYTES = 64 * 1024
+
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(value):
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Item):
+        return item_to_data(value)
+    if isinstance(value, PMap):
+        return dict(value)
+    if isinstance(value, PVector):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def state_to_dict(state: GameState) -> Dict[str, Any]:
+    player = state.player
+    return {
+        "player": {
+            "name": player.name,
+            "character_class": player.character_class.value,
+            "stats": player.stats.as_dict(),
+            "inventory": [item.name for item in player.inventory],
+        },
+        "era": state.current_era.value,
+        "location": state.current_location,
+        "scene": state.current_scene,
+        "day": state.current_day,
+        "loop": state.loop_count,
+        "time_fragments": state.time_fragments,
+        "active_quests": list(state.active_quests),
+        "completed_quests": list(state.completed_quests),
+        "decisions": len(state.decisions_made),
+    }
+
+
+class SessionActor:
+    """Runs one session's requests one at a time, in arrival order.
+
+    Exits after `idle_timeout` seconds without work; the server starts a
+    new one on the session's next request.
+    """
+
+    def __init__(self, server: "GameAPIServer", session_id: str):
+        self.server = server
+        self.session_id = session_id
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, operation: Callable[[GameEngine], Any]) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((operation, future))
+        return future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            try:
+                operation, future = await asyncio.wait_for(
+                    self.queue.get(), self.server.idle_timeout
+                )
+            except asyncio.TimeoutError:
+                # Nothing can be queued between this check and the removal,
+                # since both happen without yielding to the event loop
+                if self.queue.empty():
+                    self.server.actors.pop(self.session_id, None)
+                    return
+                continue
+
+            try:
+                result = await loop.run_in_executor(
+                    self.server.executor, self.server.run, self.session_id, operation
+                )
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+
+class GameAPIServer:
+    def __init__(
+        self,
+        store: SessionStore,
+        save_system: SaveSystem,
+        max_workers: int = 8,
+        idle_timeout: float = 300.0,
+        admin_token: Optional[str] = None,
+    ):
+        self.store = store
+        self.save_system = save_system
+        self.admin_token = admin_token
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="api"
+        )
+        self.idle_timeout = idle_timeout
+        self.actors: Dict[str, SessionActor] = {}
+        self.routes: Dict[Tuple[str, str], Callable] = {
+            ("GET", ""): self.get_state,
+            ("POST", "decide"): self.decide,
+            ("POST", "travel"): self.travel,
+            ("POST", "loop"): self.loop,
+            ("POST", "save"): self.save,
+            ("POST", "load"): self.load,
+        }
+
+    def run(self, session_id: str, operation: Callable[[GameEngine], Any]):
+        """Run an operation against a session's engine (on a worker thread)"""
+        with self.store.session(session_id) as game_engine, self.store.lock(session_id):
+            return operation(game_engine)
+
+    async def call(self, session_id: str, operation: Callable[[GameEngine], Any]):
+        actor = self.actors.get(session_id)
+        if actor is None:
+            actor = self.actors[session_id] = SessionActor(self, session_id)
+        return await actor.submit(operation)
+
+    # Operations
+
+    async def create_session(self, body: Dict[str, Any]) -> Dict[str, Any]:
+        if "name" in body:
+            if not isinstance(body["name"], str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "name must be a string")
+            try:
+                CharacterClass(body.get("character_class", "sage"))
+            except ValueError:
+                raise HTTPError(
+                    HTTPStatus.BAD_REQUEST,
+                    "character_class must be sage, warrior or mystic",
+                )
+        session_id = uuid.uuid4().hex
+
+        def create(game_engine: GameEngine):
+            if "name" in body:
+                game_engine.execute(
+                    [CreateCharacter(body["name"], body.get("character_class", "sage"))]
+                )
+            return state_to_dict(game_engine.state)
+
+        state = await self.call(session_id, create)
+        return {
+            "session_id": session_id,
+            "token": session_token(session_id),
+            "state": state,
+        }
+
+    async def get_state(self, session_id: str, body: Dict[str, Any]):
+        return {"state": await self.call(session_id, lambda e: state_to_dict(e.state))}
+
+    async def _execute(self, session_id: str, command) -> Dict[str, Any]:
+        def execute(game_engine: GameEngine):
+            outcome = game_engine.execute([command])[0]
+            return {
+                "success": outcome.success,
+                "result": outcome.result,
+                "state": state_to_dict(game_engine.state),
+            }
+
+        return await self.call(session_id, execute)
+
+    async def decide(self, session_id: str, body: Dict[str, Any]):
+        if not isinstance(body.get("choice"), str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "choice must be a string")
+        if not isinstance(body.get("decision_id", ""), str):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "decision_id must be a string")
+        command = TakeAction(
+            body["choice"], decision_id=body.get("decision_id", "general_action")
+        )
+        return await self._execute(session_id, command)
+
+    async def travel(self, session_id: str, body: Dict[str, Any]):
+        try:
+            era = TimeEra(body.get("era"))
+        except ValueError:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, "era must be past, present or future"
+            )
+        return await self._execute(session_id, TravelThroughTime(era))
+
+    async def loop(self, session_id: str, body: Dict[str, Any]):
+        return await self._execute(session_id, TriggerLoop())
+
+    def _save_name(self, body: Dict[str, Any]) -> str:
+        name = body.get("name", "")
+        if not SAVE_NAME.match(name):
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, "name must be 1-64 letters, digits, _ or -"
+            )
+        return name
+
+    async def save(self, session_id: str, body: Dict[str, Any]):
+        name = self._save_name(body)
+        saved = await self.call(
+            session_id, lambda e: self.save_system.save_game(e.state, name)
+        )
+        if not saved:
+            raise HTTPError(HTTPStatus.INTERNAL_SERVER_ERROR, "save failed")
+        return {"saved": name}
+
+    async def load(self, session_id: str, body: Dict[str, Any]):
+        name = self._save_name(body)
+
+        def load(game_engine: GameEngine):
+            state = self.save_system.load_game(name)
+            if state is None:
+                return None
+            game_engine.load_state(state)
+            return state_to_dict(state)
+
+        state = await self.call(session_id, load)
+        if state is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"no save named {name}")
+        return {"state": state}
+
+    # Admin
+
+    def admin(self, method: str, action: str, body: Dict[str, Any]):
+        profiler = get_profiler()
+        if (method, action) == ("POST", "profile"):
+            if not isinstance(body.get("session_id"), str):
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "session_id is required")
+            turns = body.get("turns", 5)
+            if not isinstance(turns, int) or turns < 1:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "turns must be positive")
+            profiler.arm(body["session_id"], turns)
+            return {"armed": body["session_id"], "turns": turns}
+        if (method, action) == ("GET", "profiles"):
+            return {"captures": [asdict(capture) for capture in profiler.recent()]}
+        if (method, action) == ("GET", "usage"):
+            by = body.get("by", "session_id")
+            if by not in DIMENSIONS:
+                raise HTTPError(
+                    HTTPStatus.BAD_REQUEST, f"by must be one of {DIMENSIONS}"
+                )
+            try:
+                limit = int(body.get("limit", 10))
+            except ValueError:
+                raise HTTPError(HTTPStatus.BAD_REQUEST, "limit must be a number")
+            return {"by": by, "top": get_usage_ledger().top_spenders(by, limit)}
+        raise HTTPError(HTTPStatus.NOT_FOUND, "not found")
+
+    # HTTP
+
+    async def dispatch(
+        self, method: str, path: str, headers: Dict[str, str], body: bytes
+    ):
+        try:
+            data = json.loads(body) if body else {}
+        except ValueError:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be JSON")
+        if not isinstance(data, dict):
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "body must be a JSON object")
+
+        path, _, query = path.partition("?")
+        parts = path.strip("/").split("/")
+        if parts == ["metrics"] and method == "GET":
+            return HTTPStatus.OK, get_tracer().render_prometheus()
+        if parts[0] == "admin" and len(parts) == 2 and self.admin_token:
+            token = headers.get("x-admin-token", "")
+            if not hmac.compare_digest(token, self.admin_token):
+                raise HTTPError(HTTPStatus.FORBIDDEN, "bad admin token")
+            data = {**dict(parse_qsl(query)), **data}
+            return HTTPStatus.OK, self.admin(method, parts[1], data)
+        if parts[0] != "sessions" or len(parts) > 3:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "not found")
+        if len(parts) == 1:
+            if method != "POST":
+                raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED, "use POST")
+            return HTTPStatus.CREATED, await self.create_session(data)
+
+        session_id = parts[1]
+        handler = self.routes.get((method, parts[2] if len(parts) == 3 else ""))
+        if handler is None:
+            raise HTTPError(HTTPStatus.NOT_FOUND, "not found")
+        # Without it any id would do, and an unknown one would be created
+        if not check_session_token(session_id, headers.get("x-session-token")):
+            raise HTTPError(HTTPStatus.FORBIDDEN, "bad session token")
+        return HTTPStatus.OK, await handler(session_id, data)
+
+    async def handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, path, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    self._respond(
+                        writer,
+                        HTTPStatus.BAD_REQUEST,
+                        {"error": "malformed request line"},
+                        keep_alive=False,
+                    )
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                if length > MAX_BODY_BYTES:
+                    status = HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+                    error = f"body is larger than {MAX_BODY_BYTES} bytes"
+                elif length < 0:
+                    status, error = HTTPStatus.BAD_REQUEST, "bad content-length"
+                else:
+                    error = None
+                if error:
+                    # The body is left unread, so the connection cannot go on
+                    self._respond(writer, status, {"error": error}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (
+                    version == "HTTP/1.1" or connection == "keep-alive"
+                )
+
+                try:
+                    status, payload = await self.dispatch(method, path, headers, body)
+                except HTTPError as e:
+                    status, payload = e.status, {"error": e.message}
+                except Exception as e:
+                    print(f"Error handling {method} {path}: {e}")
+                    status = HTTPStatus.INTERNAL_SERVER_ERROR
+                    payload = {"error": str(e)}
+
+                self._respond(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # Client went away or sent something that is not HTTP
+            pass
+        finally:
+            writer.close()
+
+    def _respond(
+        self,
+        writer: asyncio.StreamWriter,
+        status: HTTPStatus,
+        payload: Union[Dict[str, Any], str],
+        keep_alive: bool,
+    ):
+        if isinstance(payload, str):
+            content_type = "text/plain; version=0.0.4"
+            data = payload.encode()
+        else:
+            content_type = "application/json"
+            data = json.dumps(
+                payload, ensure_ascii=False, default=_json_default
+            ).encode()
+        writer.write(
+            f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+            f"Content-Type: {content_type}; charset=utf-8\r\n"
+            f"Content-Length: {len(data)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+            "\r\n".encode("latin-1") + data
+        )
+
+    async def serve(self, host: str, port: int) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve_forever(args: argparse.Namespace):
+    server = GameAPIServer(
+        get_session_store(),
+        SaveSystem(args.saves),
+        max_workers=args.workers,
+        admin_token=os.getenv("NAKARA_ADMIN_TOKEN"),
+    )
+    listener = await server.serve(args.host, args.port)
+    print(f"Serving the game API on http://{args.host}:{args.port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=int(os.getenv("NAKARA_TURN_WORKERS", "8")),
+        help="threads running game operations",
+    )
+    parser.add_argument("--saves", default="saves", help="save game directory")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve_forever(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
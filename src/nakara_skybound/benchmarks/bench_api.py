@@ -0,0 +1,129 @@
+"""Load test of the headless JSON API over keep-alive connections.
+
+Starts the server in-process on an ephemeral port and drives it with one
+keep-alive client connection per session, each playing the same mix of
+decisions, a save and a load. Runs without an API key, so narratives come
+from the fallback tier (variant pool, then the built-in responses).
+
+python -m nakara_skybound.benchmarks.bench_api
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List, Tuple
+
+from ..api_server import GameAPIServer
+from ..game.save_system import SaveSystem
+from ..game.session_store import DirectorySnapshots, SessionStore
+
+CHOICES = ["explore", "meditate", "talk", "study"]
+
+
+class Client:
+    """One keep-alive HTTP/1.1 connection"""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port: int) -> "Client":
+        return cls(*await asyncio.open_connection("127.0.0.1", port))
+
+    async def request(
+        self, method: str, path: str, body: Dict[str, Any] = None, token: str = ""
+    ) -> Tuple[int, Dict[str, Any]]:
+        data = json.dumps(body or {}).encode()
+        self.writer.write(
+            f"{method} {path} HTTP/1.1\r\nHost: localhost\r\n"
+            f"X-Session-Token: {token}\r\n"
+            f"Content-Length: {len(data)}\r\n\r\n".encode() + data
+        )
+        await self.writer.drain()
+
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode().partition(":")
+            if name.lower() == "content-length":
+                length = int(value)
+        return status, json.loads(await self.reader.readexactly(length))
+
+    def close(self):
+        self.writer.close()
+
+
+async def play(port: int, index: int, turns: int, latencies: List[float]):
+    client = await Client.connect(port)
+
+    token = ""
+
+    async def timed(method, path, body=None):
+        started = time.perf_counter()
+        status, payload = await client.request(method, path, body, token)
+        latencies.append(time.perf_counter() - started)
+        assert status in (200, 201), (status, payload)
+        return payload
+
+    created = await timed("POST", "/sessions", {"name": f"ผู้เล่น{index}"})
+    session, token = f"/sessions/{created['session_id']}", created["token"]
+    for turn in range(turns):
+        await timed("POST", f"{session}/decide", {"choice": CHOICES[turn % 4]})
+    await timed("POST", f"{session}/save", {"name": f"bench-{index}"})
+    loaded = await timed("POST", f"{session}/load", {"name": f"bench-{index}"})
+    assert loaded["state"]["decisions"] == turns
+    client.close()
+
+
+async def run(sessions: int, turns: int, workers: int, directory: str):
+    store = SessionStore(DirectorySnapshots(os.path.join(directory, "sessions")))
+    server = GameAPIServer(
+        store, SaveSystem(os.path.join(directory, "saves")), max_workers=workers
+    )
+    listener = await server.serve("127.0.0.1", 0)
+    port = listener.sockets[0].getsockname()[1]
+
+    latencies: List[float] = []
+    started = time.perf_counter()
+    await asyncio.gather(*(play(port, i, turns, latencies) for i in range(sessions)))
+    elapsed = time.perf_counter() - started
+
+    listener.close()
+    await listener.wait_closed()
+    server.executor.shutdown()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": len(latencies) / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99)] * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=8)
+    args = parser.parse_args()
+
+    os.environ.pop("OPENAI_API_KEY", None)
+    with tempfile.TemporaryDirectory() as directory:
+        result = asyncio.run(run(args.sessions, args.turns, args.workers, directory))
+    print(
+        f"{result['requests']} requests over {args.sessions} connections: "
+        f"{result['requests_per_second']:.0f} req/s, "
+        f"p50 {result['p50_ms']:.1f} ms, p99 {result['p99_ms']:.1f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""Microbenchmark: slotted, array-backed characters vs the dict-based ones.
+
+python -m nakara_skybound.benchmarks.bench_characters
+"""
+
+import argparse
+import itertools
+import random
+import timeit
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, List
+
+from ..game.character import NPC, STAT_NAMES, Player, Stats
+from ..game.relations import RelationStore
+
+
+@dataclass
+class LegacyStats:
+    wisdom: int = 10
+    strength: int = 10
+    karma: int = 0
+    mysticism: int = 10
+    charisma: int = 10
+
+
+@dataclass
+class LegacyNPCMemory:
+    player_actions: List[Dict[str, Any]] = field(default_factory=list)
+    relationship_level: int = 0
+    trust_level: int = 0
+    last_interaction_loop: int = -1
+    secrets_revealed: List[str] = field(default_factory=list)
+
+
+class LegacyPlayer:
+    def __init__(self):
+        self.name = "ผู้เดินทาง"
+        self.character_class = None
+        self.stats = LegacyStats()
+        self.level = 1
+        self.experience = 0
+        self.time_fragments = 0
+        self.inventory = []
+        self.learned_spells = []
+        self.memory_fragments = []
+
+    def modify_stat(self, stat_name: str, value: int):
+        if hasattr(self.stats, stat_name):
+            current_value = getattr(self.stats, stat_name)
+            setattr(self.stats, stat_name, current_value + value)
+
+
+class LegacyNPC:
+    def __init__(self, id: str, name: str, role: str, location: str):
+        self.id = id
+        self.name = name
+        self.role = role
+        self.location = location
+        self.stats = LegacyStats()
+        self.personality_traits = []
+        self.dialogue_states = {}
+        self.memory = LegacyNPCMemory()
+        self.available_quests = []
+        self.special_abilities = []
+
+
+def _bytes_per_object(factory: Callable[[], Any], count: int) -> float:
+    tracemalloc.start()
+    objects = [factory() for _ in range(count)]
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del objects
+    return retained / count
+
+
+def _consequence_batches(count: int, seed: int = 7) -> List[List[Dict[str, Any]]]:
+    rng = random.Random(seed)
+    return [
+        [
+            {"type": "stat_change", "stat": rng.choice(STAT_NAMES), "value": 1}
+            for _ in range(rng.randint(1, 4))
+        ]
+        for _ in range(count)
+    ]
+
+
+def _apply_per_stat(player, batches):
+    for batch in batches:
+        for consequence in batch:
+            player.modify_stat(consequence["stat"], consequence["value"])
+
+
+def _apply_batched(player, batches):
+    # What GameEngine._apply_consequences does: one batched update per turn
+    for batch in batches:
+        changes: Dict[str, int] = {}
+        for consequence in batch:
+            stat = consequence["stat"]
+            changes[stat] = changes.get(stat, 0) + consequence["value"]
+        player.modify_stats(changes)
+
+
+def run(objects: int, turns: int) -> Dict[str, Any]:
+    store, ids = RelationStore(), itertools.count()
+    memory = {
+        "player": {
+            "legacy": _bytes_per_object(LegacyPlayer, objects),
+            "slotted": _bytes_per_object(Player, objects),
+        },
+        "npc": {
+            "legacy": _bytes_per_object(
+                lambda: LegacyNPC("npc", "ชื่อ", "role", "central_plaza"), objects
+            ),
+            # Sharing one relation store (one row each), as World creates them
+            "slotted": _bytes_per_object(
+                lambda: NPC(
+                    f"npc_{next(ids)}", "ชื่อ", "role", "central_plaza", relations=store
+                ),
+                objects,
+            ),
+        },
+    }
+
+    batches = _consequence_batches(turns)
+    applications = sum(len(batch) for batch in batches)
+    throughput = {}
+    for name, player_cls, fn in [
+        ("legacy", LegacyPlayer, _apply_per_stat),
+        ("slotted", Player, _apply_per_stat),
+        ("slotted_batched", Player, _apply_batched),
+    ]:
+        player = player_cls()
+        seconds = min(timeit.repeat(lambda: fn(player, batches), number=1, repeat=5))
+        throughput[name] = applications / seconds
+
+    # Same final stats whichever path applied them
+    expected = LegacyPlayer()
+    _apply_per_stat(expected, batches)
+    actual = Player()
+    actual.stats = Stats()
+    _apply_batched(actual, batches)
+    assert actual.stats.as_dict() == asdict(expected.stats)
+
+    return {"bytes_per_object": memory, "consequences_per_second": throughput}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--objects", type=int, default=10000)
+    parser.add_argument("--turns", type=int, default=100000)
+    args = parser.parse_args()
+
+    results = run(args.objects, args.turns)
+    for kind, sizes in results["bytes_per_object"].items():
+        print(
+            f"{kind:>7}: {sizes['legacy']:6.0f} -> {sizes['slotted']:6.0f} bytes/object"
+        )
+    for name, rate in results["consequences_per_second"].items():
+        print(f"{name:>16}: {rate / 1e6:5.2f} M consequences/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Throughput of N worker processes sharing a SQLite session store.
+
+Every worker joins the same hash ring, plays the turns of the sessions it
+owns with write-through saves, and the total turns/s is compared across
+worker counts. Afterwards one worker leaves and another must pick up its
+sessions from the database with every turn intact.
+
+python -m nakara_skybound.benchmarks.bench_cluster
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import Any, Dict, List
+
+from ..game.cluster import ClusterWorker, WorkerRegistry
+from ..game.session_store import SessionStore, SQLiteSnapshots
+
+
+def _worker(
+    index: int, workers: int, db_path: str, sessions: int, turns: int, barrier, results
+):
+    os.environ["NAKARA_LLM_BACKEND"] = "stub"
+    worker_id = f"worker-{index}"
+    store = SessionStore(SQLiteSnapshots(db_path, owner=worker_id), write_through=True)
+    worker = ClusterWorker(worker_id, f"local:{index}", db_path, store, ttl=60)
+
+    # Wait until everyone has heartbeated so all rings agree
+    barrier.wait()
+    worker.refresh()
+    assert len(worker.ring.nodes) == workers
+
+    owned = [f"session-{i}" for i in range(sessions) if worker.is_owner(f"session-{i}")]
+    started = time.perf_counter()
+    for _ in range(turns):
+        for session_id in owned:
+            with store.session(session_id) as engine:
+                engine.make_decision("general_action", "explore")
+    results[index] = (len(owned) * turns, time.perf_counter() - started)
+
+
+def run_workers(
+    workers: int, sessions: int, turns: int, db_path: str
+) -> Dict[str, Any]:
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(workers)
+    results = context.Manager().dict()
+    processes = [
+        context.Process(
+            target=_worker,
+            args=(i, workers, db_path, sessions, turns, barrier, results),
+        )
+        for i in range(workers)
+    ]
+    started = time.perf_counter()
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    wall = time.perf_counter() - started
+
+    played = sum(count for count, _ in results.values())
+    slowest = max(seconds for _, seconds in results.values())
+    return {
+        "workers": workers,
+        "turns": played,
+        "turns_per_second": played / slowest,
+        "wall_seconds": wall,
+    }
+
+
+def check_handoff(db_path: str, sessions: int, turns: int):
+    """worker-1 takes over worker-0's sessions once worker-0 leaves"""
+    registry = WorkerRegistry(db_path)
+    registry.remove("worker-0")
+    store = SessionStore(SQLiteSnapshots(db_path, owner="worker-1"), write_through=True)
+    survivor = ClusterWorker("worker-1", "local:1", db_path, store, ttl=60)
+    for i in range(sessions):
+        session_id = f"session-{i}"
+        if survivor.is_owner(session_id):
+            with store.session(session_id) as engine:
+                assert len(engine.state.decisions_made) == turns, session_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=64)
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    counts: List[int] = sorted({1, 2, 4, args.max_workers} - {0})
+    baseline = None
+    for workers in counts:
+        with tempfile.TemporaryDirectory() as directory:
+            db_path = os.path.join(directory, "sessions.db")
+            result = run_workers(workers, args.sessions, args.turns, db_path)
+            if workers >= 2:
+                check_handoff(db_path, args.sessions, args.turns)
+
+        baseline = baseline or result["turns_per_second"]
+        print(
+            f"{workers:>2} workers: {result['turns_per_second']:8.0f} turns/s "
+            f"({result['turns_per_second'] / baseline:.2f}x)"
+        )
+    print(f"{os.cpu_count()} CPUs available")
+
+
+if __name__ == "__main__":
+    main()
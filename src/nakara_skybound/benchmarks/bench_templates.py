@@ -0,0 +1,256 @@
+"""Microbenchmark: compiled template index vs per-call dict rebuilding.
+
+python -m nakara_skybound.benchmarks.bench_templates
+"""
+
+import argparse
+import timeit
+import tracemalloc
+from typing import Any, Dict, List, Tuple
+
+from ..game.character import Player
+from ..game.game_engine import GameState
+from ..game.narrative_templates import render_basic_action
+from ..game.time_system import TimeEra
+
+# (location, era, action) mix covering every table, plus misses
+CASES: List[Tuple[str, TimeEra, str]] = [
+    ("central_plaza", TimeEra.PRESENT, "explore"),
+    ("central_plaza", TimeEra.PAST, "explore"),
+    ("market", TimeEra.FUTURE, "explore"),
+    ("palace", TimeEra.PRESENT, "explore_throne_room"),
+    ("palace", TimeEra.PAST, "investigate_secrets"),
+    ("library", TimeEra.PRESENT, "research"),
+    ("library", TimeEra.FUTURE, "consult_librarian"),
+    ("temple", TimeEra.PRESENT, "pray"),
+]
+
+
+def legacy_basic_action(action: str, game_state) -> Dict[str, Any]:
+    """Pre-compilation _handle_basic_action, rebuilding its tables per call"""
+
+    # Location-specific actions
+    location_actions = _legacy_location_actions(action, game_state)
+    if location_actions:
+        return location_actions
+
+    # Era-specific content
+    era_specific_content = {
+        TimeEra.PAST: {
+            "explore": {
+                "narrative": f"{game_state.player.name} สำรวจรอบๆ เมืองโบราณ... ผู้คนสวมชุดไทยประจำชาติ เสียงระฆังวัดดังไกล คุณเห็นนักเวทย์กำลังร่ายมนตร์อยู่ริมถนน และได้เรียนรู้เกี่ยวกับเวทมนตร์โบราณ วันหนึ่งผ่านไปอย่างมีความหมาย",
+                "consequences": [
+                    {"type": "stat_change", "stat": "wisdom", "value": 2},
+                    {"type": "stat_change", "stat": "mysticism", "value": 1},
+                    {"type": "day_advance", "amount": 1},
+                    {"type": "time_fragment", "amount": 1},
+                ],
+            }
+        },
+        TimeEra.FUTURE: {
+            "explore": {
+                "narrative": f"{game_state.player.name} สำรวจโลกอนาคต... เทคโนโลยีและเวทมนตร์ผสมผสานกัน คุณเห็นผลลัพธ์ของการกระทำในอดีต {'เมืองเจริญรุ่งเรืองเต็มไปด้วยความสุข' if game_state.player.stats.karma > 0 else 'เมืองร้างเปล่าและเต็มไปด้วยความเศร้า'} การสำรวจทำให้คุณเข้าใจถึงผลของกรรม",
+                "consequences": [
+                    {"type": "stat_change", "stat": "wisdom", "value": 3},
+                    {
+                        "type": "stat_change",
+                        "stat": "karma",
+                        "value": 1 if game_state.player.stats.karma > 0 else -1,
+                    },
+                    {"type": "day_advance", "amount": 1},
+                ],
+            }
+        },
+    }
+
+    # Get era-specific content or fall back to present
+    current_era_content = era_specific_content.get(game_state.current_era, {})
+    if action in current_era_content:
+        return current_era_content[action]
+
+    # Default present-day actions with loop awareness
+    loop_modifier = (
+        ""
+        if game_state.loop_count == 0
+        else f" (รอบที่ {game_state.loop_count + 1}: คุณรู้สึกคุ้นเคยกับสถานที่นี้)"
+    )
+
+    action_responses = {
+        "explore": {
+            "narrative": f"{game_state.player.name} เดินสำรวจรอบๆ จัตุรัสกลางเมือง{loop_modifier}... ผู้คนต่างมองมาด้วยสายตาแปลกๆ บางคนเหมือนจะจำคุณได้ คุณพบร่องรอยเวทมนตร์โบราณ และได้พบกับนักเดินทางคนอื่นๆ วันหนึ่งผ่านไปอย่างมีความหมาย",
+            "consequences": [
+                {"type": "stat_change", "stat": "wisdom", "value": 1},
+                {"type": "day_advance", "amount": 1},
+                {
+                    "type": "item_gain",
+                    "item": {
+                        "id": "clue1",
+                        "name": "เบาะแสลึกลับ",
+                        "description": "ข้อมูลที่อาจมีประโยชน์",
+                        "type": "information",
+                        "power": 0,
+                        "magical_properties": {},
+                    },
+                },
+            ],
+            "next_options": [
+                {"id": "continue_explore", "text": "สำรวจลึกขึ้น"},
+                {"id": "talk_to_people", "text": "เข้าไปคุยกับใครสักคน"},
+                {"id": "meditate", "text": "นั่งสมาธิเพื่อใคร่ครวญ"},
+            ],
+        },
+    }
+
+    return action_responses.get(action)
+
+
+def _legacy_location_actions(action: str, game_state) -> Dict[str, Any]:
+    """Handle location-specific actions"""
+    location = game_state.current_location
+
+    # Palace actions
+    if location == "palace":
+        palace_actions = {
+            "explore_throne_room": {
+                "narrative": f"{game_state.player.name} เข้าไปในห้องบัลลังก์... บัลลังก์ทองคำเก่าแก่ปรากฏอยู่ตรงหน้า คุณรู้สึกถึงพลังลึกลับที่แฝงอยู่ ภาพนิมิตของกษัตริย์ในอดีตปรากฏขึ้นในจิตใจ",
+                "consequences": [
+                    {"type": "stat_change", "stat": "mysticism", "value": 2},
+                    {"type": "stat_change", "stat": "wisdom", "value": 1},
+                    {"type": "day_advance", "amount": 1},
+                    {"type": "quest_start", "quest_name": "ความลับของบัลลังก์"},
+                ],
+            },
+            "investigate_secrets": {
+                "narrative": f"{game_state.player.name} ค้นหาความลับในพระราชวัง... คุณพบห้องลับที่เต็มไปด้วยเอกสารโบราณ ความจริงเกี่ยวกับวัฏจักรเวลาเริ่มเผยออกมา",
+                "consequences": [
+                    {"type": "stat_change", "stat": "wisdom", "value": 3},
+                    {"type": "time_fragment", "amount": 2},
+                    {"type": "day_advance", "amount": 1},
+                ],
+            },
+        }
+        if action in palace_actions:
+            return palace_actions[action]
+
+    # Library actions
+    elif location == "library":
+        library_actions = {
+            "research": {
+                "narrative": f"{game_state.player.name} ใช้เวลาค้นคว้าในหอสมุด... คุณพบตำราโบราณที่บันทึกเรื่องการเดินทางข้ามเวลา ความรู้ใหม่ๆ เข้ามาในหัว",
+                "consequences": [
+                    {"type": "stat_change", "stat": "wisdom", "value": 2},
+                    {"type": "stat_change", "stat": "mysticism", "value": 1},
+                    {"type": "time_fragment", "amount": 1},
+                    {"type": "day_advance", "amount": 1},
+                ],
+            },
+            "read_books": {
+                "narrative": f"{game_state.player.name} อ่านหนังสือในหอสมุด... เรื่องราวของอดีตและอนาคตปรากฏในหน้ากระดาษ คุณเข้าใจถึงรูปแบบของวัฏจักรเวลามากขึ้น",
+                "consequences": [
+                    {"type": "stat_change", "stat": "wisdom", "value": 1},
+                    {"type": "stat_change", "stat": "mysticism", "value": 1},
+                ],
+            },
+            "consult_librarian": {
+                "narrative": f"{game_state.player.name} ปรึกษาบรรณารักษ์... เขาให้ข้อมูลที่มีค่าเกี่ยวกับการควบคุมเวลา และมอบหนังสือลับให้คุณ",
+                "consequences": [
+                    {"type": "stat_change", "stat": "wisdom", "value": 2},
+                    {
+                        "type": "item_gain",
+                        "item": {
+                            "id": "secret_book",
+                            "name": "คัมภีร์ลับแห่งกาล",
+                            "description": "หนังสือที่เผยความลับของเวลา",
+                            "type": "magical",
+                            "power": 5,
+                            "magical_properties": {"time_knowledge": True},
+                        },
+                    },
+                    {"type": "day_advance", "amount": 1},
+                ],
+            },
+        }
+        if action in library_actions:
+            return library_actions[action]
+
+    return None
+
+
+def _states() -> List[Tuple[GameState, str]]:
+    states = []
+    for location, era, action in CASES:
+        state = GameState(current_location=location, current_era=era, loop_count=2)
+        state.player = Player(name="ผู้ทดสอบ")
+        states.append((state, action))
+    return states
+
+
+def _plain(result):
+    """Compiled results hold read-only mappings; compare them as plain data"""
+    if result is None:
+        return None
+    if hasattr(result, "items"):
+        return {k: _plain(v) for k, v in result.items()}
+    if isinstance(result, (list, tuple)):
+        return [_plain(v) for v in result]
+    return result
+
+
+def run(iterations: int) -> Dict[str, Any]:
+    states = _states()
+
+    # Both implementations must agree before their speed means anything
+    for state, action in states:
+        assert _plain(render_basic_action(action, state)) == legacy_basic_action(
+            action, state
+        ), f"mismatch for {state.current_location}/{state.current_era}/{action}"
+
+    results = {}
+    for name, fn in [
+        ("legacy", legacy_basic_action),
+        ("compiled", render_basic_action),
+    ]:
+        seconds = min(
+            timeit.repeat(
+                lambda: [fn(action, state) for state, action in states],
+                number=iterations,
+                repeat=5,
+            )
+        )
+        results[name] = {
+            "ns_per_call": seconds / (iterations * len(states)) * 1e9,
+            "peak_bytes_per_call": _peak_per_call(fn, states),
+        }
+    results["speedup"] = (
+        results["legacy"]["ns_per_call"] / results["compiled"]["ns_per_call"]
+    )
+    return results
+
+
+def _peak_per_call(fn, states) -> float:
+    """Peak traced memory of a single call, averaged over the case mix"""
+    peaks = []
+    for state, action in states:
+        tracemalloc.start()
+        fn(action, state)
+        peaks.append(tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return sum(peaks) / len(peaks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = run(args.iterations)
+    for name in ("legacy", "compiled"):
+        print(
+            f"{name:>9}: {results[name]['ns_per_call']:8.0f} ns/call, "
+            f"{results[name]['peak_bytes_per_call']:8.0f} peak bytes/call"
+        )
+    print(f"  speedup: {results['speedup']:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
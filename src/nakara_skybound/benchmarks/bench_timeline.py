@@ -0,0 +1,79 @@
+"""Microbenchmark: timeline forks with persistent maps vs dict copies.
+
+python -m nakara_skybound.benchmarks.bench_timeline
+"""
+
+import argparse
+import time
+import tracemalloc
+from typing import Any, Dict
+
+from ..game.persistent import PMap
+
+
+def _copying(world: Dict[str, Any], branches: int):
+    """The old store_era_state: a full copy per fork, then one change"""
+    kept = []
+    for i in range(branches):
+        fork = world.copy()
+        fork[f"key_{i % len(world)}"] = f"branch_{i}"
+        kept.append(fork)
+        world = fork
+    return kept
+
+
+def _persistent(world: PMap, branches: int):
+    kept = []
+    for i in range(branches):
+        world = world.set(f"key_{i % len(world)}", f"branch_{i}")
+        kept.append(world)
+    return kept
+
+
+def _measure(fn, world, branches: int) -> Dict[str, float]:
+    tracemalloc.start()
+    started = time.perf_counter()
+    kept = fn(world, branches)
+    elapsed = time.perf_counter() - started
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del kept
+    return {
+        "us_per_fork": elapsed / branches * 1e6,
+        "bytes_per_fork": retained / branches,
+    }
+
+
+def run(world_size: int, branches: int) -> Dict[str, Any]:
+    plain = {f"key_{i}": i for i in range(world_size)}
+    persistent = PMap(plain)
+    results = {
+        "dict_copy": _measure(_copying, plain, branches),
+        "persistent": _measure(_persistent, persistent, branches),
+    }
+    results["memory_ratio"] = (
+        results["dict_copy"]["bytes_per_fork"]
+        / results["persistent"]["bytes_per_fork"]
+    )
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--world-size", type=int, default=2000)
+    parser.add_argument("--branches", type=int, default=500)
+    args = parser.parse_args()
+
+    for size in (args.world_size // 10, args.world_size):
+        results = run(size, args.branches)
+        print(f"world of {size} keys, {args.branches} branches:")
+        for name in ("dict_copy", "persistent"):
+            print(
+                f"  {name:>10}: {results[name]['us_per_fork']:8.1f} us/fork, "
+                f"{results[name]['bytes_per_fork']:9.0f} bytes/fork"
+            )
+        print(f"  memory ratio: {results['memory_ratio']:.0f}x")
+
+
+if __name__ == "__main__":
+    main()
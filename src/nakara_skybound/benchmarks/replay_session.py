@@ -0,0 +1,149 @@
+"""Replay a recorded session headlessly and time every step.
+
+Sessions are recorded when NAKARA_RECORD_DIR is set (one JSONL file per
+session). The replay rebuilds the session from scratch and re-runs each
+recorded engine call. LLM responses and variant-pool
+draws are served from the recording, so only engine work is timed. A
+step whose event sequence number differs from the recording is reported
+as diverged.
+
+python -m nakara_skybound.benchmarks.replay_session sessions.jsonl --json now.json
+python -m nakara_skybound.benchmarks.replay_session sessions.jsonl --compare now.json
+
+Each step's time is the best of `--repeat` full replays.
+"""
+
+import os
+
+# Before the game modules load (narrative_engine reads .env on import)
+os.environ["OPENAI_API_KEY"] = ""
+for _name in (
+    "NAKARA_LLM_BACKEND",
+    "NAKARA_VARIANT_POOL",
+    "NAKARA_EVENT_LOG_DIR",
+    "NAKARA_RECORD_DIR",
+):
+    os.environ.pop(_name, None)
+
+import argparse
+import json
+import statistics
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+from ..game.game_engine import GameEngine
+from ..game.recording import Playback, decode_value, read_recording
+
+
+def replay(header: Dict[str, Any], steps: List[Dict[str, Any]]) -> List[Dict]:
+    """Run the recorded steps on a fresh engine; seconds and outcome per step"""
+    engine = GameEngine(header["session_id"])
+    playback = Playback()
+    engine.narrative_engine.recording = playback
+    engine.narrative_engine.openai_available = header["llm"]
+
+    results = []
+    for step in steps:
+        playback.load(step)
+        method = getattr(engine, step["op"])
+        args = decode_value(step["args"])
+        kwargs = {k: decode_value(v) for k, v in step.get("kwargs", {}).items()}
+
+        error = None
+        started = time.perf_counter()
+        try:
+            method(*args, **kwargs)
+        except Exception as e:
+            error = repr(e)
+        seconds = time.perf_counter() - started
+
+        diverged = (
+            engine.events.seq != step["seq"]
+            or (error is None) != ("error" not in step)
+            or bool(playback.llm or playback.variants)
+        )
+        results.append({"op": step["op"], "seconds": seconds, "diverged": diverged})
+    return results
+
+
+def summarize(steps: List[Dict]) -> Dict[str, Dict[str, float]]:
+    """Per-op count and timing (seconds), plus a "total" row"""
+    by_op: Dict[str, List[float]] = {}
+    for step in steps:
+        by_op.setdefault(step["op"], []).append(step["seconds"])
+    by_op["total"] = [step["seconds"] for step in steps]
+
+    summary = {}
+    for op, times in by_op.items():
+        times = sorted(times)
+        summary[op] = {
+            "count": len(times),
+            "total": sum(times),
+            "mean": statistics.fmean(times),
+            "p50": times[len(times) // 2],
+            "p95": times[min(len(times) - 1, int(len(times) * 0.95))],
+            "max": times[-1],
+        }
+    return summary
+
+
+def print_summary(summary: Dict[str, Dict[str, float]], baseline=None):
+    print(
+        f"\n{'op':<22} {'count':>6} {'total ms':>10} {'mean ms':>9} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}" + (" change" if baseline else "")
+    )
+    for op, row in summary.items():
+        line = (
+            f"{op:<22} {row['count']:>6} {row['total'] * 1e3:10.2f} "
+            f"{row['mean'] * 1e3:9.3f} {row['p50'] * 1e3:9.3f} "
+            f"{row['p95'] * 1e3:9.3f} {row['max'] * 1e3:9.3f}"
+        )
+        before = baseline.get(op) if baseline else None
+        if before:
+            line += f" {row['mean'] / before['mean'] - 1:+7.1%}"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("recording")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="write per-step timings and the summary")
+    parser.add_argument("--compare", help="a --json file from an earlier replay")
+    args = parser.parse_args(argv)
+
+    header, steps = read_recording(args.recording)
+    print(f"Replaying {len(steps)} steps of session {header['session_id']}")
+    runs = [replay(header, steps) for _ in range(args.repeat)]
+    best = [
+        {**run_steps[0], "seconds": min(step["seconds"] for step in run_steps)}
+        for run_steps in zip(*runs)
+    ]
+    diverged = [i for i, step in enumerate(best) if step["diverged"]]
+    summary = summarize(best)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)["summary"]
+    print_summary(summary, baseline)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(
+                {"recording": args.recording, "steps": best, "summary": summary},
+                f,
+                indent=2,
+            )
+
+    if diverged:
+        print(
+            f"\n{len(diverged)} steps diverged from the recording, first at {diverged[0]}"
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+"""Memory soak: play one session for thousands of loops and gate its growth.
+
+The session plays with the LLM switched off and fixed seeds. Every
+`--sample-every` loops the harness records the memory tracemalloc sees
+allocated and GameEngine.footprint(), then fits a line through the
+later half of the samples, past the warm-up. The exit status is 1 when
+that growth is over `--budget-kb-per-loop` (by default `--budget-mb`
+spread over `--horizon` loops), or the session's projected size at
+`--horizon` loops is over `--budget-mb`.
+
+python -m nakara_skybound.benchmarks.soak_memory --loops 2000
+
+The allocation sites that grew the most are printed, with the game code
+that led to them, to help find what leaked.
+"""
+
+import os
+
+# Before the game modules load (narrative_engine reads .env on import)
+os.environ["OPENAI_API_KEY"] = ""
+for _name in ("NAKARA_LLM_BACKEND", "NAKARA_VARIANT_POOL", "NAKARA_EVENT_LOG_DIR"):
+    os.environ.pop(_name, None)
+
+import argparse
+import gc
+import random
+import sys
+import time
+import tracemalloc
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from ..game.game_engine import GameEngine
+
+SEED = 1234
+CHOICES = ["explore", "meditate", "talk", "study", "help", "pray"]
+GAME_DIR = os.path.dirname(sys.modules[GameEngine.__module__].__file__)
+
+
+def slope(xs: Sequence[float], ys: Sequence[float]) -> Tuple[float, float]:
+    """Least-squares (slope, intercept) of ys over xs"""
+    n = len(xs)
+    mean_x, mean_y = sum(xs) / n, sum(ys) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return 0.0, mean_y
+    cov = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    return cov / var, mean_y - cov / var * mean_x
+
+
+def soak(
+    loops: int, decisions_per_loop: int, sample_every: int, frames: int
+) -> Tuple[List[Dict], tracemalloc.Snapshot, tracemalloc.Snapshot]:
+    """Play the session, sampling memory; returns samples and two snapshots"""
+    random.seed(SEED)
+    tracemalloc.start(frames)
+    engine = GameEngine("soak")
+    engine.create_character("ผู้ทดสอบ", "sage")
+    gc.collect()
+    first = tracemalloc.take_snapshot()
+    baseline = tracemalloc.get_traced_memory()[0]
+
+    samples = []
+    started = time.perf_counter()
+    for loop in range(1, loops + 1):
+        for i in range(decisions_per_loop):
+            engine.make_decision("general_action", CHOICES[i % len(CHOICES)])
+        engine.trigger_time_loop()
+        if loop % sample_every == 0 or loop == loops:
+            gc.collect()
+            traced = tracemalloc.get_traced_memory()[0] - baseline
+            footprint = engine.footprint()
+            samples.append({"loop": loop, "traced": traced, **footprint})
+            print(
+                f"loop {loop:>6}  traced {traced / 2**20:9.2f} MB  "
+                f"footprint {footprint['total'] / 2**20:9.2f} MB  "
+                f"{time.perf_counter() - started:7.1f}s",
+                flush=True,
+            )
+    last = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    return samples, first, last
+
+
+def report(samples: List[Dict], first, last, top: int):
+    loops = [s["loop"] for s in samples]
+    first_sample, last_sample = samples[0], samples[-1]
+    print(f"\n{'footprint':<24} {'first':>12} {'last':>12} {'per loop':>12}")
+    for group in ("subsystems", "collections"):
+        for name in last_sample[group]:
+            per_loop, _ = slope(loops, [s[group][name] for s in samples])
+            print(
+                f"{group[:4]}.{name:<19} {first_sample[group][name]:12,} "
+                f"{last_sample[group][name]:12,} {per_loop:12,.0f}"
+            )
+    print(f"\nTop {top} growing allocation sites:")
+    for stat in last.compare_to(first, "traceback")[:top]:
+        print(f"  +{stat.size_diff / 2**20:.2f} MB in {stat.count_diff:+,} blocks")
+        # Innermost frame, plus the innermost game code that led to it
+        frames = list(reversed(stat.traceback))
+        game = [f for f in frames[1:] if GAME_DIR in f.filename][:3]
+        for frame in frames[:1] + game:
+            print(f"    {frame.filename}:{frame.lineno}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--loops", type=int, default=1000)
+    parser.add_argument("--decisions-per-loop", type=int, default=5)
+    parser.add_argument("--sample-every", type=int, default=100)
+    parser.add_argument(
+        "--horizon",
+        type=int,
+        default=1000,
+        help="loops a long-lived session is expected to reach",
+    )
+    parser.add_argument(
+        "--budget-mb",
+        type=float,
+        default=64.0,
+        help="allowed size of one session at --horizon loops",
+    )
+    parser.add_argument(
+        "--budget-kb-per-loop",
+        type=float,
+        default=None,
+        help="allowed growth per loop (default: --budget-mb / --horizon)",
+    )
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--frames", type=int, default=32, help="stack depth tracemalloc keeps"
+    )
+    args = parser.parse_args(argv)
+    if args.loops < 4 * args.sample_every:
+        parser.error("--loops must cover at least four samples")
+
+    samples, first, last = soak(
+        args.loops, args.decisions_per_loop, args.sample_every, args.frames
+    )
+    report(samples, first, last, args.top)
+
+    later = samples[len(samples) // 2 :]
+    per_loop, intercept = slope(
+        [s["loop"] for s in later], [s["traced"] for s in later]
+    )
+    projected = intercept + per_loop * args.horizon
+    budget_per_loop = (
+        args.budget_kb_per_loop * 1024
+        if args.budget_kb_per_loop is not None
+        else args.budget_mb * 2**20 / args.horizon
+    )
+    print(
+        f"\ngrowth {per_loop / 1024:.1f} KB/loop "
+        f"(budget {budget_per_loop / 1024:.1f}), "
+        f"projected {projected / 2**20:.1f} MB at {args.horizon} loops "
+        f"(budget {args.budget_mb:.1f})"
+    )
+    if per_loop > budget_per_loop or projected > args.budget_mb * 2**20:
+        print("Session memory is over budget")
+        return 1
+    print("Session memory is within budget")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
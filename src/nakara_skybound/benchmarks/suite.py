@@ -0,0 +1,342 @@
+"""Benchmark suite for the engine hot paths, with a regression gate.
+
+Every case runs with fixed seeds and with the LLM switched off, so all
+narratives come from the fallback tier and runs are repeatable. Each
+case reports its best time per operation over several repeats, scaled
+by a calibration workload timed right next to it, and is compared with
+a JSON baseline. The exit status is 1 when any case is slower than
+the baseline by more than the threshold.
+
+python -m nakara_skybound.benchmarks.suite --update-baseline   # record
+python -m nakara_skybound.benchmarks.suite                     # gate
+
+Baselines are machine specific: record one on the machine that gates.
+"""
+
+import os
+
+# Before the game modules load (narrative_engine reads .env on import)
+os.environ["OPENAI_API_KEY"] = ""
+for _name in ("NAKARA_LLM_BACKEND", "NAKARA_VARIANT_POOL", "NAKARA_EVENT_LOG_DIR"):
+    os.environ.pop(_name, None)
+
+import argparse
+import gc
+import json
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from ..game.character import Item, Player, Stats
+from ..game.game_engine import GameEngine
+from ..game.magic_system import MagicSystem
+from ..game.save_system import SaveSystem
+from ..game.session_store import decode_snapshot, encode_snapshot
+from ..game.world import World
+
+BASELINE_VERSION = 1
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "baseline.json")
+SEED = 1234
+CHOICES = ["explore", "meditate", "talk", "study", "help", "pray"]
+
+# name -> function returning seconds per operation
+CASES: Dict[str, Callable[[], float]] = {}
+
+
+def case(name: str):
+    def register(fn: Callable[[], float]):
+        CASES[name] = fn
+        return fn
+
+    return register
+
+
+def best_of(
+    op: Callable[[Any], Any],
+    setup: Callable[[], Any] = lambda: None,
+    number: int = 100,
+    repeat: int = 15,
+) -> float:
+    """Best seconds per op over `repeat` runs of `number` ops each.
+
+    `setup` runs untimed before each repeat and its result is passed to
+    op. The garbage collector is paused while timing, as in timeit.
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        context = setup()
+        gc.collect()
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            for _ in range(number):
+                op(context)
+            elapsed = time.perf_counter() - started
+        finally:
+            gc.enable()
+        best = min(best, elapsed / number)
+    return best
+
+
+def play(engine: GameEngine, decisions: int, loops: int = 1) -> GameEngine:
+    """Give an engine a history of `decisions` spread over `loops` loops"""
+    per_loop = max(1, decisions // loops)
+    for i in range(decisions):
+        engine.make_decision("general_action", CHOICES[i % len(CHOICES)])
+        if (i + 1) % per_loop == 0 and i + 1 < decisions:
+            engine.trigger_time_loop()
+    return engine
+
+
+def _seeded_engine() -> GameEngine:
+    random.seed(SEED)
+    engine = GameEngine("bench")
+    engine.create_character("ผู้ทดสอบ", "sage")
+    return engine
+
+
+@case("make_decision.fallback")
+def bench_make_decision() -> float:
+    counter = iter(range(10**9))
+    return best_of(
+        lambda engine: engine.make_decision(
+            "general_action", CHOICES[next(counter) % len(CHOICES)]
+        ),
+        setup=_seeded_engine,
+        number=200,
+    )
+
+
+def _bench_loop(decisions: int) -> Callable[[], float]:
+    def bench() -> float:
+        # Built once, then restored from a snapshot before every repeat
+        blob = encode_snapshot(play(_seeded_engine(), decisions, loops=5))
+        return best_of(
+            lambda engine: engine.trigger_time_loop(),
+            setup=lambda: decode_snapshot(blob),
+            number=5,
+        )
+
+    return bench
+
+
+for _decisions in (100, 1000, 3000):
+    case(f"trigger_time_loop.history_{_decisions}")(_bench_loop(_decisions))
+
+
+def _saves_bench(decisions: int, saves: int):
+    engine = play(_seeded_engine(), decisions, loops=5)
+    for i in range(20):
+        engine.state.player.add_item(
+            Item(f"item_{i}", f"ของ {i}", "ของทดสอบ", "artifact", power=i)
+        )
+    directory = tempfile.mkdtemp(prefix="nakara-bench-")
+    save_system = SaveSystem(directory)
+    for i in range(saves):
+        save_system.save_game(engine.state, f"slot_{i}")
+    return engine, save_system, directory
+
+
+@case("save_game.decisions_1000")
+def bench_save_game() -> float:
+    engine, save_system, directory = _saves_bench(1000, 1)
+    try:
+        return best_of(
+            lambda _: save_system.save_game(engine.state, "slot_0"), number=20
+        )
+    finally:
+        shutil.rmtree(directory)
+
+
+@case("load_game.decisions_1000")
+def bench_load_game() -> float:
+    _, save_system, directory = _saves_bench(1000, 1)
+    try:
+        return best_of(lambda _: save_system.load_game("slot_0"), number=20)
+    finally:
+        shutil.rmtree(directory)
+
+
+@case("list_saves.saves_200")
+def bench_list_saves() -> float:
+    _, save_system, directory = _saves_bench(100, 200)
+    try:
+        return best_of(lambda _: save_system.list_saves(), number=3)
+    finally:
+        shutil.rmtree(directory)
+
+
+@case("world.construct")
+def bench_world() -> float:
+    def build(_):
+        world = World()
+        world.initialize_locations()
+        world.populate_npcs()
+
+    return best_of(build, number=200)
+
+
+@case("npc.dialogue_options")
+def bench_dialogue_options() -> float:
+    world = World()
+    world.initialize_locations()
+    world.populate_npcs()
+    npcs = list(world.npcs.values())
+    player_state = {
+        "current_loop": 1,
+        "player_name": "ผู้ทดสอบ",
+        "completed_quests": [],
+    }
+    return best_of(
+        lambda _: [npc.get_dialogue_options(player_state) for npc in npcs],
+        number=2000,
+    ) / len(npcs)
+
+
+def _players(count: int) -> List[Player]:
+    rng = random.Random(SEED)
+    players = []
+    for _ in range(count):
+        player = Player()
+        player.stats = Stats(*(rng.randint(0, 40) for _ in range(5)))
+        players.append(player)
+    return players
+
+
+@case("magic.available_spells")
+def bench_available_spells() -> float:
+    magic, players = MagicSystem(), _players(100)
+    return best_of(
+        lambda _: [magic.get_available_spells_for_player(p) for p in players],
+        number=200,
+    ) / len(players)
+
+
+@case("magic.can_cast_spell")
+def bench_can_cast() -> float:
+    magic, players = MagicSystem(), _players(100)
+    spells = list(magic.available_spells)
+    return best_of(
+        lambda _: [magic.can_cast_spell(s, p) for p in players for s in spells],
+        number=200,
+    ) / (len(players) * len(spells))
+
+
+def calibrate() -> float:
+    """Seconds for a fixed pure-Python workload.
+
+    Cases are compared in units of this, timed next to each case, so a
+    machine that is busier or slower than when the baseline was recorded
+    does not read as a regression (or hide one).
+    """
+
+    def workload(_):
+        table = {}
+        for i in range(2000):
+            table[f"key_{i % 500}"] = table.get(f"key_{i % 500}", 0) + i
+        return sorted(table.values())
+
+    return best_of(workload, number=20)
+
+
+def run(names: List[str]) -> Dict[str, Dict[str, float]]:
+    """Time each case, and the calibration workload right before and after"""
+    results = {}
+    for name in names:
+        before = calibrate()
+        seconds = CASES[name]()
+        calibration = min(before, calibrate())
+        results[name] = {"seconds": seconds, "relative": seconds / calibration}
+        print(f"{name:<36} {seconds * 1e6:12.2f} us/op", flush=True)
+    return results
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Names of the cases slower than the baseline by more than `threshold`"""
+    regressions = []
+    print(f"\n{'case':<36} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, result in results.items():
+        before = baseline["results"].get(name)
+        if before is None:
+            print(f"{name:<36} {'-':>12} {result['seconds'] * 1e6:12.2f}      new")
+            continue
+        change = result["relative"] / before["relative"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  REGRESSED"
+        print(
+            f"{name:<36} {before['seconds'] * 1e6:12.2f} "
+            f"{result['seconds'] * 1e6:12.2f} {change:+8.1%}{flag}"
+        )
+    print("(change is relative to the calibration workload; times are in us/op)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.25,
+        help="allowed slowdown before failing (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--update-baseline",
+        action="store_true",
+        help="write the results as the new baseline instead of checking",
+    )
+    parser.add_argument(
+        "--only", action="append", help="run only cases starting with this"
+    )
+    args = parser.parse_args(argv)
+
+    names = [
+        name
+        for name in CASES
+        if not args.only or any(name.startswith(prefix) for prefix in args.only)
+    ]
+    results = run(names)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": BASELINE_VERSION,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "seed": SEED,
+                    "results": results,
+                },
+                f,
+                indent=2,
+            )
+        print(f"\nBaseline written to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"\nNo baseline at {args.baseline}; record one with --update-baseline")
+        return 2
+    with open(args.baseline, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    if baseline.get("version") != BASELINE_VERSION:
+        print(f"\nBaseline version {baseline.get('version')} is not supported")
+        return 2
+
+    regressions = compare(results, baseline, args.threshold)
+    if regressions:
+        print(f"\n{len(regressions)} regressed past {args.threshold:.0%}")
+        return 1
+    print(f"\nNo regressions past {args.threshold:.0%}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
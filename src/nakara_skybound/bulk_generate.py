@@ -0,0 +1,200 @@
+"""Offline bulk narrative generation for the variant pool.
+
+Enumerates every World location x era x available action x karma band,
+generates variants in parallel under the shared rate limits and writes an
+artifact that NarrativeEngine loads via NAKARA_VARIANT_POOL.
+
+    python -m nakara_skybound.bulk_generate --output variants.json --stub
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set
+
+from .game.decision_schema import validate_decision
+from .game.llm_scheduler import LLMScheduler
+from .game.narrative_engine import NarrativeEngine
+from .game.time_system import TimeEra
+from .game.variant_pool import ARTIFACT_VERSION, KARMA_BANDS, PoolKey
+from .game.world import World
+
+
+def enumerate_keys(
+    locations: Optional[List[str]] = None,
+    eras: Optional[List[str]] = None,
+    bands: Optional[List[str]] = None,
+) -> List[PoolKey]:
+    """All (location, era, action, karma band) combinations to generate"""
+    world = World()
+    world.initialize_locations()
+
+    keys = []
+    for location in world.locations.values():
+        if locations and location.id not in locations:
+            continue
+        for era in TimeEra:
+            if eras and era.value not in eras:
+                continue
+            for action in location.available_actions:
+                for band in bands or KARMA_BANDS:
+                    keys.append((location.id, era.value, action, band))
+    return keys
+
+
+def key_to_str(key: PoolKey) -> str:
+    return "|".join(key)
+
+
+def read_checkpoint(path: str) -> Dict[str, List[Dict[str, Any]]]:
+    """Completed keys and their variants from a previous (partial) run"""
+    done: Dict[str, List[Dict[str, Any]]] = {}
+    if not os.path.exists(path):
+        return done
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line from an interrupted run; it gets redone
+                continue
+            done[record["key"]] = record["variants"]
+    return done
+
+
+def write_artifact(path: str, done: Dict[str, List[Dict[str, Any]]]):
+    """Write the indexed artifact atomically"""
+    entries = []
+    index = {}
+    for key_str in sorted(done):
+        location, era, action, band = key_str.split("|")
+        index[key_str] = len(entries)
+        entries.append(
+            {
+                "key": {
+                    "location": location,
+                    "era": era,
+                    "action": action,
+                    "karma_band": band,
+                },
+                "variants": done[key_str],
+            }
+        )
+
+    artifact = {
+        "version": ARTIFACT_VERSION,
+        "generated_at": datetime.now().isoformat(),
+        "index": index,
+        "entries": entries,
+    }
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(artifact, f, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def generate_key(
+    engine: NarrativeEngine, key: PoolKey, variants: int, retries: int
+) -> List[Dict[str, Any]]:
+    """Generate distinct schema-valid variants for one key, retrying short batches"""
+    valid: List[Dict[str, Any]] = []
+    narratives: Set[str] = set()
+    for _ in range(retries + 1):
+        try:
+            batch = engine.generate_variants(key)
+        except Exception as e:
+            print(f"Error generating {key_to_str(key)}: {e}", file=sys.stderr)
+            continue
+        for variant in batch:
+            # A retry (or a deterministic backend) can repeat a narrative
+            if validate_decision(variant) or variant["narrative"] in narratives:
+                continue
+            narratives.add(variant["narrative"])
+            valid.append(variant)
+        if len(valid) >= variants:
+            break
+    return valid[:variants]
+
+
+def run(args: argparse.Namespace) -> int:
+    if args.stub:
+        os.environ["NAKARA_LLM_BACKEND"] = "stub"
+
+    engine = NarrativeEngine(session_id="bulk_generate")
+    if not engine.openai_available:
+        print("No LLM backend: set OPENAI_API_KEY or use --stub", file=sys.stderr)
+        return 2
+    engine.variants_per_refill = args.variants
+    engine.scheduler = LLMScheduler(
+        requests_per_minute=args.rpm, tokens_per_minute=args.tpm
+    )
+
+    checkpoint_path = args.checkpoint or f"{args.output}.checkpoint.jsonl"
+    done = read_checkpoint(checkpoint_path)
+    keys = enumerate_keys(args.locations, args.eras, args.bands)
+    pending = [key for key in keys if key_to_str(key) not in done]
+    print(f"{len(keys)} keys, {len(keys) - len(pending)} already done")
+
+    failed: Set[str] = set()
+    started = time.monotonic()
+
+    with (
+        open(checkpoint_path, "a", encoding="utf-8") as checkpoint,
+        ThreadPoolExecutor(max_workers=args.workers) as executor,
+    ):
+        futures = {
+            executor.submit(generate_key, engine, key, args.variants, args.retries): key
+            for key in pending
+        }
+        for completed, future in enumerate(as_completed(futures), 1):
+            key_str = key_to_str(futures[future])
+            variants = future.result()
+            if not variants:
+                failed.add(key_str)
+                continue
+            done[key_str] = variants
+            record = {"key": key_str, "variants": variants}
+            checkpoint.write(json.dumps(record, ensure_ascii=False) + "\n")
+            checkpoint.flush()
+            if completed % 10 == 0 or completed == len(pending):
+                print(
+                    f"{completed}/{len(pending)} keys ({time.monotonic() - started:.1f}s)"
+                )
+
+    write_artifact(args.output, done)
+    print(f"Wrote {len(done)} keys to {args.output}")
+    if failed:
+        print(f"{len(failed)} keys failed, re-run to retry", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", required=True, help="artifact path to write")
+    parser.add_argument(
+        "--checkpoint", help="checkpoint path (default: OUTPUT.checkpoint.jsonl)"
+    )
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--variants", type=int, default=4, help="variants per key")
+    parser.add_argument("--retries", type=int, default=2)
+    parser.add_argument(
+        "--rpm", type=int, default=int(os.getenv("NAKARA_LLM_RPM", "500"))
+    )
+    parser.add_argument(
+        "--tpm", type=int, default=int(os.getenv("NAKARA_LLM_TPM", "200000"))
+    )
+    parser.add_argument("--locations", nargs="*", help="limit to these location ids")
+    parser.add_argument("--eras", nargs="*", choices=[era.value for era in TimeEra])
+    parser.add_argument("--bands", nargs="*", choices=KARMA_BANDS)
+    parser.add_argument("--stub", action="store_true", help="use the local stub LLM")
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,6 +1,11 @@
+from array import array
 from dataclasses import dataclass, field
 from enum import Enum
-from typing import Any, Dict, List
+from operator import itemgetter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .dialogue_machine import START_STATE, DialogueMachine, default_dialogue_states
+from .relations import DEFAULT_PLAYER, NPCMemoryView, RelationStore
 
 
 class CharacterClass(Enum):
@@ -9,16 +14,65 @@ class CharacterClass(Enum):
     MYSTIC = "mystic"  # นักเวทย์
 
 
-@dataclass
-class Stats:
-    wisdom: int = 10  # ปัญญา
-    strength: int = 10  # กำลัง
-    karma: int = 0  # กรรม (can be negative)
-    mysticism: int = 10  # เวทมนตร์
-    charisma: int = 10  # เสน่ห์
+# Fixed stat order; Stats is a small int array indexed by STAT_INDEX
+STAT_NAMES = ("wisdom", "strength", "karma", "mysticism", "charisma")
+STAT_INDEX = {name: index for index, name in enumerate(STAT_NAMES)}
+
+
+def _stat_property(index: int) -> property:
+    def set_stat(self, value: int):
+        self[index] = value
+
+    return property(itemgetter(index), set_stat)
+
+
+class Stats(array):
+    __slots__ = ()
+
+    wisdom = _stat_property(0)  # ปัญญา
+    strength = _stat_property(1)  # กำลัง
+    karma = _stat_property(2)  # กรรม (can be negative)
+    mysticism = _stat_property(3)  # เวทมนตร์
+    charisma = _stat_property(4)  # เสน่ห์
+
+    def __new__(
+        cls,
+        wisdom: int = 10,
+        strength: int = 10,
+        karma: int = 0,
+        mysticism: int = 10,
+        charisma: int = 10,
+    ):
+        return super().__new__(cls, "i", (wisdom, strength, karma, mysticism, charisma))
+
+    def get(self, stat_name: str, default: int = 0) -> int:
+        index = STAT_INDEX.get(stat_name)
+        return default if index is None else self[index]
 
+    def apply_deltas(self, deltas: Iterable[Tuple[int, int]]):
+        """Batch update from (stat index, delta) pairs"""
+        for index, delta in deltas:
+            self[index] += delta
 
-@dataclass
+    def as_dict(self) -> Dict[str, int]:
+        return dict(zip(STAT_NAMES, self))
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value}" for name, value in zip(STAT_NAMES, self))
+        return f"Stats({fields})"
+
+    # array's own copy and pickle hooks would return a plain array
+    def __copy__(self) -> "Stats":
+        return Stats(*self)
+
+    def __deepcopy__(self, memo) -> "Stats":
+        return Stats(*self)
+
+    def __reduce_ex__(self, protocol):
+        return (Stats, tuple(self))
+
+
+@dataclass(slots=True)
 class Item:
     id: str
     name: str
@@ -29,6 +83,18 @@ class Item:
 
 
 class Player:
+    __slots__ = (
+        "name",
+        "character_class",
+        "stats",
+        "level",
+        "experience",
+        "time_fragments",
+        "inventory",
+        "learned_spells",
+        "memory_fragments",
+    )
+
     def __init__(
         self,
         name: str = "ผู้เดินทาง",
@@ -61,9 +127,17 @@ class Player:
 
     def modify_stat(self, stat_name: str, value: int):
         """Modify a character stat"""
-        if hasattr(self.stats, stat_name):
-            current_value = getattr(self.stats, stat_name)
-            setattr(self.stats, stat_name, current_value + value)
+        index = STAT_INDEX.get(stat_name)
+        if index is not None:
+            self.stats[index] += value
+
+    def modify_stats(self, changes: Dict[str, int]):
+        """Apply several stat changes at once; unknown stats are ignored"""
+        stats = self.stats
+        for stat_name, value in changes.items():
+            index = STAT_INDEX.get(stat_name)
+            if index is not None:
+                stats[index] += value
 
     def add_item(self, item: Item):
         """Add item to inventory"""
@@ -102,17 +176,81 @@ class Player:
         return base_power + item_power
 
 
-@dataclass
-class NPCMemory:
-    player_actions: List[Dict[str, Any]] = field(default_factory=list)
-    relationship_level: int = 0
-    trust_level: int = 0
-    last_interaction_loop: int = -1
-    secrets_revealed: List[str] = field(default_factory=list)
+class NPCMemory(NPCMemoryView):
+    """An NPC's memory of the player.
+
+    A view of the world's RelationStore for NPCs the World creates; any
+    other is the only row of a store of its own.
+    """
+
+    __slots__ = ()
+
+    def __init__(
+        self,
+        player_actions: Optional[List[Dict[str, Any]]] = None,
+        relationship_level: int = 0,
+        trust_level: int = 0,
+        last_interaction_loop: int = -1,
+        secrets_revealed: Optional[List[str]] = None,
+        version: int = 0,
+    ):
+        store = RelationStore(capacity=1)
+        super().__init__(store, store.add_npc(""), 0)
+        # The store starts out neutral; only set what differs
+        if player_actions is not None:
+            self.player_actions = player_actions
+        if relationship_level:
+            self.relationship_level = relationship_level
+        if trust_level:
+            self.trust_level = trust_level
+        if last_interaction_loop != -1:
+            self.last_interaction_loop = last_interaction_loop
+        if secrets_revealed is not None:
+            self.secrets_revealed = secrets_revealed
+        if version:
+            self.version = version
+
+    @classmethod
+    def in_store(cls, store: RelationStore, npc_id: str) -> "NPCMemory":
+        """The memory of `npc_id` in `store`, for the default player"""
+        memory = cls.__new__(cls)
+        NPCMemoryView.__init__(
+            memory, store, store.add_npc(npc_id), store.add_player(DEFAULT_PLAYER)
+        )
+        return memory
+
+    def __setstate__(self, state):
+        _, slots = state
+        if "store" in slots:
+            super().__setstate__(state)
+        else:  # Pickled as a plain dataclass, before the store existed
+            self.__init__(**slots)
 
 
 class NPC:
-    def __init__(self, id: str, name: str, role: str, location: str):
+    __slots__ = (
+        "id",
+        "name",
+        "role",
+        "location",
+        "stats",
+        "personality_traits",
+        "dialogue_states",
+        "memory",
+        "available_quests",
+        "special_abilities",
+        "_dialogue_machine",
+        "_dialogue_memo",
+    )
+
+    def __init__(
+        self,
+        id: str,
+        name: str,
+        role: str,
+        location: str,
+        relations: Optional[RelationStore] = None,
+    ):
         self.id = id
         self.name = name
         self.role = role
@@ -120,13 +258,35 @@ class NPC:
         self.stats = Stats()
         self.personality_traits: List[str] = []
         self.dialogue_states: Dict[str, Any] = {}
-        self.memory = NPCMemory()
+        # A cell of the world's relation store, or a store of its own
+        self.memory = (
+            NPCMemory() if relations is None else NPCMemory.in_store(relations, id)
+        )
         self.available_quests: List[str] = []
         self.special_abilities: List[str] = []
+        self._dialogue_machine: Optional[DialogueMachine] = None
+        # (memory version, (state, player flags) -> options)
+        self._dialogue_memo: Optional[Tuple[int, Dict[Tuple, List]]] = None
+
+    def __getstate__(self):
+        # The compiled machine and memo are rebuilt on first use
+        return None, {
+            name: getattr(self, name)
+            for name in self.__slots__
+            if not name.startswith("_")
+        }
+
+    def __setstate__(self, state):
+        _, slots = state
+        for name, value in slots.items():
+            setattr(self, name, value)
+        self._dialogue_machine = None
+        self._dialogue_memo = None
 
     def remember_player_action(self, action: Dict[str, Any]):
         """Remember a player action from current or previous loops"""
-        self.memory.player_actions.append(action)
+        self.memory.add_to("player_actions", action)
+        self.memory.version += 1
 
         # Adjust relationship based on action
         if action.get("karma_impact", 0) > 0:
@@ -136,53 +296,36 @@ class NPC:
             self.memory.relationship_level -= 1
             self.memory.trust_level -= 2
 
+    def compile_dialogue(self):
+        """Compile dialogue_states (or the default dialogue) into a machine.
+
+        Call again after changing dialogue_states or available_quests.
+        """
+        states = self.dialogue_states or default_dialogue_states(self.available_quests)
+        self._dialogue_machine = DialogueMachine(states)
+        self._dialogue_memo = None
+
     def get_dialogue_options(
-        self, player_state: Dict[str, Any]
+        self, player_state: Dict[str, Any], state: str = START_STATE
     ) -> List[Dict[str, Any]]:
-        """Get available dialogue options based on memory and relationship"""
-        options = []
-
-        # Basic greeting
-        if self.memory.last_interaction_loop < player_state.get("current_loop", 0):
-            if self.memory.relationship_level > 5:
-                options.append(
-                    {
-                        "id": "friendly_greeting",
-                        "text": f"สวัสดี {player_state.get('player_name', 'ผู้เดินทาง')} เราเจอกันอีกแล้วนะ",
-                        "requires": None,
-                    }
-                )
-            else:
-                options.append(
-                    {
-                        "id": "neutral_greeting",
-                        "text": "สวัสดี ท่านคือใคร?",
-                        "requires": None,
-                    }
-                )
-
-        # Quest-related options
-        for quest_id in self.available_quests:
-            if quest_id not in player_state.get("completed_quests", []):
-                options.append(
-                    {
-                        "id": f"quest_{quest_id}",
-                        "text": f"เกี่ยวกับ{quest_id}...",
-                        "requires": {"trust_level": 3},
-                    }
-                )
-
-        # Memory-based options
-        if len(self.memory.player_actions) > 0:
-            options.append(
-                {
-                    "id": "remember_past",
-                    "text": "ฉันจำได้ว่าเธอเคย...",
-                    "requires": {"relationship_level": 7},
-                }
-            )
-
-        return options
+        """Get available dialogue options based on memory and relationship.
+
+        Option sets are memoized per (state, player flags) until the
+        memory version changes; treat the returned dicts as read-only.
+        """
+        if self._dialogue_machine is None:
+            self.compile_dialogue()
+        machine = self._dialogue_machine
+        flags = machine.flags(self.memory, player_state)
+        version = self.memory.version
+        if self._dialogue_memo is None or self._dialogue_memo[0] != version:
+            self._dialogue_memo = (version, {})
+        memo = self._dialogue_memo[1]
+        key = (state, flags)
+        options = memo.get(key)
+        if options is None:
+            options = memo[key] = machine.options(state, self.memory, flags)
+        return list(options)
 
     def update_memory_from_loop(self, loop_memories: List[Dict[str, Any]]):
         """Update NPC memory based on previous loop experiences"""
@@ -0,0 +1,185 @@
+import bisect
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .session_store import SessionStore, get_session_store
+
+
+def _ring_hash(key: str) -> int:
+    return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+
+class HashRing:
+    """Consistent hashing of session ids onto worker ids.
+
+    Each worker gets `replicas` points on the ring, so removing a worker
+    only moves that worker's sessions, spread evenly over the others.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replicas: int = 100):
+        self.replicas = replicas
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add(node)
+
+    def add(self, node: str):
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.replicas):
+            point = _ring_hash(f"{node}#{replica}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove(self, node: str):
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        for replica in range(self.replicas):
+            point = _ring_hash(f"{node}#{replica}")
+            del self._owners[point]
+            self._points.remove(point)
+
+    def owner(self, key: str) -> Optional[str]:
+        if not self._points:
+            return None
+        index = bisect.bisect(self._points, _ring_hash(key)) % len(self._points)
+        return self._owners[self._points[index]]
+
+
+class WorkerRegistry:
+    """Worker heartbeats in the shared session database"""
+
+    def __init__(self, path: str):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS workers ("
+            "worker_id TEXT PRIMARY KEY, address TEXT, heartbeat_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def heartbeat(self, worker_id: str, address: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO workers VALUES (?, ?, ?)",
+                (worker_id, address, time.time()),
+            )
+
+    def remove(self, worker_id: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM workers WHERE worker_id = ?", (worker_id,))
+
+    def live_workers(self, ttl: float) -> Dict[str, str]:
+        """worker id -> address for workers seen within `ttl` seconds"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT worker_id, address FROM workers WHERE heartbeat_at >= ?",
+                (time.time() - ttl,),
+            ).fetchall()
+        return dict(rows)
+
+
+class ClusterWorker:
+    """One of N processes sharing a session database.
+
+    Every worker heartbeats into the database and builds the same hash
+    ring from the live workers, so they all agree on who owns a session
+    without talking to each other. When a worker stops heartbeating for
+    `ttl` seconds its sessions fall to the next worker on the ring, which
+    loads them from the shared store; write-through saves mean nothing
+    acknowledged to a player is lost.
+    """
+
+    def __init__(
+        self,
+        worker_id: str,
+        address: str,
+        db_path: str,
+        store: SessionStore,
+        heartbeat_interval: float = 2.0,
+        ttl: float = 6.0,
+    ):
+        self.worker_id = worker_id
+        self.address = address
+        self.store = store
+        self.registry = WorkerRegistry(db_path)
+        self.heartbeat_interval = heartbeat_interval
+        self.ttl = ttl
+
+        self.workers: Dict[str, str] = {}
+        self.ring = HashRing()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh()
+
+    def refresh(self):
+        """Heartbeat, rebuild the ring and release sessions we no longer own"""
+        self.registry.heartbeat(self.worker_id, self.address)
+        workers = self.registry.live_workers(self.ttl)
+        workers[self.worker_id] = self.address
+        if set(workers) != set(self.ring.nodes):
+            self.ring = HashRing(sorted(workers))
+        self.workers = workers
+
+        for session_id in self.store.resident_ids():
+            if not self.is_owner(session_id):
+                self.store.release(session_id)
+
+    def owner(self, session_id: str) -> Tuple[str, str]:
+        """(worker id, address) of the worker that should serve a session"""
+        worker_id = self.ring.owner(session_id) or self.worker_id
+        return worker_id, self.workers.get(worker_id, self.address)
+
+    def is_owner(self, session_id: str) -> bool:
+        return self.ring.owner(session_id) in (None, self.worker_id)
+
+    def start(self):
+        def beat():
+            while not self._stopped.wait(self.heartbeat_interval):
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Error refreshing cluster membership: {e}")
+
+        self._thread = threading.Thread(
+            target=beat, name=f"cluster-{self.worker_id}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """Leave the cluster cleanly so sessions move over immediately"""
+        self._stopped.set()
+        self.store.flush()
+        self.registry.remove(self.worker_id)
+
+
+_worker: Optional[ClusterWorker] = None
+_worker_lock = threading.Lock()
+
+
+def get_cluster_worker() -> Optional[ClusterWorker]:
+    """This process's cluster membership, or None when running standalone"""
+    global _worker
+    worker_id = os.getenv("NAKARA_WORKER_ID")
+    db_path = os.getenv("NAKARA_SESSION_DB")
+    if not (worker_id and db_path):
+        return None
+
+    with _worker_lock:
+        if _worker is None:
+            _worker = ClusterWorker(
+                worker_id,
+                os.getenv("NAKARA_WORKER_ADDRESS", ""),
+                db_path,
+                get_session_store(),
+            )
+            _worker.start()
+        return _worker
@@ -0,0 +1,67 @@
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Union
+
+from .time_system import TimeEra
+
+
+@dataclass(frozen=True)
+class CreateCharacter:
+    name: str
+    character_class: str
+
+
+@dataclass(frozen=True)
+class MoveTo:
+    location: str
+    advance_day: bool = False
+
+
+@dataclass(frozen=True)
+class TakeAction:
+    action: str
+    category: str = "general"
+    decision_id: str = "general_action"
+
+
+@dataclass(frozen=True)
+class TravelThroughTime:
+    era: TimeEra
+
+
+@dataclass(frozen=True)
+class TriggerLoop:
+    pass
+
+
+Command = Union[CreateCharacter, MoveTo, TakeAction, TravelThroughTime, TriggerLoop]
+
+
+@dataclass
+class CommandResult:
+    """What GameEngine.execute did with one command"""
+
+    command: Command
+    success: bool = True
+    result: Dict[str, Any] = field(default_factory=dict)
+
+
+class CommandQueue:
+    """Commands enqueued by UI widgets, drained once per script run.
+
+    Widgets push from their on_click callbacks, which Streamlit runs before
+    the script, so by the time the page is drawn every click of this run
+    has already been applied by the engine.
+    """
+
+    def __init__(self):
+        self._commands: List[Command] = []
+
+    def push(self, command: Command):
+        self._commands.append(command)
+
+    def drain(self) -> List[Command]:
+        commands, self._commands = self._commands, []
+        return commands
+
+    def __len__(self) -> int:
+        return len(self._commands)
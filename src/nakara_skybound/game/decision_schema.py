@@ -0,0 +1,78 @@
+from typing import Any, Dict, List
+
+from .character import STAT_NAMES
+
+# Required fields and their types for each consequence type
+CONSEQUENCE_FIELDS: Dict[str, Dict[str, type]] = {
+    "stat_change": {"stat": str, "value": int},
+    "item_gain": {"item": dict},
+    "quest_update": {"quest_id": str, "status": str},
+    "quest_start": {"quest_name": str},
+    "world_change": {"key": str},
+    "time_fragment": {"amount": int},
+    "day_advance": {"amount": int},
+    "relationship_change": {"npc_name": str, "change": int},
+    "era_change": {"new_era": str},
+}
+
+ITEM_FIELDS = ("id", "name", "description", "type")
+
+
+def validate_decision(result: Any) -> List[str]:
+    """Check the shape of a decision result (as NarrativeEngine produces it).
+
+    Returns the errors found, or an empty list when it is valid.
+    """
+    if not isinstance(result, dict):
+        return ["result must be an object"]
+
+    errors = []
+    narrative = result.get("narrative")
+    if not isinstance(narrative, str) or not narrative.strip():
+        errors.append("narrative must be a non-empty string")
+
+    consequences = result.get("consequences")
+    if not isinstance(consequences, list):
+        errors.append("consequences must be a list")
+        consequences = []
+
+    for i, consequence in enumerate(consequences):
+        if not isinstance(consequence, dict):
+            errors.append(f"consequences[{i}] must be an object")
+            continue
+        fields = CONSEQUENCE_FIELDS.get(consequence.get("type"))
+        if fields is None:
+            errors.append(
+                f"consequences[{i}] has unknown type {consequence.get('type')!r}"
+            )
+            continue
+        for name, expected in fields.items():
+            value = consequence.get(name)
+            # bool is an int subclass, but never a valid amount
+            if not isinstance(value, expected) or isinstance(value, bool):
+                errors.append(f"consequences[{i}].{name} must be {expected.__name__}")
+        if (
+            consequence["type"] == "stat_change"
+            and consequence.get("stat") not in STAT_NAMES
+        ):
+            errors.append(f"consequences[{i}].stat is not a known stat")
+        if consequence["type"] == "item_gain" and isinstance(
+            consequence.get("item"), dict
+        ):
+            missing = [f for f in ITEM_FIELDS if f not in consequence["item"]]
+            if missing:
+                errors.append(f"consequences[{i}].item is missing {', '.join(missing)}")
+
+    next_options = result.get("next_options", [])
+    if not isinstance(next_options, list):
+        errors.append("next_options must be a list")
+        next_options = []
+    for i, option in enumerate(next_options):
+        if (
+            not isinstance(option, dict)
+            or not isinstance(option.get("id"), str)
+            or not isinstance(option.get("text"), str)
+        ):
+            errors.append(f"next_options[{i}] must have string id and text")
+
+    return errors
@@ -0,0 +1,104 @@
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from .character import STAT_NAMES
+from .event_log import EventType
+from .tracing import get_tracer
+
+
+@dataclass(frozen=True)
+class View:
+    name: str
+    # GameState fields (as in event_log.EVENT_FIELDS) the value depends on
+    inputs: Tuple[str, ...]
+    compute: Callable[..., Any]
+
+
+VIEWS: Dict[str, View] = {}
+
+
+def view(*inputs: str):
+    """Register a derived view of a GameEngine that depends on `inputs`"""
+
+    def register(compute: Callable[..., Any]):
+        VIEWS[compute.__name__] = View(compute.__name__, inputs, compute)
+        return compute
+
+    return register
+
+
+class DerivedState:
+    """Memoized derived views of one engine's GameState.
+
+    Every event renews the version stamps of the fields it changes, so a
+    view is recomputed only when one of its declared inputs has changed
+    since the last call (or when called with different arguments).
+    Changes made outside the event log must call event_log.touch.
+    """
+
+    def __init__(self, engine):
+        self.engine = engine
+        # view name -> (key, value) of the last computation
+        self._cache: Dict[str, Tuple[Tuple, Any]] = {}
+        self.stats = {"hits": 0, "misses": 0}
+
+    def get(self, name: str, *args) -> Any:
+        view = VIEWS[name]
+        versions = self.engine.state.versions
+        key = (args, tuple(versions.get(field) for field in view.inputs))
+        cached = self._cache.get(name)
+        if cached is not None and cached[0] == key:
+            self.stats["hits"] += 1
+            get_tracer().cache_lookup("derived_view", True)
+            return cached[1]
+
+        self.stats["misses"] += 1
+        get_tracer().cache_lookup("derived_view", False)
+        value = view.compute(self.engine, *args)
+        self._cache[name] = (key, value)
+        return value
+
+    def __getstate__(self):
+        # Stamps are only meaningful inside this process
+        state = self.__dict__.copy()
+        state["_cache"] = {}
+        return state
+
+
+# Events that set stats outright instead of adding to them
+_ABSOLUTE_STAT_EVENTS = {EventType.CHARACTER_CREATED, EventType.BRANCH_RESTORED}
+
+
+@view("player.stats", "time_fragments")
+def stat_deltas(engine, since: int) -> Optional[Dict[str, int]]:
+    """Stat and time fragment changes made by the events after `since`.
+
+    None when `since` is no longer in the log (e.g. after a rewind, or
+    once the events after it have left memory).
+    """
+    log = engine.events
+    if not log.base_seq <= since <= log.seq:
+        return None
+
+    deltas = dict.fromkeys(STAT_NAMES + ("time_fragments",), 0)
+    events = log.events_since(since)
+    if any(event.type in _ABSOLUTE_STAT_EVENTS for event in events):
+        before, now = log.state_at(since), engine.state
+        for stat in STAT_NAMES:
+            deltas[stat] = now.player.stats.get(stat) - before.player.stats.get(stat)
+        deltas["time_fragments"] = now.time_fragments - before.time_fragments
+        return deltas
+
+    for event in events:
+        if event.type == EventType.STAT_CHANGED:
+            changes = {event.payload["stat"]: event.payload["value"]}
+        elif event.type == EventType.STATS_CHANGED:
+            changes = event.payload["changes"]
+        elif event.type == EventType.FRAGMENTS_CHANGED:
+            changes = {"time_fragments": event.payload["amount"]}
+        else:
+            continue
+        for name, value in changes.items():
+            if name in deltas:
+                deltas[name] += value
+    return deltas
@@ -0,0 +1,166 @@
+from dataclasses import dataclass
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Tuple
+
+START_STATE = "start"
+
+# Condition keys a dialogue_states option can gate on under "when"
+CONDITION_KEYS = (
+    "min_trust",
+    "max_trust",
+    "min_relationship",
+    "max_relationship",
+    "quest_open",
+    "quest_done",
+    "new_loop",
+    "has_memories",
+)
+
+
+def default_dialogue_states(quests: Iterable[str]) -> Dict[str, Any]:
+    """The dialogue every NPC without its own dialogue_states offers"""
+    return {
+        START_STATE: [
+            {
+                "id": "friendly_greeting",
+                "text": "สวัสดี {player_name} เราเจอกันอีกแล้วนะ",
+                "when": {"new_loop": True, "min_relationship": 6},
+            },
+            {
+                "id": "neutral_greeting",
+                "text": "สวัสดี ท่านคือใคร?",
+                "when": {"new_loop": True, "max_relationship": 5},
+            },
+            *(
+                {
+                    "id": f"quest_{quest_id}",
+                    "text": f"เกี่ยวกับ{quest_id}...",
+                    "requires": {"trust_level": 3},
+                    "when": {"quest_open": quest_id},
+                }
+                for quest_id in quests
+            ),
+            {
+                "id": "remember_past",
+                "text": "ฉันจำได้ว่าเธอเคย...",
+                "requires": {"relationship_level": 7},
+                "when": {"has_memories": True},
+            },
+        ]
+    }
+
+
+@dataclass(frozen=True, slots=True)
+class Condition:
+    """When an option is offered; None fields are not checked"""
+
+    min_trust: Optional[int] = None
+    max_trust: Optional[int] = None
+    min_relationship: Optional[int] = None
+    max_relationship: Optional[int] = None
+    quest_open: Optional[str] = None
+    quest_done: Optional[str] = None
+    new_loop: Optional[bool] = None
+    has_memories: Optional[bool] = None
+
+    def holds(self, memory, new_loop: bool, completed: FrozenSet[str]) -> bool:
+        trust, relationship = memory.trust_level, memory.relationship_level
+        return (
+            (self.min_trust is None or trust >= self.min_trust)
+            and (self.max_trust is None or trust <= self.max_trust)
+            and (self.min_relationship is None or relationship >= self.min_relationship)
+            and (self.max_relationship is None or relationship <= self.max_relationship)
+            and (self.quest_open is None or self.quest_open not in completed)
+            and (self.quest_done is None or self.quest_done in completed)
+            and (self.new_loop is None or self.new_loop == new_loop)
+            and (
+                self.has_memories is None
+                or self.has_memories == bool(memory.player_actions)
+            )
+        )
+
+
+@dataclass(frozen=True, slots=True)
+class Transition:
+    option_id: str
+    text: str  # May contain {player_name}
+    target: str
+    condition: Condition
+    requires: Optional[Dict[str, int]] = None
+
+
+class DialogueMachine:
+    """An NPC's dialogue_states compiled into an indexed state machine.
+
+    Each state holds its transitions in order, plus an index from option
+    id to transition. An option is offered while its condition holds on
+    the NPC's memory (trust, relationship, remembered actions) and on two
+    player flags: whether this is the first talk this loop, and which of
+    the machine's quests the player has completed. Choosing it moves the
+    conversation to its "to" state (by default it stays put).
+    """
+
+    def __init__(self, states: Dict[str, Any]):
+        self.transitions: Dict[str, Tuple[Transition, ...]] = {}
+        self.index: Dict[str, Dict[str, Transition]] = {}
+        quests = set()
+        for state, options in states.items():
+            compiled = []
+            for option in options:
+                when = option.get("when") or {}
+                unknown = set(when) - set(CONDITION_KEYS)
+                if unknown:
+                    raise ValueError(
+                        f"Unknown dialogue conditions {sorted(unknown)} "
+                        f"in state {state!r}"
+                    )
+                condition = Condition(**when)
+                quests.update(
+                    q for q in (condition.quest_open, condition.quest_done) if q
+                )
+                compiled.append(
+                    Transition(
+                        option["id"],
+                        option["text"],
+                        option.get("to", state),
+                        condition,
+                        option.get("requires"),
+                    )
+                )
+            self.transitions[state] = tuple(compiled)
+            self.index[state] = {t.option_id: t for t in compiled}
+
+        for state, by_id in self.index.items():
+            for transition in by_id.values():
+                if transition.target not in self.transitions:
+                    raise ValueError(
+                        f"Dialogue option {transition.option_id!r} in state "
+                        f"{state!r} leads to unknown state {transition.target!r}"
+                    )
+        # Only completed quests the machine asks about affect its options
+        self.quests: FrozenSet[str] = frozenset(quests)
+
+    def flags(self, memory, player_state: Dict[str, Any]) -> Tuple:
+        """The player flags the options depend on, hashable for memoizing"""
+        return (
+            memory.last_interaction_loop < player_state.get("current_loop", 0),
+            self.quests.intersection(player_state.get("completed_quests", ())),
+            player_state.get("player_name", "ผู้เดินทาง"),
+        )
+
+    def options(self, state: str, memory, flags: Tuple) -> List[Dict[str, Any]]:
+        """Options offered in `state`, with their text filled in"""
+        new_loop, completed, player_name = flags
+        return [
+            {
+                "id": t.option_id,
+                "text": t.text.format(player_name=player_name),
+                "requires": t.requires,
+            }
+            for t in self.transitions.get(state, ())
+            if t.condition.holds(memory, new_loop, completed)
+        ]
+
+    def advance(self, state: str, option_id: str) -> str:
+        """The state choosing `option_id` in `state` leads to"""
+        transition = self.index.get(state, {}).get(option_id)
+        return transition.target if transition is not None else state
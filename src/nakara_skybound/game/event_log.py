@@ -0,0 +1,464 @@
+import base64
+import bisect
+import copy
+import itertools
+import json
+import os
+import pickle
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .character import CharacterClass, Item
+from .persistent import PMap, PVector, pmap, pvector
+from .time_system import TimeEra
+
+
+class EventType(Enum):
+    DECISION_RECORDED = "decision_recorded"
+    STAT_CHANGED = "stat_changed"
+    STATS_CHANGED = "stats_changed"
+    ITEM_GAINED = "item_gained"
+    QUEST_UPDATED = "quest_updated"
+    WORLD_CHANGED = "world_changed"
+    FRAGMENTS_CHANGED = "fragments_changed"
+    DAY_ADVANCED = "day_advanced"
+    LOCATION_CHANGED = "location_changed"
+    SCENE_CHANGED = "scene_changed"
+    ERA_CHANGED = "era_changed"
+    ERA_STATE_RESTORED = "era_state_restored"
+    LOOP_RESET = "loop_reset"
+    CHARACTER_CREATED = "character_created"
+    BRANCH_RESTORED = "branch_restored"
+
+
+@dataclass(frozen=True)
+class GameEvent:
+    seq: int
+    type: EventType
+    payload: Dict[str, Any]
+    # Loop and day after the event was applied, for day-level rewinds
+    loop: int
+    day: int
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "seq": self.seq,
+            "type": self.type.value,
+            "payload": self.payload,
+            "loop": self.loop,
+            "day": self.day,
+            "timestamp": self.timestamp,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "GameEvent":
+        return cls(
+            seq=data["seq"],
+            type=EventType(data["type"]),
+            payload=data["payload"],
+            loop=data["loop"],
+            day=data["day"],
+            timestamp=data["timestamp"],
+        )
+
+
+def item_to_data(item) -> Dict[str, Any]:
+    """Plain-dict form of an Item or item mapping, safe to log"""
+    if isinstance(item, Item):
+        return {
+            "id": item.id,
+            "name": item.name,
+            "description": item.description,
+            "type": item.type,
+            "power": item.power,
+            "magical_properties": dict(item.magical_properties),
+        }
+    return {
+        "id": item["id"],
+        "name": item["name"],
+        "description": item["description"],
+        "type": item["type"],
+        "power": item.get("power", 0),
+        "magical_properties": dict(item.get("magical_properties", {})),
+    }
+
+
+def _decision_recorded(state, payload):
+    record = dict(payload)
+    record["era"] = TimeEra(record["era"])
+    state.decisions_made.append(record)
+
+
+def _stat_changed(state, payload):
+    state.player.modify_stat(payload["stat"], payload["value"])
+
+
+def _stats_changed(state, payload):
+    state.player.modify_stats(payload["changes"])
+
+
+def _item_gained(state, payload):
+    state.player.add_item(Item(**payload["item"]))
+
+
+def _quest_updated(state, payload):
+    quest_id, status = payload["quest_id"], payload["status"]
+    if status == "started" and quest_id not in state.active_quests:
+        state.active_quests = state.active_quests.append(quest_id)
+    elif status == "completed":
+        if quest_id in state.active_quests:
+            state.active_quests = state.active_quests.remove(quest_id)
+        if quest_id not in state.completed_quests:
+            state.completed_quests = state.completed_quests.append(quest_id)
+
+
+def _world_changed(state, payload):
+    state.world_state = state.world_state.set(payload["key"], payload["value"])
+
+
+def _fragments_changed(state, payload):
+    state.time_fragments += payload["amount"]
+
+
+def _day_advanced(state, payload):
+    state.current_day += payload["amount"]
+
+
+def _location_changed(state, payload):
+    state.current_location = payload["location"]
+
+
+def _scene_changed(state, payload):
+    state.current_scene = payload["scene"]
+
+
+def _era_changed(state, payload):
+    state.current_era = TimeEra(payload["era"])
+
+
+def _era_state_restored(state, payload):
+    if "world_state" in payload:
+        state.world_state = state.world_state.update(payload["world_state"])
+    if "active_quests" in payload:
+        state.active_quests = pvector(payload["active_quests"])
+
+
+def _loop_reset(state, payload):
+    state.loop_count = payload["loop_count"]
+    state.current_day = 1
+    state.current_location = payload["location"]
+    state.current_scene = payload["scene"]
+
+
+def _character_created(state, payload):
+    state.player.name = payload["name"]
+    state.player.character_class = CharacterClass(payload["character_class"])
+    state.player._set_class_stats()
+    state.time_fragments = payload["time_fragments"]
+    state.current_scene = payload["scene"]
+
+
+def _branch_restored(state, payload):
+    # Persistent structures are adopted as-is, so switching never copies
+    state.world_state = pmap(payload["world_state"])
+    state.active_quests = pvector(payload["active_quests"])
+    state.current_era = TimeEra(payload["era"])
+    state.current_location = payload["location"]
+    state.time_fragments = payload["time_fragments"]
+    state.current_day = payload["day"]
+    for stat, value in payload["player_stats"].items():
+        setattr(state.player.stats, stat, value)
+
+
+REDUCERS: Dict[EventType, Callable[[Any, Dict[str, Any]], None]] = {
+    EventType.DECISION_RECORDED: _decision_recorded,
+    EventType.STAT_CHANGED: _stat_changed,
+    EventType.STATS_CHANGED: _stats_changed,
+    EventType.ITEM_GAINED: _item_gained,
+    EventType.QUEST_UPDATED: _quest_updated,
+    EventType.WORLD_CHANGED: _world_changed,
+    EventType.FRAGMENTS_CHANGED: _fragments_changed,
+    EventType.DAY_ADVANCED: _day_advanced,
+    EventType.LOCATION_CHANGED: _location_changed,
+    EventType.SCENE_CHANGED: _scene_changed,
+    EventType.ERA_CHANGED: _era_changed,
+    EventType.ERA_STATE_RESTORED: _era_state_restored,
+    EventType.LOOP_RESET: _loop_reset,
+    EventType.CHARACTER_CREATED: _character_created,
+    EventType.BRANCH_RESTORED: _branch_restored,
+}
+
+
+# GameState fields each event changes; derived views key on their versions
+EVENT_FIELDS: Dict[EventType, Tuple[str, ...]] = {
+    EventType.DECISION_RECORDED: ("decisions_made",),
+    EventType.STAT_CHANGED: ("player.stats",),
+    EventType.STATS_CHANGED: ("player.stats",),
+    EventType.ITEM_GAINED: ("player.inventory",),
+    EventType.QUEST_UPDATED: ("active_quests", "completed_quests"),
+    EventType.WORLD_CHANGED: ("world_state",),
+    EventType.FRAGMENTS_CHANGED: ("time_fragments",),
+    EventType.DAY_ADVANCED: ("current_day",),
+    EventType.LOCATION_CHANGED: ("current_location",),
+    EventType.SCENE_CHANGED: ("current_scene",),
+    EventType.ERA_CHANGED: ("current_era",),
+    EventType.ERA_STATE_RESTORED: ("world_state", "active_quests"),
+    EventType.LOOP_RESET: (
+        "loop_count",
+        "current_day",
+        "current_location",
+        "current_scene",
+    ),
+    EventType.CHARACTER_CREATED: (
+        "player",
+        "player.stats",
+        "time_fragments",
+        "current_scene",
+    ),
+    EventType.BRANCH_RESTORED: (
+        "world_state",
+        "active_quests",
+        "current_era",
+        "current_location",
+        "time_fragments",
+        "current_day",
+        "player.stats",
+    ),
+}
+
+STATE_FIELDS: Tuple[str, ...] = tuple(
+    sorted({name for names in EVENT_FIELDS.values() for name in names})
+)
+
+# Process-wide, so a stamp never means two different field values
+_stamps = itertools.count(1)
+
+
+def touch(state, *fields: str):
+    """Give `fields` of `state` a new version stamp after changing them"""
+    stamp = next(_stamps)
+    for name in fields:
+        state.versions[name] = stamp
+
+
+def _to_json(value):
+    if isinstance(value, PMap):
+        return dict(value.items())
+    if isinstance(value, PVector):
+        return list(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def apply_event(state, event: GameEvent):
+    """Apply one event to a GameState in place"""
+    REDUCERS[event.type](state, event.payload)
+    touch(state, *EVENT_FIELDS[event.type])
+
+
+def _snapshot(state):
+    """Deep copy of `state` for the log, sharing its recorded decisions.
+
+    world_state and active_quests are persistent and already shared, and
+    decision records are never changed once appended, so a snapshot costs
+    the player and a list of pointers rather than a copy of the history.
+    """
+    memo = {id(decision): decision for decision in state.decisions_made}
+    return copy.deepcopy(state, memo)
+
+
+class EventLog:
+    """Append-only log of every GameState change, with periodic snapshots.
+
+    Any earlier point is rebuilt from the nearest snapshot plus a replay
+    of at most `snapshot_every` events. Only the last `max_snapshots`
+    snapshots and the events since the oldest of them are kept in memory,
+    so rewinds reach back at most max_snapshots * snapshot_every events.
+    With a `path`, every event is also appended to a JSONL file as it
+    happens, so a session can be rebuilt after a crash by replaying the
+    file onto a fresh state. A log started over from a loaded state
+    begins its file with that state, and the replay starts from it.
+    """
+
+    def __init__(
+        self,
+        state,
+        snapshot_every: int = 50,
+        path: Optional[str] = None,
+        max_snapshots: int = 20,
+    ):
+        self.snapshot_every = snapshot_every
+        self.max_snapshots = max_snapshots
+        self.path = path
+        # Events after base_seq, the seq of the oldest kept snapshot
+        self.base_seq = 0
+        self.events: List[GameEvent] = []
+        # (number of events applied, copy of the state at that point)
+        self.snapshots: List[Tuple[int, Any]] = [(0, _snapshot(state))]
+        self._file = None
+        # 1 when the file starts with a base state line (see reset)
+        self._header_lines = 0
+
+    @property
+    def seq(self) -> int:
+        """Sequence number of the latest event (0 before any event)"""
+        return self.base_seq + len(self.events)
+
+    def record(self, state, event_type: EventType, **payload) -> GameEvent:
+        """Apply a change to `state` and append it to the log"""
+        REDUCERS[event_type](state, payload)
+        touch(state, *EVENT_FIELDS[event_type])
+        event = GameEvent(
+            seq=self.seq + 1,
+            type=event_type,
+            payload=payload,
+            loop=state.loop_count,
+            day=state.current_day,
+        )
+        self._append(state, event)
+        if self.path:
+            self._append_to_file(event)
+        return event
+
+    def _append(self, state, event: GameEvent):
+        self.events.append(event)
+        if event.seq % self.snapshot_every == 0:
+            self.snapshots.append((event.seq, _snapshot(state)))
+            if len(self.snapshots) > self.max_snapshots:
+                # Forget everything before the new oldest snapshot
+                del self.snapshots[0]
+                base_seq = self.snapshots[0][0]
+                del self.events[: base_seq - self.base_seq]
+                self.base_seq = base_seq
+
+    def state_at(self, seq: int):
+        """Rebuild the state as it was right after event `seq`"""
+        if not self.base_seq <= seq <= self.seq:
+            raise ValueError(
+                f"seq {seq} is outside the log ({self.base_seq}..{self.seq})"
+            )
+
+        index = bisect.bisect_right([s for s, _ in self.snapshots], seq) - 1
+        snapshot_seq, snapshot = self.snapshots[index]
+        state = _snapshot(snapshot)
+        for event in self.events[snapshot_seq - self.base_seq : seq - self.base_seq]:
+            apply_event(state, event)
+        return state
+
+    def events_since(self, seq: int) -> List[GameEvent]:
+        """Events after `seq`, of those still in memory"""
+        return self.events[max(seq - self.base_seq, 0) :]
+
+    def seq_for_day(self, loop: int, day: int) -> Optional[int]:
+        """Seq at which `day` of `loop` began, or None if out of reach"""
+        base = self.snapshots[0][1]
+        if self.base_seq:
+            if (loop, day) == (base.loop_count, base.current_day):
+                return None  # Began before the oldest kept event
+        elif loop == base.loop_count and day == 1:
+            return 0
+        for event in self.events:
+            if event.loop == loop and event.day == day:
+                return event.seq
+        return None
+
+    def truncate(self, seq: int):
+        """Drop every event after `seq`, e.g. after a rewind"""
+        del self.events[max(seq - self.base_seq, 0) :]
+        self.snapshots = [(s, state) for s, state in self.snapshots if s <= seq]
+        if self.path:
+            self._rewrite_file(keep=seq)
+
+    def reset(self, state):
+        """Start the log over from `state`, e.g. after loading a save"""
+        self.base_seq = 0
+        self.events = []
+        self.snapshots = [(0, _snapshot(state))]
+        if self.path:
+            self._rewrite_file(base=state)
+
+    def close(self):
+        """Close the event file; the next event reopens it"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def __getstate__(self):
+        # Snapshots are kept, so rewinds stay cheap after a rehydrate; they
+        # share persistent fields and decisions, which pickle stores once
+        state = self.__dict__.copy()
+        state["_file"] = None
+        return state
+
+    def __setstate__(self, state):
+        # Logs pickled before the window existed kept every event
+        self.__dict__.update(state)
+        self.__dict__.setdefault("base_seq", 0)
+        self.__dict__.setdefault("max_snapshots", 20)
+        self.__dict__.setdefault("_file", None)
+        self.__dict__.setdefault("_header_lines", 0)
+
+    def events_of_type(self, *event_types: EventType) -> List[GameEvent]:
+        return [event for event in self.events if event.type in event_types]
+
+    def _append_to_file(self, event: GameEvent):
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(
+            json.dumps(event.to_dict(), ensure_ascii=False, default=_to_json) + "\n"
+        )
+        self._file.flush()
+
+    def _rewrite_file(self, keep: int = 0, base=None):
+        """Cut the file down to its first `keep` events, or start it over.
+
+        The file holds every event since the log (re)started, including
+        those already dropped from memory, so it is cut rather than
+        rewritten from self.events. With a `base` state the file instead
+        starts over with just that state, for the replay to begin from.
+        """
+        self.close()
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            if base is not None:
+                encoded = base64.b64encode(pickle.dumps(base)).decode("ascii")
+                out.write(json.dumps({"base_state": encoded}) + "\n")
+                self._header_lines = 1
+            elif os.path.exists(self.path):
+                with open(self.path, "r", encoding="utf-8") as f:
+                    out.writelines(itertools.islice(f, self._header_lines + keep))
+        os.replace(tmp_path, self.path)
+
+    @classmethod
+    def from_file(
+        cls, path: str, state, snapshot_every: int = 50, max_snapshots: int = 20
+    ) -> Tuple["EventLog", Any]:
+        """Replay a JSONL event file; returns the log and the state it ends on.
+
+        The replay starts from the base state the file begins with, if it
+        has one (the log was reset), else from `state`, which it changes.
+        """
+        log = cls(state, snapshot_every, max_snapshots=max_snapshots)
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for number, line in enumerate(f):
+                    try:
+                        data = json.loads(line)
+                        if number == 0 and "base_state" in data:
+                            state = pickle.loads(base64.b64decode(data["base_state"]))
+                            log = cls(
+                                state, snapshot_every, max_snapshots=max_snapshots
+                            )
+                            log._header_lines = 1
+                            continue
+                        event = GameEvent.from_dict(data)
+                    except (json.JSONDecodeError, KeyError, ValueError):
+                        break  # Torn write at the crash point
+                    apply_event(state, event)
+                    log._append(state, event)
+        log.path = path
+        # Drop a torn tail so new events follow the last complete one
+        log._rewrite_file(keep=log.seq)
+        return log, state
@@ -0,0 +1,34 @@
+import gc
+import sys
+from enum import Enum
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import Optional, Set
+
+# Shared by the whole process (or immutable singletons), never per-session
+_SHARED = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType, Enum)
+
+
+def deep_size(obj, seen: Optional[Set[int]] = None) -> int:
+    """Bytes held by `obj` and everything reachable from it.
+
+    Objects whose id is in `seen` are skipped, and every object measured
+    is added to it, so measuring several roots with one `seen` counts a
+    shared object once, under the first root that reaches it. Classes,
+    functions, modules and enum members are never counted.
+    """
+    seen = set() if seen is None else seen
+    size = 0
+    stack = [obj]
+    while stack:
+        item = stack.pop()
+        if id(item) in seen or isinstance(item, _SHARED):
+            continue
+        seen.add(id(item))
+        size += sys.getsizeof(item)
+        stack.extend(gc.get_referents(item))
+    return size
+
+
+def exclude(*objects) -> Set[int]:
+    """A `seen` set that keeps deep_size out of `objects` (e.g. singletons)"""
+    return {id(obj) for obj in objects}
@@ -1,11 +1,29 @@
+import os
 from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Tuple
 
 from .character import Player
+from .commands import (
+    Command,
+    CommandResult,
+    CreateCharacter,
+    MoveTo,
+    TakeAction,
+    TravelThroughTime,
+    TriggerLoop,
+)
+from .derived import DerivedState
+from .event_log import STATE_FIELDS, EventLog, EventType, item_to_data, touch
+from .footprint import deep_size, exclude
 from .magic_system import MagicSystem
 from .memory_system import MemorySystem
 from .narrative_engine import NarrativeEngine
+from .persistent import PMap, PVector
+from .profiling import profiled
+from .recording import SessionRecorder, recorded
 from .time_system import TimeEra, TimeSystem
+from .tracing import get_tracer, traced
+from .turn_graph import get_turn_graph, wants_turn_graph
 from .world import World
 
 
@@ -15,34 +33,241 @@ class GameState:
     current_location: str = "central_plaza"
     current_scene: str = "game_start"
     player: Player = field(default_factory=Player)
-    world_state: Dict[str, Any] = field(default_factory=dict)
-    active_quests: List[str] = field(default_factory=list)
+    world_state: PMap = field(default_factory=PMap)
+    active_quests: PVector = field(default_factory=PVector)
+    completed_quests: PVector = field(default_factory=PVector)
     time_fragments: int = 0
     loop_count: int = 0
     current_day: int = 1  # Track current day in the 7-day cycle
     decisions_made: List[Dict[str, Any]] = field(default_factory=list)
+    # Version stamp per field, renewed by every event that changes it
+    versions: Dict[str, int] = field(default_factory=dict, repr=False, compare=False)
+
+    def __post_init__(self):
+        touch(self, *STATE_FIELDS)
+
+    def __setstate__(self, data):
+        # Copies and unpickled states get fresh stamps, so a view memoized
+        # in this process can never match a state from somewhere else
+        self.__dict__.update(data)
+        self.__dict__.setdefault("completed_quests", PVector())
+        self.versions = {}
+        touch(self, *STATE_FIELDS)
 
 
 class GameEngine:
-    def __init__(self):
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
         self.state = GameState()
+        self.events = EventLog(self.state, path=self._event_log_path(session_id))
         self.time_system = TimeSystem()
         self.world = World()
         self.magic_system = MagicSystem()
         self.memory_system = MemorySystem()
-        self.narrative_engine = NarrativeEngine()
+        self.narrative_engine = NarrativeEngine(session_id)
+        self.views = DerivedState(self)
+        # Input log for headless replay when NAKARA_RECORD_DIR is set
+        self.recorder = SessionRecorder.for_session(session_id)
+        self.narrative_engine.recording = self.recorder
+        # (checkpoint thread, decision id, choice) of a turn that failed
+        # midway; process-local, so it is not part of snapshot()
+        self.interrupted_turn: Optional[Tuple[str, str, str]] = None
 
         # Initialize world
         self.world.initialize_locations()
         self.world.populate_npcs()
+        self.narrative_engine.register_world(self.world)
 
     def get_current_state(self) -> GameState:
         return self.state
 
+    @staticmethod
+    def _event_log_path(session_id: str) -> Optional[str]:
+        """Write-through event file when NAKARA_EVENT_LOG_DIR is set"""
+        log_dir = os.getenv("NAKARA_EVENT_LOG_DIR")
+        if not log_dir:
+            return None
+        os.makedirs(log_dir, exist_ok=True)
+        return os.path.join(log_dir, f"{session_id}.jsonl")
+
+    def record(self, event_type: EventType, **payload):
+        """Apply a state change through the event log"""
+        return self.events.record(self.state, event_type, **payload)
+
+    @recorded("create_character")
+    @profiled("GameEngine.create_character")
+    def create_character(self, name: str, character_class: str):
+        """Finish character creation and hand out the starting fragments"""
+        self.record(
+            EventType.CHARACTER_CREATED,
+            name=name,
+            character_class=character_class,
+            time_fragments=2,
+            scene="character_created",
+        )
+
+    @recorded("move_to")
+    @profiled("GameEngine.move_to")
+    def move_to(self, location: str, advance_day: bool = False):
+        """Move the player to another location, optionally spending a day"""
+        self.record(EventType.LOCATION_CHANGED, location=location)
+        if advance_day:
+            self.record(EventType.DAY_ADVANCED, amount=1)
+        self.record(EventType.SCENE_CHANGED, scene="standard")
+
+    def set_scene(self, scene: str):
+        self.record(EventType.SCENE_CHANGED, scene=scene)
+
+    def rewind_to(self, seq: int) -> GameState:
+        """Rewind the session to right after event `seq`, dropping later events"""
+        self.state = self.events.state_at(seq)
+        self.events.truncate(seq)
+        return self.state
+
+    def rewind_to_day(self, loop: int, day: int) -> Optional[GameState]:
+        """Rewind to the start of a day, or None if that day was never reached"""
+        seq = self.events.seq_for_day(loop, day)
+        if seq is None:
+            return None
+        return self.rewind_to(seq)
+
+    @recorded("load_state")
+    def load_state(self, state: GameState):
+        """Continue from a loaded save; the event log restarts from it"""
+        self.state = state
+        self.events.reset(state)
+
+    def fork_timeline(self, branch_id: str):
+        """Save the current state as a what-if branch (O(1), shares all data)"""
+        return self.memory_system.timeline.fork(branch_id, self.state)
+
+    def switch_timeline(self, branch_id: str) -> bool:
+        """Resume a branch saved with fork_timeline, without copying it"""
+        branch = self.memory_system.timeline.switch_to(branch_id)
+        if branch is None:
+            return False
+        self.record(
+            EventType.BRANCH_RESTORED,
+            world_state=branch.world_state,
+            active_quests=branch.active_quests,
+            era=branch.era.value,
+            location=branch.location,
+            time_fragments=branch.time_fragments,
+            day=branch.day,
+            player_stats=dict(branch.player_stats),
+        )
+        return True
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Everything a session needs to resume, minus rebuildable systems"""
+        return {
+            "session_id": self.session_id,
+            "state": self.state,
+            "events": self.events,
+            "memory_system": self.memory_system,
+            "npc_memories": {
+                npc_id: npc.memory for npc_id, npc in self.world.npcs.items()
+            },
+        }
+
+    def close(self):
+        """Release what this process holds for the session outside the engine.
+
+        Called when the session leaves memory (hibernated, released or
+        dropped); the engine can still be snapshotted afterwards.
+        """
+        if self.interrupted_turn is not None:
+            get_turn_graph().discard(self)
+        self.events.close()
+        self.narrative_engine.close()
+
+    @classmethod
+    def from_snapshot(cls, data: Dict[str, Any]) -> "GameEngine":
+        """Rebuild an engine from snapshot(), with fresh World and LLM clients"""
+        engine = cls(data["session_id"])
+        engine.state = data["state"]
+        engine.events = data["events"]
+        engine.memory_system = data["memory_system"]
+        for npc_id, memory in data["npc_memories"].items():
+            if npc_id in engine.world.npcs:
+                engine.world.npcs[npc_id].memory.assign(memory)
+        return engine
+
+    @classmethod
+    def recover(cls, session_id: str) -> "GameEngine":
+        """Rebuild a session from its write-through event file after a crash"""
+        engine = cls(session_id)
+        if engine.events.path:
+            engine.events, engine.state = EventLog.from_file(
+                engine.events.path,
+                engine.state,
+                engine.events.snapshot_every,
+                engine.events.max_snapshots,
+            )
+        return engine
+
+    def footprint(self) -> Dict[str, Any]:
+        """Approximate bytes held by this session, per subsystem.
+
+        Objects shared between subsystems are counted once, under the
+        first one listed. Process-wide singletons (the LLM scheduler and
+        the variant pool) are left out. "collections" breaks down the
+        histories that grow with play, measured the same way.
+        """
+        narrative = self.narrative_engine
+        seen = exclude(narrative.scheduler, narrative.variant_pool)
+        collections_seen = set(seen)
+        subsystems = {
+            "state": self.state,
+            "events": self.events,
+            "memory_system": self.memory_system,
+            "world": self.world,
+            "time_system": self.time_system,
+            "magic_system": self.magic_system,
+            "narrative_engine": narrative,
+            "views": self.views,
+        }
+        collections = {
+            "decisions_made": self.state.decisions_made,
+            "decision_memories": self.memory_system.decision_memories,
+            "loop_memories": self.memory_system.loop_memories,
+            "npc_player_actions": [
+                npc.memory.player_actions for npc in self.world.npcs.values()
+            ],
+            "memory_fragments": self.state.player.memory_fragments,
+        }
+        sizes = {name: deep_size(obj, seen) for name, obj in subsystems.items()}
+        return {
+            "subsystems": sizes,
+            "total": sum(sizes.values()),
+            "collections": {
+                name: deep_size(obj, collections_seen)
+                for name, obj in collections.items()
+            },
+        }
+
+    @recorded("make_decision")
+    @traced("make_decision")
+    @profiled("GameEngine.make_decision")
     def make_decision(self, decision_id: str, choice: str) -> Dict[str, Any]:
         """Process player decision and update game state"""
-        # Record the decision
-        decision_record = {
+        if wants_turn_graph(self, decision_id):
+            return get_turn_graph().run(self, decision_id, choice)
+
+        decision_record = self._prepare_decision(decision_id, choice)
+        return self._conclude_decision(
+            decision_record,
+            self._narrate(decision_record),
+            self._npc_reactions(),
+            self._recall(decision_record),
+        )
+
+    # Steps of a decision turn; turn_graph.py runs the middle three in
+    # parallel. Only the last one changes state, so a turn that fails or is
+    # abandoned before it leaves no trace.
+
+    def _prepare_decision(self, decision_id: str, choice: str) -> Dict[str, Any]:
+        return {
             "id": decision_id,
             "choice": choice,
             "era": self.state.current_era,
@@ -50,23 +275,61 @@ class GameEngine:
             "loop": self.state.loop_count,
             "day": self.state.current_day,
         }
-        self.state.decisions_made.append(decision_record)
 
-        # Store in memory system for future loops
-        self.memory_system.store_decision(decision_record)
+    def _narrate(self, decision_record: Dict[str, Any]) -> Dict[str, Any]:
+        with get_tracer().span("process_decision"):
+            return self.narrative_engine.process_decision(decision_record, self.state)
+
+    def _npc_reactions(self) -> List[Dict[str, Any]]:
+        """How the NPCs here react to the player, from what they remember"""
+        reactions = []
+        for npc in self.world.get_npcs_in_location(self.state.current_location):
+            memory = npc.memory
+            if memory.relationship_level >= 5:
+                mood, text = "warm", f"{npc.name}ยิ้มให้คุณอย่างคุ้นเคย"
+            elif memory.relationship_level <= -3:
+                mood, text = "wary", f"{npc.name}มองคุณอย่างระแวง"
+            elif memory.player_actions:
+                mood, text = "curious", f"{npc.name}มองคุณราวกับเคยพบกันมาก่อน"
+            else:
+                continue
+            reactions.append(
+                {"npc_id": npc.id, "name": npc.name, "mood": mood, "text": text}
+            )
+        return reactions
+
+    def _recall(self, decision_record: Dict[str, Any]) -> List[int]:
+        """Earlier loops in which the player made the same choice here"""
+        return self.memory_system.loops_with_choice(
+            decision_record["choice"],
+            decision_record["location"],
+            decision_record["loop"],
+        )[-3:]
 
-        # Get narrative response
-        narrative_result = self.narrative_engine.process_decision(
-            decision_record, self.state
+    def _conclude_decision(
+        self,
+        decision_record: Dict[str, Any],
+        narrative_result: Dict[str, Any],
+        npc_reactions: List[Dict[str, Any]],
+        echoes: List[int],
+    ) -> Dict[str, Any]:
+        self.record(
+            EventType.DECISION_RECORDED,
+            **{**decision_record, "era": decision_record["era"].value},
         )
 
+        # Store in memory system for future loops
+        with get_tracer().span("store_decision"):
+            self.memory_system.store_decision(decision_record)
+
         # Update game state based on consequences (but don't auto-trigger loop)
-        self._apply_consequences(narrative_result["consequences"])
+        with get_tracer().span("apply_consequences"):
+            self._apply_consequences(narrative_result["consequences"])
 
         # Advance time slightly (but don't trigger loop automatically)
         # Only major story events should advance days
-        if decision_id in ["major_quest_complete", "important_choice"]:
-            self.state.current_day += 1
+        if decision_record["id"] in ["major_quest_complete", "important_choice"]:
+            self.record(EventType.DAY_ADVANCED, amount=1)
 
         # Check if 7 days have passed (but don't auto-trigger)
         if self.state.current_day > 7:
@@ -75,8 +338,15 @@ class GameEngine:
                 "narrative"
             ] += "\n\n⏰ 7 วันได้ผ่านไปแล้ว... คุณรู้สึกว่าเวลากำลังจะรีเซ็ต"
 
+        if npc_reactions:
+            narrative_result["npc_reactions"] = npc_reactions
+        if echoes:
+            narrative_result["echoes"] = echoes
         return narrative_result
 
+    @recorded("travel_through_time")
+    @traced("travel_through_time")
+    @profiled("GameEngine.travel_through_time")
     def travel_through_time(self, target_era: TimeEra) -> Dict[str, Any]:
         """Handle time travel between eras"""
         # Check if player can travel (stat requirements)
@@ -104,11 +374,11 @@ class GameEngine:
 
         # Change era
         old_era = self.state.current_era
-        self.state.current_era = target_era
+        self.record(EventType.ERA_CHANGED, era=target_era.value)
 
         # Consume time fragments
         if target_era != TimeEra.PRESENT:
-            self.state.time_fragments -= required_fragments
+            self.record(EventType.FRAGMENTS_CHANGED, amount=-required_fragments)
 
         # Load era-specific world state
         era_state = self.memory_system.get_era_state(target_era)
@@ -122,16 +392,21 @@ class GameEngine:
 
         return {"success": True, "narrative": travel_narrative, "new_era": target_era}
 
+    @recorded("trigger_time_loop")
+    @traced("trigger_time_loop")
+    @profiled("GameEngine.trigger_time_loop")
     def trigger_time_loop(self) -> Dict[str, Any]:
         """Handle the 7-day time loop reset - only when explicitly called"""
         # Store current loop memories
         self.memory_system.store_loop_memories(self.state.loop_count, self.state)
 
         # Reset certain states but keep memories
-        self.state.loop_count += 1
-        self.state.current_day = 1  # Reset day counter
-        self.state.current_location = "central_plaza"
-        self.state.current_scene = "loop_reset"
+        self.record(
+            EventType.LOOP_RESET,
+            loop_count=self.state.loop_count + 1,
+            location="central_plaza",
+            scene="loop_reset",
+        )
 
         # NPCs remember previous loops
         self.world.update_npc_memories(self.memory_system.get_loop_memories())
@@ -147,30 +422,94 @@ class GameEngine:
             "loop_count": self.state.loop_count,
         }
 
+    @recorded("execute")
+    @traced("turn")
+    @profiled("GameEngine.execute")
+    def execute(self, commands: List[Command]) -> List[CommandResult]:
+        """Apply commands queued by the UI, in order, in a single pass"""
+        return [
+            self._COMMAND_HANDLERS[type(command)](self, command) for command in commands
+        ]
+
+    def _execute_create_character(self, command: CreateCharacter) -> CommandResult:
+        self.create_character(command.name, command.character_class)
+        return CommandResult(command)
+
+    def _execute_move_to(self, command: MoveTo) -> CommandResult:
+        old_location = self.state.current_location
+        self.move_to(command.location, advance_day=command.advance_day)
+        return CommandResult(command, result={"old_location": old_location})
+
+    def _execute_take_action(self, command: TakeAction) -> CommandResult:
+        result = self.make_decision(command.decision_id, command.action)
+        self.set_scene("action_result")
+        return CommandResult(command, result=result)
+
+    def _execute_travel(self, command: TravelThroughTime) -> CommandResult:
+        result = self.travel_through_time(command.era)
+        if result["success"]:
+            self.set_scene("action_result")
+        return CommandResult(command, success=result["success"], result=result)
+
+    def _execute_trigger_loop(self, command: TriggerLoop) -> CommandResult:
+        result = self.trigger_time_loop()
+        if result["success"]:
+            self.set_scene("action_result")
+        return CommandResult(command, success=result["success"], result=result)
+
+    _COMMAND_HANDLERS = {
+        CreateCharacter: _execute_create_character,
+        MoveTo: _execute_move_to,
+        TakeAction: _execute_take_action,
+        TravelThroughTime: _execute_travel,
+        TriggerLoop: _execute_trigger_loop,
+    }
+
     def _apply_consequences(self, consequences: List[Dict[str, Any]]):
         """Apply decision consequences to game state"""
+        # Stat changes are summed into one batched event
+        stat_changes: Dict[str, int] = {}
         for consequence in consequences:
             if consequence["type"] == "stat_change":
-                self.state.player.modify_stat(consequence["stat"], consequence["value"])
+                stat = consequence["stat"]
+                stat_changes[stat] = stat_changes.get(stat, 0) + consequence["value"]
             elif consequence["type"] == "item_gain":
-                self.state.player.add_item(consequence["item"])
+                self.record(
+                    EventType.ITEM_GAINED, item=item_to_data(consequence["item"])
+                )
             elif consequence["type"] == "quest_update":
-                self._update_quest(consequence["quest_id"], consequence["status"])
+                self.record(
+                    EventType.QUEST_UPDATED,
+                    quest_id=consequence["quest_id"],
+                    status=consequence["status"],
+                )
             elif consequence["type"] == "world_change":
-                self.state.world_state[consequence["key"]] = consequence["value"]
+                self.record(
+                    EventType.WORLD_CHANGED,
+                    key=consequence["key"],
+                    value=consequence["value"],
+                )
+            elif consequence["type"] == "quest_start":
+                self.record(
+                    EventType.QUEST_UPDATED,
+                    quest_id=consequence.get("quest_name", "ภารกิจใหม่"),
+                    status="started",
+                )
             elif consequence["type"] == "time_fragment":
-                self.state.time_fragments += consequence["amount"]
+                self.record(EventType.FRAGMENTS_CHANGED, amount=consequence["amount"])
+            elif consequence["type"] == "day_advance":
+                self.record(EventType.DAY_ADVANCED, amount=consequence["amount"])
+
+        if stat_changes:
+            self.record(EventType.STATS_CHANGED, changes=stat_changes)
 
     def _apply_era_state(self, era_state: Dict[str, Any]):
         """Apply saved era state to current game state"""
-        if "world_state" in era_state:
-            self.state.world_state.update(era_state["world_state"])
-        if "active_quests" in era_state:
-            self.state.active_quests = era_state["active_quests"]
-
-    def _update_quest(self, quest_id: str, status: str):
-        """Update quest status"""
-        if status == "started" and quest_id not in self.state.active_quests:
-            self.state.active_quests.append(quest_id)
-        elif status == "completed" and quest_id in self.state.active_quests:
-            self.state.active_quests.remove(quest_id)
+        self.record(
+            EventType.ERA_STATE_RESTORED,
+            **{
+                key: era_state[key]
+                for key in ("world_state", "active_quests")
+                if key in era_state
+            },
+        )
@@ -0,0 +1,253 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0  # process_decision - a player is waiting on the result
+    NARRATIVE = 1  # time travel and loop reset scenes
+    BACKGROUND = 2  # speculative, pool refill and batch generation
+
+
+class LLMRateLimited(Exception):
+    """Raised when a request could not get an LLM slot before its timeout"""
+
+
+class TokenBucket:
+    def __init__(
+        self,
+        capacity: float,
+        refill_per_second: float,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = capacity
+        self.updated_at = clock()
+
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        if elapsed > 0:
+            self.tokens = min(
+                self.capacity, self.tokens + elapsed * self.refill_per_second
+            )
+            self.updated_at = now
+
+    def time_until(self, amount: float, now: float) -> float:
+        """Seconds until `amount` tokens are available (0 if available now)"""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.refill_per_second
+
+    def consume(self, amount: float, now: float):
+        """Take tokens out of the bucket; the balance may go negative"""
+        self._refill(now)
+        self.tokens -= amount
+
+
+@dataclass(eq=False)
+class Ticket:
+    session_id: str
+    priority: Priority
+    estimated_tokens: int
+    enqueued_at: float = field(default_factory=time.monotonic)
+    granted_at: Optional[float] = None
+
+    @property
+    def wait_time(self) -> float:
+        if self.granted_at is None:
+            return time.monotonic() - self.enqueued_at
+        return self.granted_at - self.enqueued_at
+
+
+class LLMScheduler:
+    """Process-wide gate in front of every LLM completion.
+
+    Requests and tokens per minute are enforced with two token buckets.
+    Waiting requests are served strictly by priority and round-robin across
+    sessions within a priority, so one busy player cannot starve the rest.
+    `clock` is the time source for the buckets and wait times (tests pass
+    a fake one).
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: int = 500,
+        tokens_per_minute: int = 200_000,
+        wait_samples: int = 1000,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.clock = clock
+        self.request_bucket = TokenBucket(
+            requests_per_minute, requests_per_minute / 60, clock
+        )
+        self.token_bucket = TokenBucket(
+            tokens_per_minute, tokens_per_minute / 60, clock
+        )
+
+        self._cond = threading.Condition()
+        self._queues: Dict[Priority, "OrderedDict[str, Deque[Ticket]]"] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        self._wait_samples: Dict[Priority, Deque[float]] = {
+            priority: deque(maxlen=wait_samples) for priority in Priority
+        }
+        self._granted: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._rate_limited: Dict[Priority, int] = {priority: 0 for priority in Priority}
+        self._tokens_used = 0
+
+    def _head(self) -> Optional[Ticket]:
+        """Next ticket to serve: highest priority, oldest session in rotation"""
+        for priority in Priority:
+            sessions = self._queues[priority]
+            if sessions:
+                return next(iter(sessions.values()))[0]
+        return None
+
+    def _enqueue(self, ticket: Ticket):
+        sessions = self._queues[ticket.priority]
+        if ticket.session_id not in sessions:
+            sessions[ticket.session_id] = deque()
+        sessions[ticket.session_id].append(ticket)
+
+    def _dequeue(self, ticket: Ticket, rotate: bool):
+        sessions = self._queues[ticket.priority]
+        pending = sessions[ticket.session_id]
+        pending.remove(ticket)
+        if not pending:
+            del sessions[ticket.session_id]
+        elif rotate:
+            # Move the session to the back so other sessions get the next slot
+            sessions.move_to_end(ticket.session_id)
+
+    def acquire(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+        session_id: str = "default",
+        estimated_tokens: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Ticket:
+        """Block until the caller may issue one LLM request"""
+        ticket = Ticket(session_id, Priority(priority), estimated_tokens, self.clock())
+        deadline = None if timeout is None else ticket.enqueued_at + timeout
+
+        with self._cond:
+            self._enqueue(ticket)
+            while True:
+                now = self.clock()
+                wait = None
+                if self._head() is ticket:
+                    wait = max(
+                        self.request_bucket.time_until(1, now),
+                        self.token_bucket.time_until(estimated_tokens, now),
+                    )
+                    if wait == 0:
+                        self.request_bucket.consume(1, now)
+                        self.token_bucket.consume(estimated_tokens, now)
+                        ticket.granted_at = now
+                        self._dequeue(ticket, rotate=True)
+                        self._granted[ticket.priority] += 1
+                        self._wait_samples[ticket.priority].append(ticket.wait_time)
+                        self._cond.notify_all()
+                        return ticket
+
+                if deadline is not None:
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._dequeue(ticket, rotate=False)
+                        self._rate_limited[ticket.priority] += 1
+                        self._cond.notify_all()
+                        raise LLMRateLimited(
+                            f"no LLM slot for {ticket.priority.name} request "
+                            f"after {timeout:.1f}s"
+                        )
+                    wait = remaining if wait is None else min(wait, remaining)
+
+                self._cond.wait(timeout=wait)
+
+    def record_usage(self, ticket: Ticket, actual_tokens: Optional[int]):
+        """Correct the token bucket once the real token count is known"""
+        if actual_tokens is None:
+            return
+        with self._cond:
+            self.token_bucket.consume(
+                actual_tokens - ticket.estimated_tokens, self.clock()
+            )
+            self._tokens_used += actual_tokens
+
+    @contextmanager
+    def slot(
+        self,
+        priority: Priority = Priority.INTERACTIVE,
+        session_id: str = "default",
+        estimated_tokens: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Iterator[Ticket]:
+        """Context manager form of `acquire`"""
+        yield self.acquire(priority, session_id, estimated_tokens, timeout)
+
+    def submit(
+        self,
+        fn: Callable[[], Any],
+        priority: Priority = Priority.INTERACTIVE,
+        session_id: str = "default",
+        estimated_tokens: int = 0,
+        timeout: Optional[float] = None,
+    ) -> Any:
+        """Run `fn` once a slot is granted and return its result"""
+        with self.slot(priority, session_id, estimated_tokens, timeout):
+            return fn()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Queue depth and wait-time statistics per priority class"""
+        with self._cond:
+            metrics: Dict[str, Any] = {
+                "queue_depth": 0,
+                "tokens_used": self._tokens_used,
+                "request_tokens_available": self.request_bucket.tokens,
+                "llm_tokens_available": self.token_bucket.tokens,
+                "priorities": {},
+            }
+            for priority in Priority:
+                depth = sum(len(q) for q in self._queues[priority].values())
+                samples = sorted(self._wait_samples[priority])
+                metrics["queue_depth"] += depth
+                metrics["priorities"][priority.name.lower()] = {
+                    "queue_depth": depth,
+                    "waiting_sessions": len(self._queues[priority]),
+                    "granted": self._granted[priority],
+                    "rate_limited": self._rate_limited[priority],
+                    "wait_p50": _percentile(samples, 0.50),
+                    "wait_p95": _percentile(samples, 0.95),
+                    "wait_max": samples[-1] if samples else 0.0,
+                }
+            return metrics
+
+
+def _percentile(samples, fraction: float) -> float:
+    if not samples:
+        return 0.0
+    return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+_scheduler: Optional[LLMScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> LLMScheduler:
+    """Return the process-wide scheduler, configured from the environment"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler(
+                requests_per_minute=int(os.getenv("NAKARA_LLM_RPM", "500")),
+                tokens_per_minute=int(os.getenv("NAKARA_LLM_TPM", "200000")),
+            )
+        return _scheduler
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import random
+import re
+import time
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+# Pieces the stub stitches together so repeated prompts still vary a little
+_OPENINGS = [
+    "สายลมแห่งกาลเวลาพัดผ่าน",
+    "เสียงระฆังดังแว่วมาจากที่ไกล",
+    "แสงสุดท้ายของวันทาบทาลงบนหลังคาทอง",
+    "กลิ่นธูปจางๆ ลอยมาตามลม",
+]
+_OUTCOMES = [
+    "คุณได้เรียนรู้บางสิ่งที่ไม่เคยรู้มาก่อน",
+    "ผู้คนรอบตัวเริ่มมองคุณด้วยสายตาที่เปลี่ยนไป",
+    "เศษเสี้ยวของความทรงจำจากรอบก่อนผุดขึ้นในใจ",
+    "คุณรู้สึกว่าวัฏจักรเวลาสั่นไหวเล็กน้อย",
+]
+_STATS = ["wisdom", "strength", "karma", "mysticism", "charisma"]
+
+
+class StubLLMClient:
+    """Offline stand-in for the OpenAI client used by NarrativeEngine.
+
+    Responses are deterministic for a given prompt and always match the
+    shape the engine asks for, so batch jobs and benchmarks can run
+    without network access. Set NAKARA_LLM_BACKEND=stub to use it.
+    """
+
+    model = "local-stub"
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = 0
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, model: str, messages: List[Dict[str, str]], **kwargs) -> Any:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+        prompt = messages[-1]["content"]
+        seed = int.from_bytes(hashlib.sha256(prompt.encode()).digest()[:8], "big")
+        rng = random.Random(seed)
+
+        if '"npcs"' in prompt:
+            content = json.dumps(
+                {
+                    "npcs": [
+                        {"id": npc_id, "line": rng.choice(_OUTCOMES), "options": []}
+                        for npc_id in re.findall(r"NPC_ID: (\w+)", prompt)
+                    ]
+                },
+                ensure_ascii=False,
+            )
+        elif '"variants"' in prompt:
+            content = json.dumps(
+                {"variants": [self._decision(rng) for _ in range(4)]},
+                ensure_ascii=False,
+            )
+        elif '"narrative"' in prompt:
+            content = json.dumps(self._decision(rng), ensure_ascii=False)
+        else:
+            content = f"{rng.choice(_OPENINGS)} {rng.choice(_OUTCOMES)}"
+
+        prompt_tokens = len(prompt) // 2
+        completion_tokens = len(content) // 2
+        return SimpleNamespace(
+            model=self.model,
+            choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+            usage=SimpleNamespace(
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                total_tokens=prompt_tokens + completion_tokens,
+            ),
+        )
+
+    def _decision(self, rng: random.Random) -> Dict[str, Any]:
+        return {
+            "narrative": f"{rng.choice(_OPENINGS)} {rng.choice(_OUTCOMES)}",
+            "consequences": [
+                {"type": "stat_change", "stat": rng.choice(_STATS), "value": 1},
+                {"type": "day_advance", "amount": 1},
+            ],
+            "next_options": [
+                {"id": "explore", "text": "สำรวจต่อไป"},
+                {"id": "meditate", "text": "ทำสมาธิ"},
+            ],
+        }
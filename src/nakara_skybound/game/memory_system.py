@@ -1,8 +1,9 @@
 import json
 from dataclasses import dataclass, field
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Set, Tuple
 
 from .time_system import TimeEra
+from .timeline import Timeline
 
 
 @dataclass
@@ -17,14 +18,28 @@ class MemoryFragment:
 class MemorySystem:
     def __init__(self):
         self.decision_memories: List[Dict[str, Any]] = []
-        self.era_states: Dict[TimeEra, Dict[str, Any]] = {}
+        self.timeline = Timeline()
         self.loop_memories: Dict[int, Dict[str, Any]] = {}
         self.npc_memories: Dict[str, List[Dict[str, Any]]] = {}
         self.important_events: List[MemoryFragment] = []
+        # (choice, location) -> loops in which it was chosen there
+        self.choice_loops: Dict[Tuple[str, str], Set[int]] = {}
+
+    def __setstate__(self, data):
+        self.__dict__.update(data)
+        if "choice_loops" not in data:  # Pickled before the index existed
+            self.choice_loops = {}
+            for decision in self.decision_memories:
+                self._index_decision(decision)
+
+    def _index_decision(self, decision: Dict[str, Any]):
+        key = (decision.get("choice"), decision.get("location"))
+        self.choice_loops.setdefault(key, set()).add(decision.get("loop", 0))
 
     def store_decision(self, decision: Dict[str, Any]):
         """Store a player decision for future reference"""
         self.decision_memories.append(decision.copy())
+        self._index_decision(decision)
 
         # If it's an important decision, create a memory fragment
         if decision.get("importance", 0) > 5:
@@ -37,25 +52,26 @@ class MemorySystem:
             )
             self.important_events.append(fragment)
 
+    @staticmethod
+    def era_branch_id(era: TimeEra) -> str:
+        return f"era:{era.value}"
+
     def store_era_state(self, era: TimeEra, game_state):
-        """Store the current state of an era"""
-        era_data = {
-            "world_state": game_state.world_state.copy(),
-            "active_quests": game_state.active_quests.copy(),
-            "location": game_state.current_location,
-            "player_stats": {
-                "wisdom": game_state.player.stats.wisdom,
-                "strength": game_state.player.stats.strength,
-                "karma": game_state.player.stats.karma,
-                "mysticism": game_state.player.stats.mysticism,
-                "charisma": game_state.player.stats.charisma,
-            },
-        }
-        self.era_states[era] = era_data
+        """Store the current state of an era (an O(1) timeline fork)"""
+        self.timeline.fork(self.era_branch_id(era), game_state)
 
     def get_era_state(self, era: TimeEra) -> Dict[str, Any]:
         """Get stored state for an era"""
-        return self.era_states.get(era, {})
+        branch = self.timeline.get(self.era_branch_id(era))
+        return branch.to_era_state() if branch else {}
+
+    @property
+    def era_states(self) -> Dict[TimeEra, Dict[str, Any]]:
+        return {
+            era: self.get_era_state(era)
+            for era in TimeEra
+            if self.era_branch_id(era) in self.timeline
+        }
 
     def store_loop_memories(self, loop_number: int, game_state):
         """Store memories from a completed loop"""
@@ -89,6 +105,13 @@ class MemorySystem:
         """Get stored memories for a specific NPC"""
         return self.npc_memories.get(npc_id, [])
 
+    def loops_with_choice(
+        self, choice: str, location: str, before_loop: int
+    ) -> List[int]:
+        """Loops before `before_loop` in which `choice` was made at `location`"""
+        loops = self.choice_loops.get((choice, location), ())
+        return sorted(loop for loop in loops if loop < before_loop)
+
     def get_decisions_by_era(self, era: TimeEra) -> List[Dict[str, Any]]:
         """Get all decisions made in a specific era"""
         return [
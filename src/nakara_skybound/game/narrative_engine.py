@@ -1,26 +1,66 @@
 import json
 import os
-from typing import Any, Dict, List
+import threading
+import time
+from typing import Any, Dict, List, Optional
 
 from dotenv import load_dotenv
 from openai import OpenAI
 
 load_dotenv()
 
+from .decision_schema import validate_decision
+from .llm_scheduler import Priority, get_scheduler
+from .llm_stub import StubLLMClient
+from .narrative_templates import render_basic_action
+from .npc_dialogue import DialogueGenerator
+from .procedural_narrative import ProceduralNarrator
 from .time_system import TimeEra
+from .tracing import get_tracer
+from .usage import UsageRecord, get_usage_ledger, price_of
+from .variant_pool import PoolKey, get_variant_pool, make_pool_key
 
 
 class NarrativeEngine:
-    def __init__(self):
+    # How long each priority class may wait for an LLM slot before we fall back
+    slot_timeouts = {
+        Priority.INTERACTIVE: 10.0,
+        Priority.NARRATIVE: 20.0,
+        Priority.BACKGROUND: None,
+    }
+
+    def __init__(self, session_id: str = "default"):
+        self.session_id = session_id
+        self.scheduler = get_scheduler()
+
         # Initialize OpenAI client properly
         api_key = os.getenv("OPENAI_API_KEY")
-        if api_key:
+        if os.getenv("NAKARA_LLM_BACKEND") == "stub":
+            self.client = StubLLMClient()
+            self.openai_available = True
+        elif api_key:
             self.client = OpenAI(api_key=api_key)
             self.openai_available = True
         else:
             self.client = None
             self.openai_available = False
 
+        # Zero-latency grammar tier used whenever GPT is unavailable or limited
+        self.procedural = ProceduralNarrator()
+
+        # SessionRecorder or Playback, set by GameEngine (see recording.py)
+        self.recording = None
+
+        # Batched NPC lines for talk_to_<npc id>, cached per NPC memory version
+        self.world = None
+        self.dialogue = DialogueGenerator(self)
+
+        # Shared pre-generated narratives; refilled in the background via GPT
+        self.variants_per_refill = 4
+        self.variant_pool = get_variant_pool()
+        if self.openai_available:
+            self.variant_pool.set_generator(generate_pool_variants)
+
         self.system_prompt = """
         คุณเป็น AI ที่สร้างเนื้อเรื่องสำหรับเกม RPG ไทย "ตำนานนครางกลับฟ้า: วัฏจักรกาล"
         
@@ -41,11 +81,29 @@ class NarrativeEngine:
         ตอบเป็น JSON เสมอ
         """
 
+    def close(self):
+        """Forget the session's pool history once it leaves memory"""
+        self.variant_pool.forget_player(self.session_id)
+
     def process_decision(self, decision: Dict[str, Any], game_state) -> Dict[str, Any]:
         """Process a player decision and generate narrative response"""
 
-        # Handle basic actions with fallback narratives
+        npc = self._talk_target(decision)
+        if npc is not None:
+            return self._npc_talk(npc, game_state)
+
+        # Handle basic actions from the variant pool, then fallback narratives
         if decision["id"] == "general_action":
+            key = self._pool_key(decision["choice"], game_state)
+            if self.recording is not None:
+                variant = self.recording.draw(
+                    lambda: self.variant_pool.draw(key, self.session_id)
+                )
+            else:
+                variant = self.variant_pool.draw(key, self.session_id)
+            get_tracer().cache_lookup("variant_pool", variant is not None)
+            if variant:
+                return variant
             return self._handle_basic_action(decision["choice"], game_state)
 
         # Try GPT first if available
@@ -58,6 +116,10 @@ class NarrativeEngine:
         else:
             return self._get_fallback_narrative(decision, game_state)
 
+    def needs_llm(self, decision_id: str) -> bool:
+        """Whether process_decision will wait on the LLM for this decision"""
+        return self.openai_available and decision_id != "general_action"
+
     def _generate_with_gpt(
         self, decision: Dict[str, Any], game_state
     ) -> Dict[str, Any]:
@@ -92,188 +154,183 @@ class NarrativeEngine:
         }}
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4o-mini",
-            messages=[
-                {"role": "system", "content": self.system_prompt},
-                {"role": "user", "content": prompt},
-            ],
+        response = self._complete(
+            prompt,
+            Priority.INTERACTIVE,
             temperature=0.8,
             max_tokens=1200,
+            call_type="decision",
+            game_state=game_state,
         )
 
         result = json.loads(response.choices[0].message.content)
         return result
 
-    def _handle_basic_action(self, action: str, game_state) -> Dict[str, Any]:
-        """Handle basic game actions with enhanced variety and day advancement"""
-
-        # Location-specific actions
-        location_actions = self._get_location_specific_actions(action, game_state)
-        if location_actions:
-            return location_actions
-
-        # Era-specific content
-        era_specific_content = {
-            TimeEra.PAST: {
-                "explore": {
-                    "narrative": f"{game_state.player.name} สำรวจรอบๆ เมืองโบราณ... ผู้คนสวมชุดไทยประจำชาติ เสียงระฆังวัดดังไกล คุณเห็นนักเวทย์กำลังร่ายมนตร์อยู่ริมถนน และได้เรียนรู้เกี่ยวกับเวทมนตร์โบราณ วันหนึ่งผ่านไปอย่างมีความหมาย",
-                    "consequences": [
-                        {"type": "stat_change", "stat": "wisdom", "value": 2},
-                        {"type": "stat_change", "stat": "mysticism", "value": 1},
-                        {"type": "day_advance", "amount": 1},
-                        {"type": "time_fragment", "amount": 1},
-                    ],
-                }
-            },
-            TimeEra.FUTURE: {
-                "explore": {
-                    "narrative": f"{game_state.player.name} สำรวจโลกอนาคต... เทคโนโลยีและเวทมนตร์ผสมผสานกัน คุณเห็นผลลัพธ์ของการกระทำในอดีต {'เมืองเจริญรุ่งเรืองเต็มไปด้วยความสุข' if game_state.player.stats.karma > 0 else 'เมืองร้างเปล่าและเต็มไปด้วยความเศร้า'} การสำรวจทำให้คุณเข้าใจถึงผลของกรรม",
-                    "consequences": [
-                        {"type": "stat_change", "stat": "wisdom", "value": 3},
-                        {
-                            "type": "stat_change",
-                            "stat": "karma",
-                            "value": 1 if game_state.player.stats.karma > 0 else -1,
-                        },
-                        {"type": "day_advance", "amount": 1},
-                    ],
-                }
-            },
-        }
+    def _talk_target(self, decision: Dict[str, Any]):
+        """The NPC a talk_to_<npc id> choice is addressed to, if any"""
+        choice = decision["choice"]
+        if self.world is None or not choice.startswith("talk_to_"):
+            return None
+        return self.world.npcs.get(choice[len("talk_to_") :])
 
-        # Get era-specific content or fall back to present
-        current_era_content = era_specific_content.get(game_state.current_era, {})
-        if action in current_era_content:
-            return current_era_content[action]
+    def _npc_talk(self, npc, game_state) -> Dict[str, Any]:
+        dialogue = self.dialogue.dialogue_for(npc, self.world, game_state)
+        return {
+            "narrative": f"{npc.name}: {dialogue['line']}",
+            "consequences": [{"type": "stat_change", "stat": "charisma", "value": 1}],
+            "next_options": [dict(option) for option in dialogue["options"]]
+            or [{"id": "explore", "text": "สำรวจต่อไป"}],
+        }
 
-        # Default present-day actions with loop awareness
-        loop_modifier = (
-            ""
-            if game_state.loop_count == 0
-            else f" (รอบที่ {game_state.loop_count + 1}: คุณรู้สึกคุ้นเคยกับสถานที่นี้)"
+    def register_world(self, world):
+        """Allow background variant generation for the world's location actions"""
+        self.world = world
+        for location in world.locations.values():
+            self.variant_pool.register_actions(location.id, location.available_actions)
+            self.procedural.location_actions[location.id] = location.available_actions
+
+    def _pool_key(self, action: str, game_state) -> PoolKey:
+        return make_pool_key(
+            game_state.current_location,
+            game_state.current_era,
+            action,
+            game_state.player.stats.karma,
         )
 
-        action_responses = {
-            "explore": {
-                "narrative": f"{game_state.player.name} เดินสำรวจรอบๆ จัตุรัสกลางเมือง{loop_modifier}... ผู้คนต่างมองมาด้วยสายตาแปลกๆ บางคนเหมือนจะจำคุณได้ คุณพบร่องรอยเวทมนตร์โบราณ และได้พบกับนักเดินทางคนอื่นๆ วันหนึ่งผ่านไปอย่างมีความหมาย",
-                "consequences": [
-                    {"type": "stat_change", "stat": "wisdom", "value": 1},
-                    {"type": "day_advance", "amount": 1},
-                    {
-                        "type": "item_gain",
-                        "item": {
-                            "id": "clue1",
-                            "name": "เบาะแสลึกลับ",
-                            "description": "ข้อมูลที่อาจมีประโยชน์",
-                            "type": "information",
-                            "power": 0,
-                            "magical_properties": {},
-                        },
-                    },
-                ],
-                "next_options": [
-                    {"id": "continue_explore", "text": "สำรวจลึกขึ้น"},
-                    {"id": "talk_to_people", "text": "เข้าไปคุยกับใครสักคน"},
-                    {"id": "meditate", "text": "นั่งสมาธิเพื่อใคร่ครวญ"},
-                ],
-            },
-            # ...existing actions...
-        }
+    def generate_variants(self, key: PoolKey) -> List[Dict[str, Any]]:
+        """Generate several narratives for one pool key in a single call"""
+        location, era, action, band = key
+        prompt = f"""
+        สร้างเรื่องเล่า {self.variants_per_refill} แบบที่แตกต่างกัน สำหรับการกระทำ: {action}
+        สถานที่: {location}
+        ยุค: {era}
+        กรรมของผู้เล่น: {band}
+
+        เรียกผู้เล่นว่า "คุณ" เท่านั้น ห้ามใช้ชื่อ
 
-        return action_responses.get(
-            action, self._get_fallback_narrative({"choice": action}, game_state)
+        ตอบเป็น JSON:
+        {{
+            "variants": [
+                {{
+                    "narrative": "เรื่องเล่าที่สมบูรณ์ (ภาษาไทย)",
+                    "consequences": [
+                        {{"type": "stat_change", "stat": "wisdom", "value": 1}},
+                        {{"type": "day_advance", "amount": 1}}
+                    ],
+                    "next_options": [
+                        {{"id": "explore", "text": "สำรวจต่อไป"}}
+                    ]
+                }}
+            ]
+        }}
+        """
+
+        # Refills are shared by every session, so they are never recorded
+        response = self._request(
+            prompt,
+            Priority.BACKGROUND,
+            temperature=1.0,
+            max_tokens=2400,
+            call_type="variants",
+        )
+        variants = json.loads(response.choices[0].message.content)["variants"]
+        return [variant for variant in variants if not validate_decision(variant)]
+
+    def _complete(
+        self,
+        prompt: str,
+        priority: Priority,
+        temperature: float,
+        max_tokens: int,
+        call_type: str,
+        game_state=None,
+    ):
+        """Run one chat completion, recorded or served from a recording"""
+        args = (prompt, priority, temperature, max_tokens, call_type, game_state)
+        if self.recording is not None:
+            return self.recording.complete(lambda: self._request(*args))
+        return self._request(*args)
+
+    def _request(
+        self,
+        prompt: str,
+        priority: Priority,
+        temperature: float,
+        max_tokens: int,
+        call_type: str,
+        game_state=None,
+    ):
+        """Run one chat completion through the process-wide LLM scheduler.
+
+        Its usage is charged to `call_type` and, when given, the loop and
+        location of `game_state`.
+        """
+        # Character-count estimate; record_usage corrects it with the real count
+        estimated_tokens = len(self.system_prompt) + len(prompt) + max_tokens
+
+        tracer = get_tracer()
+        with tracer.span("llm_wait", priority=priority.name.lower()):
+            ticket = self.scheduler.acquire(
+                priority,
+                self.session_id,
+                estimated_tokens,
+                timeout=self.slot_timeouts.get(priority),
+            )
+        with tracer.span("llm_call", model="gpt-4o-mini") as span:
+            started = time.perf_counter()
+            response = self.client.chat.completions.create(
+                model="gpt-4o-mini",
+                messages=[
+                    {"role": "system", "content": self.system_prompt},
+                    {"role": "user", "content": prompt},
+                ],
+                temperature=temperature,
+                max_tokens=max_tokens,
+            )
+            latency = time.perf_counter() - started
+
+            usage = getattr(response, "usage", None)
+            total_tokens = getattr(usage, "total_tokens", None)
+            if total_tokens is not None:
+                span.set(tokens=total_tokens)
+                tracer.observe_tokens(total_tokens, priority=priority.name.lower())
+        self.scheduler.record_usage(ticket, total_tokens)
+        self._record_usage(response, latency, call_type, game_state)
+        return response
+
+    def _record_usage(self, response, latency: float, call_type: str, game_state):
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", None) or 0
+        completion_tokens = getattr(usage, "completion_tokens", None) or 0
+        model = getattr(response, "model", None) or "gpt-4o-mini"
+        get_usage_ledger().record(
+            UsageRecord(
+                session_id=self.session_id,
+                call_type=call_type,
+                model=model,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                latency=latency,
+                cost=price_of(model, prompt_tokens, completion_tokens),
+                loop=game_state.loop_count if game_state is not None else None,
+                location=(
+                    game_state.current_location if game_state is not None else None
+                ),
+            )
         )
 
+    def _handle_basic_action(self, action: str, game_state) -> Dict[str, Any]:
+        """Handle basic game actions from the compiled template index"""
+        result = render_basic_action(action, game_state)
+        if result is not None:
+            return result
+        return self._get_fallback_narrative({"choice": action}, game_state)
+
     def _get_fallback_narrative(
         self, decision: Dict[str, Any], game_state
     ) -> Dict[str, Any]:
         """Generate fallback narrative when specific action is not found"""
-        action_choice = decision.get("choice", "การกระทำ")
-
-        return {
-            "narrative": f"คุณได้ตัดสินใจ {action_choice} ผลลัพธ์ของการกระทำนี้จะปรากฏในอนาคต... ความลึกลับของเวลายังคงปิดบังอยู่ วันหนึ่งผ่านไปอย่างรวดเร็ว",
-            "consequences": [
-                {"type": "stat_change", "stat": "wisdom", "value": 1},
-                {"type": "day_advance", "amount": 1},
-            ],
-            "next_options": [
-                {"id": "explore", "text": "สำรวจต่อไป"},
-                {"id": "talk_to_people", "text": "คุยกับผู้คน"},
-                {"id": "meditate", "text": "ทำสมาธิ"},
-            ],
-        }
-
-    def _get_location_specific_actions(self, action: str, game_state) -> Dict[str, Any]:
-        """Handle location-specific actions"""
-        location = game_state.current_location
-
-        # Palace actions
-        if location == "palace":
-            palace_actions = {
-                "explore_throne_room": {
-                    "narrative": f"{game_state.player.name} เข้าไปในห้องบัลลังก์... บัลลังก์ทองคำเก่าแก่ปรากฏอยู่ตรงหน้า คุณรู้สึกถึงพลังลึกลับที่แฝงอยู่ ภาพนิมิตของกษัตริย์ในอดีตปรากฏขึ้นในจิตใจ",
-                    "consequences": [
-                        {"type": "stat_change", "stat": "mysticism", "value": 2},
-                        {"type": "stat_change", "stat": "wisdom", "value": 1},
-                        {"type": "day_advance", "amount": 1},
-                        {"type": "quest_start", "quest_name": "ความลับของบัลลังก์"},
-                    ],
-                },
-                "investigate_secrets": {
-                    "narrative": f"{game_state.player.name} ค้นหาความลับในพระราชวัง... คุณพบห้องลับที่เต็มไปด้วยเอกสารโบราณ ความจริงเกี่ยวกับวัฏจักรเวลาเริ่มเผยออกมา",
-                    "consequences": [
-                        {"type": "stat_change", "stat": "wisdom", "value": 3},
-                        {"type": "time_fragment", "amount": 2},
-                        {"type": "day_advance", "amount": 1},
-                    ],
-                },
-            }
-            if action in palace_actions:
-                return palace_actions[action]
-
-        # Library actions
-        elif location == "library":
-            library_actions = {
-                "research": {
-                    "narrative": f"{game_state.player.name} ใช้เวลาค้นคว้าในหอสมุด... คุณพบตำราโบราณที่บันทึกเรื่องการเดินทางข้ามเวลา ความรู้ใหม่ๆ เข้ามาในหัว",
-                    "consequences": [
-                        {"type": "stat_change", "stat": "wisdom", "value": 2},
-                        {"type": "stat_change", "stat": "mysticism", "value": 1},
-                        {"type": "time_fragment", "amount": 1},
-                        {"type": "day_advance", "amount": 1},
-                    ],
-                },
-                "read_books": {
-                    "narrative": f"{game_state.player.name} อ่านหนังสือในหอสมุด... เรื่องราวของอดีตและอนาคตปรากฏในหน้ากระดาษ คุณเข้าใจถึงรูปแบบของวัฏจักรเวลามากขึ้น",
-                    "consequences": [
-                        {"type": "stat_change", "stat": "wisdom", "value": 1},
-                        {"type": "stat_change", "stat": "mysticism", "value": 1},
-                    ],
-                },
-                "consult_librarian": {
-                    "narrative": f"{game_state.player.name} ปรึกษาบรรณารักษ์... เขาให้ข้อมูลที่มีค่าเกี่ยวกับการควบคุมเวลา และมอบหนังสือลับให้คุณ",
-                    "consequences": [
-                        {"type": "stat_change", "stat": "wisdom", "value": 2},
-                        {
-                            "type": "item_gain",
-                            "item": {
-                                "id": "secret_book",
-                                "name": "คัมภีร์ลับแห่งกาล",
-                                "description": "หนังสือที่เผยความลับของเวลา",
-                                "type": "magical",
-                                "power": 5,
-                                "magical_properties": {"time_knowledge": True},
-                            },
-                        },
-                        {"type": "day_advance", "amount": 1},
-                    ],
-                },
-            }
-            if action in library_actions:
-                return library_actions[action]
-
-        return None
+        return self.procedural.generate(decision, game_state)
 
     def generate_time_travel_scene(
         self, from_era: TimeEra, to_era: TimeEra, game_state
@@ -297,14 +354,13 @@ class NarrativeEngine:
                 ความยาว 3-4 ประโยค ภาษาไทยที่สวยงาม
                 """
 
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
+                response = self._complete(
+                    prompt,
+                    Priority.NARRATIVE,
                     temperature=0.9,
                     max_tokens=600,
+                    call_type="time_travel",
+                    game_state=game_state,
                 )
 
                 return response.choices[0].message.content
@@ -348,14 +404,13 @@ class NarrativeEngine:
                 ความยาว 4-5 ประโยค ภาษาไทยที่ไหลลื่น
                 """
 
-                response = self.client.chat.completions.create(
-                    model="gpt-4o-mini",
-                    messages=[
-                        {"role": "system", "content": self.system_prompt},
-                        {"role": "user", "content": prompt},
-                    ],
+                response = self._complete(
+                    prompt,
+                    Priority.NARRATIVE,
                     temperature=0.8,
                     max_tokens=800,
+                    call_type="loop_reset",
+                    game_state=game_state,
                 )
 
                 return response.choices[0].message.content
@@ -378,3 +433,24 @@ class NarrativeEngine:
             world_change = "ท้องฟ้าครึ่งแสงครึ่งเงา สะท้อนความไม่แน่นอนของอนาคต"
 
         return f"""เวลาหมุนกลับสู่จุดเริ่มต้นอีกครั้ง และรอบที่ {loop_count} ได้เริ่มต้นขึ้นแล้ว แต่ครั้งนี้โลกต่างออกไป {world_change} {karma_effect} บางคนเหลือบมองคุณด้วยประกายแห่งการจดจำ ราวกับว่าความทรงจำจากรอบก่อนยังคงหลงเหลืออยู่ คุณรู้ดีว่าการตัดสินใจ {decisions_count} ครั้งในอดีตได้สร้างร่องรอยที่ไม่อาจลบเลือน และในรอบนี้ ทุกการกระทำจะมีความหมายมากยิ่งขึ้น"""
+
+
+# Session the pool's background refills run (and are charged) as
+POOL_SESSION_ID = "pool"
+
+_pool_narrator: Optional[NarrativeEngine] = None
+_pool_narrator_lock = threading.Lock()
+
+
+def get_pool_narrator() -> NarrativeEngine:
+    """Return the process-wide engine that refills the variant pool"""
+    global _pool_narrator
+    with _pool_narrator_lock:
+        if _pool_narrator is None:
+            _pool_narrator = NarrativeEngine(POOL_SESSION_ID)
+        return _pool_narrator
+
+
+def generate_pool_variants(key: PoolKey) -> List[Dict[str, Any]]:
+    """The variant pool's generator, tied to no player's session"""
+    return get_pool_narrator().generate_variants(key)
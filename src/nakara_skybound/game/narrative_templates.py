@@ -0,0 +1,281 @@
+import string
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from .time_system import TimeEra
+
+# Sentinel location for templates that apply everywhere
+ANY_LOCATION = None
+
+TemplateKey = Tuple[Optional[str], TimeEra, str]
+
+
+def _freeze(value: Any) -> Any:
+    """Recursively turn dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value: Any) -> Any:
+    """Plain dict/list copy of a frozen value, safe to serialize or mutate"""
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+def _thawer(entries: Optional[Tuple[Mapping[str, Any], ...]]):
+    """Fastest plain-copy function for a frozen tuple of mappings"""
+    if entries is None:
+        return None
+    nested = any(
+        isinstance(v, (MappingProxyType, tuple))
+        for entry in entries
+        for v in entry.values()
+    )
+    if nested:
+        return _thaw
+    # MappingProxyType.copy() copies the underlying dict directly
+    return lambda flat: [entry.copy() for entry in flat]
+
+
+@dataclass(frozen=True)
+class NarrativeTemplate:
+    """Precompiled decision result; the narrative is a str.format template"""
+
+    narrative: str
+    consequences: Tuple[Mapping[str, Any], ...]
+    next_options: Optional[Tuple[Mapping[str, Any], ...]] = None
+    # (literal, field name or None) pairs, parsed once instead of per format
+    segments: Tuple[Tuple[str, Optional[str]], ...] = field(init=False, repr=False)
+    # Plain-copy functions for consequences and next_options, chosen once
+    thaw_consequences: Any = field(init=False, repr=False, compare=False)
+    thaw_next_options: Any = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        segments = tuple(
+            (literal, name)
+            for literal, name, _, _ in string.Formatter().parse(self.narrative)
+        )
+        object.__setattr__(self, "segments", segments)
+        object.__setattr__(self, "thaw_consequences", _thawer(self.consequences))
+        object.__setattr__(self, "thaw_next_options", _thawer(self.next_options))
+
+    def select(self, game_state) -> "NarrativeTemplate":
+        return self
+
+    def render(self, fields: Mapping[str, Any]) -> Dict[str, Any]:
+        parts = []
+        for literal, name in self.segments:
+            parts.append(literal)
+            if name is not None:
+                parts.append(fields[name])
+
+        # The template's frozen copies stay shared; callers get plain data
+        # they can pickle, checkpoint or JSON-encode
+        result = {
+            "narrative": "".join(parts),
+            "consequences": self.thaw_consequences(self.consequences),
+        }
+        if self.next_options is not None:
+            result["next_options"] = self.thaw_next_options(self.next_options)
+        return result
+
+
+@dataclass(frozen=True)
+class KarmaTemplate:
+    """Pair of templates chosen by whether the player's karma is positive"""
+
+    positive: NarrativeTemplate
+    otherwise: NarrativeTemplate
+
+    def select(self, game_state) -> NarrativeTemplate:
+        if game_state.player.stats.karma > 0:
+            return self.positive
+        return self.otherwise
+
+
+def _template(narrative: str, consequences, next_options=None) -> NarrativeTemplate:
+    return NarrativeTemplate(
+        narrative=narrative,
+        consequences=_freeze(consequences),
+        next_options=None if next_options is None else _freeze(next_options),
+    )
+
+
+_LOCATION_TEMPLATES = {
+    "palace": {
+        "explore_throne_room": _template(
+            "{player_name} เข้าไปในห้องบัลลังก์... บัลลังก์ทองคำเก่าแก่ปรากฏอยู่ตรงหน้า คุณรู้สึกถึงพลังลึกลับที่แฝงอยู่ ภาพนิมิตของกษัตริย์ในอดีตปรากฏขึ้นในจิตใจ",
+            [
+                {"type": "stat_change", "stat": "mysticism", "value": 2},
+                {"type": "stat_change", "stat": "wisdom", "value": 1},
+                {"type": "day_advance", "amount": 1},
+                {"type": "quest_start", "quest_name": "ความลับของบัลลังก์"},
+            ],
+        ),
+        "investigate_secrets": _template(
+            "{player_name} ค้นหาความลับในพระราชวัง... คุณพบห้องลับที่เต็มไปด้วยเอกสารโบราณ ความจริงเกี่ยวกับวัฏจักรเวลาเริ่มเผยออกมา",
+            [
+                {"type": "stat_change", "stat": "wisdom", "value": 3},
+                {"type": "time_fragment", "amount": 2},
+                {"type": "day_advance", "amount": 1},
+            ],
+        ),
+    },
+    "library": {
+        "research": _template(
+            "{player_name} ใช้เวลาค้นคว้าในหอสมุด... คุณพบตำราโบราณที่บันทึกเรื่องการเดินทางข้ามเวลา ความรู้ใหม่ๆ เข้ามาในหัว",
+            [
+                {"type": "stat_change", "stat": "wisdom", "value": 2},
+                {"type": "stat_change", "stat": "mysticism", "value": 1},
+                {"type": "time_fragment", "amount": 1},
+                {"type": "day_advance", "amount": 1},
+            ],
+        ),
+        "read_books": _template(
+            "{player_name} อ่านหนังสือในหอสมุด... เรื่องราวของอดีตและอนาคตปรากฏในหน้ากระดาษ คุณเข้าใจถึงรูปแบบของวัฏจักรเวลามากขึ้น",
+            [
+                {"type": "stat_change", "stat": "wisdom", "value": 1},
+                {"type": "stat_change", "stat": "mysticism", "value": 1},
+            ],
+        ),
+        "consult_librarian": _template(
+            "{player_name} ปรึกษาบรรณารักษ์... เขาให้ข้อมูลที่มีค่าเกี่ยวกับการควบคุมเวลา และมอบหนังสือลับให้คุณ",
+            [
+                {"type": "stat_change", "stat": "wisdom", "value": 2},
+                {
+                    "type": "item_gain",
+                    "item": {
+                        "id": "secret_book",
+                        "name": "คัมภีร์ลับแห่งกาล",
+                        "description": "หนังสือที่เผยความลับของเวลา",
+                        "type": "magical",
+                        "power": 5,
+                        "magical_properties": {"time_knowledge": True},
+                    },
+                },
+                {"type": "day_advance", "amount": 1},
+            ],
+        ),
+    },
+}
+
+_ERA_TEMPLATES = {
+    TimeEra.PAST: {
+        "explore": _template(
+            "{player_name} สำรวจรอบๆ เมืองโบราณ... ผู้คนสวมชุดไทยประจำชาติ เสียงระฆังวัดดังไกล คุณเห็นนักเวทย์กำลังร่ายมนตร์อยู่ริมถนน และได้เรียนรู้เกี่ยวกับเวทมนตร์โบราณ วันหนึ่งผ่านไปอย่างมีความหมาย",
+            [
+                {"type": "stat_change", "stat": "wisdom", "value": 2},
+                {"type": "stat_change", "stat": "mysticism", "value": 1},
+                {"type": "day_advance", "amount": 1},
+                {"type": "time_fragment", "amount": 1},
+            ],
+        ),
+    },
+    TimeEra.FUTURE: {
+        "explore": KarmaTemplate(
+            positive=_template(
+                "{player_name} สำรวจโลกอนาคต... เทคโนโลยีและเวทมนตร์ผสมผสานกัน คุณเห็นผลลัพธ์ของการกระทำในอดีต เมืองเจริญรุ่งเรืองเต็มไปด้วยความสุข การสำรวจทำให้คุณเข้าใจถึงผลของกรรม",
+                [
+                    {"type": "stat_change", "stat": "wisdom", "value": 3},
+                    {"type": "stat_change", "stat": "karma", "value": 1},
+                    {"type": "day_advance", "amount": 1},
+                ],
+            ),
+            otherwise=_template(
+                "{player_name} สำรวจโลกอนาคต... เทคโนโลยีและเวทมนตร์ผสมผสานกัน คุณเห็นผลลัพธ์ของการกระทำในอดีต เมืองร้างเปล่าและเต็มไปด้วยความเศร้า การสำรวจทำให้คุณเข้าใจถึงผลของกรรม",
+                [
+                    {"type": "stat_change", "stat": "wisdom", "value": 3},
+                    {"type": "stat_change", "stat": "karma", "value": -1},
+                    {"type": "day_advance", "amount": 1},
+                ],
+            ),
+        ),
+    },
+}
+
+# Actions available in any era and location, with loop awareness
+_DEFAULT_TEMPLATES = {
+    "explore": _template(
+        "{player_name} เดินสำรวจรอบๆ จัตุรัสกลางเมือง{loop_modifier}... ผู้คนต่างมองมาด้วยสายตาแปลกๆ บางคนเหมือนจะจำคุณได้ คุณพบร่องรอยเวทมนตร์โบราณ และได้พบกับนักเดินทางคนอื่นๆ วันหนึ่งผ่านไปอย่างมีความหมาย",
+        [
+            {"type": "stat_change", "stat": "wisdom", "value": 1},
+            {"type": "day_advance", "amount": 1},
+            {
+                "type": "item_gain",
+                "item": {
+                    "id": "clue1",
+                    "name": "เบาะแสลึกลับ",
+                    "description": "ข้อมูลที่อาจมีประโยชน์",
+                    "type": "information",
+                    "power": 0,
+                    "magical_properties": {},
+                },
+            },
+        ],
+        [
+            {"id": "continue_explore", "text": "สำรวจลึกขึ้น"},
+            {"id": "talk_to_people", "text": "เข้าไปคุยกับใครสักคน"},
+            {"id": "meditate", "text": "นั่งสมาธิเพื่อใคร่ครวญ"},
+        ],
+    ),
+}
+
+
+def _compile_index() -> Dict[TemplateKey, Any]:
+    """Flatten the tables into one index, resolving precedence up front.
+
+    Location-specific templates win over era-specific ones, which win over
+    the defaults. Wildcard eras are expanded, so a lookup is at most two
+    dict hits: the exact location, then ANY_LOCATION.
+    """
+    index: Dict[TemplateKey, Any] = {}
+    for era in TimeEra:
+        for action, template in _DEFAULT_TEMPLATES.items():
+            index[(ANY_LOCATION, era, action)] = template
+        for action, template in _ERA_TEMPLATES.get(era, {}).items():
+            index[(ANY_LOCATION, era, action)] = template
+        for location, templates in _LOCATION_TEMPLATES.items():
+            for action, template in templates.items():
+                index[(location, era, action)] = template
+    return index
+
+
+TEMPLATE_INDEX = _compile_index()
+
+# Same index split by era, so the (slow to hash) enum is only hashed once
+_DISPATCH: Dict[TimeEra, Dict[Tuple[Optional[str], str], Any]] = {
+    era: {
+        (location, action): template
+        for (location, key_era, action), template in TEMPLATE_INDEX.items()
+        if key_era is era
+    }
+    for era in TimeEra
+}
+
+
+def render_basic_action(action: str, game_state) -> Optional[Dict[str, Any]]:
+    """Render the template for this location/era/action, or None"""
+    era_index = _DISPATCH[game_state.current_era]
+    template = era_index.get((game_state.current_location, action)) or era_index.get(
+        (ANY_LOCATION, action)
+    )
+    if template is None:
+        return None
+
+    loop_count = game_state.loop_count
+    fields = {
+        "player_name": game_state.player.name,
+        "loop_modifier": (
+            ""
+            if loop_count == 0
+            else f" (รอบที่ {loop_count + 1}: คุณรู้สึกคุ้นเคยกับสถานที่นี้)"
+        ),
+    }
+    return template.select(game_state).render(fields)
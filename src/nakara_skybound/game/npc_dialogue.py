@@ -0,0 +1,172 @@
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+from .character import NPC
+from .llm_scheduler import Priority
+from .tracing import get_tracer
+
+# Spoken by an NPC when there is no LLM line, by relationship band
+_LOCAL_LINES = {
+    "warm": '{name}ยิ้มกว้าง "ดีใจที่ได้พบท่านอีกครั้ง มีอะไรให้ข้าช่วยไหม?"',
+    "neutral": '{name}พยักหน้ารับ "ท่านมีธุระอะไรกับข้าหรือ?"',
+    "wary": '{name}ถอยห่างเล็กน้อย "ข้าไม่แน่ใจว่าควรไว้ใจท่านหรือไม่"',
+}
+
+
+def _band(npc: NPC) -> str:
+    if npc.memory.relationship_level >= 5:
+        return "warm"
+    if npc.memory.relationship_level <= -3:
+        return "wary"
+    return "neutral"
+
+
+def player_context(game_state) -> Dict[str, Any]:
+    """The player_state NPC.get_dialogue_options expects"""
+    return {
+        "current_loop": game_state.loop_count,
+        "player_name": game_state.player.name,
+        "completed_quests": list(game_state.completed_quests),
+    }
+
+
+def local_dialogue(npc: NPC, options: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """A line and options for one NPC without the LLM"""
+    return {
+        "line": _LOCAL_LINES[_band(npc)].format(name=npc.name),
+        "options": [{"id": o["id"], "text": o["text"]} for o in options],
+    }
+
+
+class DialogueGenerator:
+    """Lines and dialogue options for every NPC at a location at once.
+
+    The NPCs present whose cached dialogue is stale are sent to the LLM
+    together in one structured call, with their personality traits,
+    relationship and trust, and the ids of the options they can offer.
+    Each NPC's dialogue is cached until its NPCMemory version changes, the
+    loop turns over (greetings depend on it) or a quest is completed
+    (options can wait on one), so later talks in the
+    same scene cost no calls at all. Without the
+    LLM, or for any NPC the reply leaves out, the line comes from local
+    templates.
+    """
+
+    def __init__(self, narrative_engine):
+        self.narrative_engine = narrative_engine
+        # npc id -> ((memory version, loop, completed quests stamp), dialogue)
+        self.cache: Dict[str, Tuple[Tuple, Dict[str, Any]]] = {}
+
+    @staticmethod
+    def _key(npc: NPC, game_state) -> Tuple[int, int, Optional[int]]:
+        return (
+            npc.memory.version,
+            game_state.loop_count,
+            game_state.versions.get("completed_quests"),
+        )
+
+    def dialogue_for(self, npc: NPC, world, game_state) -> Dict[str, Any]:
+        """One NPC's dialogue, generating it with everyone at its location"""
+        cached = self.cache.get(npc.id)
+        hit = cached is not None and cached[0] == self._key(npc, game_state)
+        get_tracer().cache_lookup("npc_dialogue", hit)
+        if not hit:
+            self.refresh(world.get_npcs_in_location(npc.location) or [npc], game_state)
+        return self.cache[npc.id][1]
+
+    def refresh(self, npcs: List[NPC], game_state):
+        """Regenerate the dialogue of every NPC in `npcs` whose cache is stale"""
+        stale = [
+            npc
+            for npc in npcs
+            if self.cache.get(npc.id, (None,))[0] != self._key(npc, game_state)
+        ]
+        if not stale:
+            return
+        context = player_context(game_state)
+        options = {npc.id: npc.get_dialogue_options(context) for npc in stale}
+        generated = self._generate(stale, options, game_state) or {}
+        for npc in stale:
+            dialogue = generated.get(npc.id) or local_dialogue(npc, options[npc.id])
+            self.cache[npc.id] = (self._key(npc, game_state), dialogue)
+
+    def _generate(
+        self, npcs: List[NPC], options: Dict[str, List[Dict[str, Any]]], game_state
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        engine = self.narrative_engine
+        if not engine.openai_available:
+            return None
+
+        profiles = "\n".join(
+            f"- NPC_ID: {npc.id} ชื่อ: {npc.name} บทบาท: {npc.role} "
+            f"นิสัย: {', '.join(npc.personality_traits)} "
+            f"ความสัมพันธ์: {npc.memory.relationship_level} "
+            f"ความไว้ใจ: {npc.memory.trust_level} "
+            f"ตัวเลือก: {', '.join(o['id'] for o in options[npc.id]) or '-'}"
+            for npc in npcs
+        )
+        prompt = f"""
+        สร้างบทพูดของ NPC ทุกคนในฉากนี้พร้อมกัน
+        ผู้เล่น: {game_state.player.name}
+        ยุค: {game_state.current_era.value}
+        รอบที่: {game_state.loop_count}
+
+        NPC:
+        {profiles}
+
+        ให้แต่ละคนพูดหนึ่งประโยคตามนิสัยและความสัมพันธ์กับผู้เล่น
+        และเขียนข้อความของตัวเลือกที่ให้มาเท่านั้น (ใช้ id เดิม)
+
+        ตอบเป็น JSON:
+        {{
+            "npcs": [
+                {{
+                    "id": "NPC_ID",
+                    "line": "บทพูด (ภาษาไทย)",
+                    "options": [{{"id": "id ของตัวเลือก", "text": "ข้อความ"}}]
+                }}
+            ]
+        }}
+        """
+        try:
+            response = engine._complete(
+                prompt,
+                Priority.INTERACTIVE,
+                temperature=0.8,
+                max_tokens=300 * len(npcs),
+                call_type="dialogue",
+                game_state=game_state,
+            )
+            entries = json.loads(response.choices[0].message.content)["npcs"]
+        except Exception as e:
+            print(f"GPT Error in NPC dialogue: {e}")
+            return None
+
+        generated = {}
+        for entry in entries:
+            if not isinstance(entry, dict) or entry.get("id") not in options:
+                continue
+            allowed = {o["id"]: o["text"] for o in options[entry["id"]]}
+            texts = {
+                o.get("id"): o.get("text")
+                for o in entry.get("options", [])
+                if isinstance(o, dict)
+            }
+            line = entry.get("line")
+            if not isinstance(line, str) or not line.strip():
+                continue
+            generated[entry["id"]] = {
+                "line": line,
+                "options": [
+                    {
+                        "id": option_id,
+                        "text": (
+                            texts[option_id]
+                            if isinstance(texts.get(option_id), str)
+                            else text
+                        ),
+                    }
+                    for option_id, text in allowed.items()
+                ],
+            }
+        return generated
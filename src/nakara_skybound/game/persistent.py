@@ -0,0 +1,422 @@
+"""Persistent (immutable) map and vector with structural sharing.
+
+Every "modification" returns a new collection that shares all untouched
+nodes with the old one, so keeping many versions of a state costs memory
+proportional to their differences. PMap is a hash array mapped trie and
+PVector a 32-way trie with a tail, as in Clojure.
+
+Values are stored as-is and treated as immutable; replace them with
+`set()` rather than mutating them in place.
+"""
+
+from collections.abc import Mapping, Sequence
+from typing import Any, Iterable, Iterator, Optional, Tuple
+
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+_HASH_BITS = 64
+_HASH_MASK = (1 << _HASH_BITS) - 1
+
+_MISSING = object()
+
+# A leaf entry is a (hash, key, value) tuple stored directly in a node
+Leaf = Tuple[int, Any, Any]
+
+
+def _hash(key) -> int:
+    return hash(key) & _HASH_MASK
+
+
+def _bit(key_hash: int, shift: int) -> int:
+    return 1 << ((key_hash >> shift) & _MASK)
+
+
+def _index(bitmap: int, bit: int) -> int:
+    return (bitmap & (bit - 1)).bit_count()
+
+
+class _CollisionNode:
+    """Leaves whose keys have identical 64-bit hashes"""
+
+    __slots__ = ("key_hash", "leaves")
+
+    def __init__(self, key_hash: int, leaves: Tuple[Leaf, ...]):
+        self.key_hash = key_hash
+        self.leaves = leaves
+
+    def get(self, key_hash, shift, key, default):
+        for _, k, v in self.leaves:
+            if k is key or k == key:
+                return v
+        return default
+
+    def assoc(self, key_hash, shift, key, value):
+        if key_hash != self.key_hash:
+            # Push this node one level down next to the new key
+            node = _BitmapNode(_bit(self.key_hash, shift), (self,))
+            return node.assoc(key_hash, shift, key, value)
+
+        for i, (_, k, v) in enumerate(self.leaves):
+            if k is key or k == key:
+                if v is value:
+                    return self, False
+                leaves = (
+                    self.leaves[:i] + ((key_hash, key, value),) + self.leaves[i + 1 :]
+                )
+                return _CollisionNode(key_hash, leaves), False
+        return _CollisionNode(key_hash, self.leaves + ((key_hash, key, value),)), True
+
+    def dissoc(self, key_hash, shift, key):
+        for i, (_, k, _) in enumerate(self.leaves):
+            if k is key or k == key:
+                leaves = self.leaves[:i] + self.leaves[i + 1 :]
+                if len(leaves) == 1:
+                    return leaves[0]
+                return _CollisionNode(key_hash, leaves)
+        return self
+
+    def leaves_iter(self) -> Iterator[Leaf]:
+        yield from self.leaves
+
+
+class _BitmapNode:
+    """Up to 32 entries, each a leaf or a child node, indexed by a bitmap"""
+
+    __slots__ = ("bitmap", "entries")
+
+    def __init__(self, bitmap: int, entries: tuple):
+        self.bitmap = bitmap
+        self.entries = entries
+
+    def get(self, key_hash, shift, key, default):
+        bit = _bit(key_hash, shift)
+        if not self.bitmap & bit:
+            return default
+        entry = self.entries[_index(self.bitmap, bit)]
+        if type(entry) is tuple:
+            if entry[0] == key_hash and (entry[1] is key or entry[1] == key):
+                return entry[2]
+            return default
+        return entry.get(key_hash, shift + _BITS, key, default)
+
+    def assoc(self, key_hash, shift, key, value):
+        """Return (new node, whether a key was added)"""
+        bit = _bit(key_hash, shift)
+        index = _index(self.bitmap, bit)
+        leaf = (key_hash, key, value)
+
+        if not self.bitmap & bit:
+            entries = self.entries[:index] + (leaf,) + self.entries[index:]
+            return _BitmapNode(self.bitmap | bit, entries), True
+
+        entry = self.entries[index]
+        if type(entry) is tuple:
+            if entry[0] == key_hash and (entry[1] is key or entry[1] == key):
+                if entry[2] is value:
+                    return self, False
+                return self._replace(index, leaf), False
+            return self._replace(index, _merge(entry, leaf, shift + _BITS)), True
+
+        child, added = entry.assoc(key_hash, shift + _BITS, key, value)
+        if child is entry:
+            return self, False
+        return self._replace(index, child), added
+
+    def dissoc(self, key_hash, shift, key):
+        """Return the new node, a lone leaf to inline, None if empty, or self"""
+        bit = _bit(key_hash, shift)
+        if not self.bitmap & bit:
+            return self
+        index = _index(self.bitmap, bit)
+        entry = self.entries[index]
+
+        if type(entry) is tuple:
+            if not (entry[0] == key_hash and (entry[1] is key or entry[1] == key)):
+                return self
+            replacement = None
+        else:
+            replacement = entry.dissoc(key_hash, shift + _BITS, key)
+            if replacement is entry:
+                return self
+
+        if replacement is not None:
+            return self._replace(index, replacement)
+
+        entries = self.entries[:index] + self.entries[index + 1 :]
+        if not entries:
+            return None
+        if len(entries) == 1 and type(entries[0]) is tuple and shift > 0:
+            return entries[0]
+        return _BitmapNode(self.bitmap & ~bit, entries)
+
+    def _replace(self, index: int, entry) -> "_BitmapNode":
+        entries = self.entries[:index] + (entry,) + self.entries[index + 1 :]
+        return _BitmapNode(self.bitmap, entries)
+
+    def leaves_iter(self) -> Iterator[Leaf]:
+        for entry in self.entries:
+            if type(entry) is tuple:
+                yield entry
+            else:
+                yield from entry.leaves_iter()
+
+
+def _merge(first: Leaf, second: Leaf, shift: int):
+    """Smallest subtree holding two leaves whose hashes agree above `shift`"""
+    if first[0] == second[0] or shift >= _HASH_BITS:
+        return _CollisionNode(first[0], (first, second))
+
+    first_bit = _bit(first[0], shift)
+    second_bit = _bit(second[0], shift)
+    if first_bit == second_bit:
+        return _BitmapNode(first_bit, (_merge(first, second, shift + _BITS),))
+    if first_bit < second_bit:
+        return _BitmapNode(first_bit | second_bit, (first, second))
+    return _BitmapNode(first_bit | second_bit, (second, first))
+
+
+_EMPTY_NODE = _BitmapNode(0, ())
+
+
+class PMap(Mapping):
+    """Immutable hash map; `set`, `delete` and `update` return new maps"""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, initial: Optional[Any] = None):
+        self._root = _EMPTY_NODE
+        self._size = 0
+        if initial:
+            items = initial.items() if isinstance(initial, Mapping) else initial
+            for key, value in items:
+                self._root, added = self._root.assoc(_hash(key), 0, key, value)
+                self._size += added
+
+    @classmethod
+    def _make(cls, root, size) -> "PMap":
+        new = cls.__new__(cls)
+        new._root = root
+        new._size = size
+        return new
+
+    def __getitem__(self, key):
+        value = self._root.get(_hash(key), 0, key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def get(self, key, default=None):
+        return self._root.get(_hash(key), 0, key, default)
+
+    def __contains__(self, key) -> bool:
+        return self._root.get(_hash(key), 0, key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator:
+        for _, key, _ in self._root.leaves_iter():
+            yield key
+
+    def items(self):
+        return [(key, value) for _, key, value in self._root.leaves_iter()]
+
+    def values(self):
+        return [value for _, _, value in self._root.leaves_iter()]
+
+    def set(self, key, value) -> "PMap":
+        root, added = self._root.assoc(_hash(key), 0, key, value)
+        if root is self._root:
+            return self
+        return PMap._make(root, self._size + added)
+
+    def delete(self, key) -> "PMap":
+        root = self._root.dissoc(_hash(key), 0, key)
+        if root is self._root:
+            return self
+        if root is None:
+            root = _EMPTY_NODE
+        elif type(root) is tuple:
+            root = _BitmapNode(_bit(root[0], 0), (root,))
+        return PMap._make(root, self._size - 1)
+
+    def update(self, other) -> "PMap":
+        items = other.items() if isinstance(other, Mapping) else other
+        root, size = self._root, self._size
+        for key, value in items:
+            root, added = root.assoc(_hash(key), 0, key, value)
+            size += added
+        if root is self._root:
+            return self
+        return PMap._make(root, size)
+
+    # Immutable, so copies (including GameState snapshots) share the trie
+    def __copy__(self) -> "PMap":
+        return self
+
+    def __deepcopy__(self, memo) -> "PMap":
+        return self
+
+    def __reduce__(self):
+        return (PMap, (dict(self.items()),))
+
+    def __repr__(self) -> str:
+        return f"PMap({dict(self.items())!r})"
+
+
+def pmap(initial: Optional[Any] = None) -> PMap:
+    """PMap from a mapping or (key, value) pairs; PMaps are returned as-is"""
+    if isinstance(initial, PMap):
+        return initial
+    return PMap(initial)
+
+
+class PVector(Sequence):
+    """Immutable list; `append`, `set` and `remove` return new vectors"""
+
+    __slots__ = ("_count", "_shift", "_root", "_tail")
+
+    def __init__(self, initial: Optional[Iterable] = None):
+        self._count = 0
+        self._shift = _BITS
+        self._root: tuple = ()
+        self._tail: tuple = ()
+        if initial:
+            vector = self
+            for value in initial:
+                vector = vector.append(value)
+            self._count = vector._count
+            self._shift = vector._shift
+            self._root = vector._root
+            self._tail = vector._tail
+
+    @classmethod
+    def _make(cls, count, shift, root, tail) -> "PVector":
+        new = cls.__new__(cls)
+        new._count = count
+        new._shift = shift
+        new._root = root
+        new._tail = tail
+        return new
+
+    def _tail_offset(self) -> int:
+        if self._count < _WIDTH:
+            return 0
+        return ((self._count - 1) >> _BITS) << _BITS
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return PVector(self[i] for i in range(*index.indices(self._count)))
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("PVector index out of range")
+
+        if index >= self._tail_offset():
+            return self._tail[index & _MASK]
+        node = self._root
+        for level in range(self._shift, 0, -_BITS):
+            node = node[(index >> level) & _MASK]
+        return node[index & _MASK]
+
+    def __iter__(self) -> Iterator:
+        tail_offset = self._tail_offset()
+        for start in range(0, tail_offset, _WIDTH):
+            node = self._root
+            for level in range(self._shift, 0, -_BITS):
+                node = node[(start >> level) & _MASK]
+            yield from node
+        yield from self._tail
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, str):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    __hash__ = None
+
+    def append(self, value) -> "PVector":
+        count = self._count
+        if count - self._tail_offset() < _WIDTH:
+            return PVector._make(
+                count + 1, self._shift, self._root, self._tail + (value,)
+            )
+
+        # Tail is full: push it into the trie, growing a level if needed
+        shift = self._shift
+        if (count >> _BITS) > (1 << shift):
+            root = (self._root, _new_path(shift, self._tail))
+            shift += _BITS
+        else:
+            root = _push_tail(count, shift, self._root, self._tail)
+        return PVector._make(count + 1, shift, root, (value,))
+
+    def set(self, index: int, value) -> "PVector":
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("PVector index out of range")
+
+        if index >= self._tail_offset():
+            position = index & _MASK
+            tail = self._tail[:position] + (value,) + self._tail[position + 1 :]
+            return PVector._make(self._count, self._shift, self._root, tail)
+        root = _assoc_path(self._shift, self._root, index, value)
+        return PVector._make(self._count, self._shift, root, self._tail)
+
+    def remove(self, value) -> "PVector":
+        """Vector without the first occurrence of `value` (rebuilds the suffix)"""
+        index = self.index(value)
+        vector = PVector(self[i] for i in range(index))
+        for i in range(index + 1, self._count):
+            vector = vector.append(self[i])
+        return vector
+
+    def __copy__(self) -> "PVector":
+        return self
+
+    def __deepcopy__(self, memo) -> "PVector":
+        return self
+
+    def __reduce__(self):
+        return (PVector, (list(self),))
+
+    def __repr__(self) -> str:
+        return f"PVector({list(self)!r})"
+
+
+def _new_path(level: int, node: tuple) -> tuple:
+    if level == 0:
+        return node
+    return (_new_path(level - _BITS, node),)
+
+
+def _push_tail(count: int, level: int, parent: tuple, tail: tuple) -> tuple:
+    sub_index = ((count - 1) >> level) & _MASK
+    if level == _BITS:
+        node = tail
+    elif sub_index < len(parent):
+        node = _push_tail(count, level - _BITS, parent[sub_index], tail)
+    else:
+        node = _new_path(level - _BITS, tail)
+    return parent[:sub_index] + (node,) + parent[sub_index + 1 :]
+
+
+def _assoc_path(level: int, node: tuple, index: int, value) -> tuple:
+    if level == 0:
+        position = index & _MASK
+    else:
+        position = (index >> level) & _MASK
+        value = _assoc_path(level - _BITS, node[position], index, value)
+    return node[:position] + (value,) + node[position + 1 :]
+
+
+def pvector(initial: Optional[Iterable] = None) -> PVector:
+    """PVector from an iterable; PVectors are returned as-is"""
+    if isinstance(initial, PVector):
+        return initial
+    return PVector(initial)
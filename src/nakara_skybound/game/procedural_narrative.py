@@ -0,0 +1,357 @@
+import re
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .time_system import TimeEra
+from .variant_pool import karma_band
+
+_SYMBOL = re.compile(r"#(\w+)#")
+_MASK = (1 << 64) - 1
+
+
+class SplitMix64:
+    """Tiny seeded PRNG; stable across Python versions and cheap to create"""
+
+    __slots__ = ("state",)
+
+    def __init__(self, seed: int):
+        self.state = seed & _MASK
+
+    def next(self) -> int:
+        self.state = (self.state + 0x9E3779B97F4A7C15) & _MASK
+        z = self.state
+        z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _MASK
+        z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _MASK
+        return z ^ (z >> 31)
+
+    def choice(self, options: Sequence[Any]) -> Any:
+        return options[self.next() % len(options)]
+
+
+# A compiled alternative is a tuple of (is_symbol, text) tokens
+Alternative = Tuple[Tuple[bool, str], ...]
+
+
+class Grammar:
+    """Tracery-style grammar: rules expand `#symbol#` references recursively.
+
+    Alternatives are tokenized once when the grammar is built, so expansion
+    is only list lookups and joins.
+    """
+
+    max_depth = 12
+
+    def __init__(self, rules: Mapping[str, Sequence[str]]):
+        self.rules: Dict[str, Tuple[Alternative, ...]] = {
+            symbol: tuple(self._compile(text) for text in alternatives)
+            for symbol, alternatives in rules.items()
+        }
+
+    @staticmethod
+    def _compile(text: str) -> Alternative:
+        tokens = []
+        for i, part in enumerate(_SYMBOL.split(text)):
+            # split() alternates literal, symbol, literal, ...
+            if i % 2:
+                tokens.append((True, part))
+            elif part:
+                tokens.append((False, part))
+        return tuple(tokens)
+
+    def expand(
+        self,
+        symbol: str,
+        rng: SplitMix64,
+        bindings: Optional[Mapping[str, str]] = None,
+    ) -> str:
+        out: List[str] = []
+        self._expand(symbol, rng, bindings or {}, out, 0)
+        return "".join(out)
+
+    def _expand(self, symbol, rng, bindings, out, depth):
+        if symbol in bindings:
+            out.append(bindings[symbol])
+            return
+        alternatives = self.rules.get(symbol)
+        if not alternatives or depth > self.max_depth:
+            return
+        for is_symbol, text in rng.choice(alternatives):
+            if is_symbol:
+                self._expand(text, rng, bindings, out, depth + 1)
+            else:
+                out.append(text)
+
+
+BASE_RULES = {
+    "origin": [
+        "#opening# #actor# #deed# #scene# #event# #feeling# #closing#",
+        "#scene# #actor# #deed# #event# #feeling# #closing#",
+        "#opening# #scene# #actor# #deed# #feeling# #event# #closing#",
+    ],
+    "opening": [
+        "ยามเช้ามาเยือนพร้อมหมอกบางๆ",
+        "เสียงระฆังดังแว่วมาจากที่ไกล",
+        "สายลมแห่งกาลเวลาพัดผ่าน",
+        "ดวงอาทิตย์คล้อยต่ำลงทีละน้อย",
+    ],
+    "event": [
+        "ชายชราคนหนึ่งเหลือบมองคุณราวกับจำได้",
+        "เศษเสี้ยวความทรงจำจากรอบก่อนผุดขึ้นในใจ",
+        "นกตัวหนึ่งบินวนเหนือศีรษะสามรอบแล้วหายไป",
+        "คุณสังเกตเห็นรอยจารึกเล็กๆ ที่ไม่เคยเห็นมาก่อน",
+        "เวลาดูเหมือนจะหยุดนิ่งไปชั่วขณะ",
+    ],
+    "feeling": [
+        "#sense# และคุณรู้ว่า#insight#",
+        "#sense#",
+        "ในใจคุณรู้ดีว่า#insight#",
+    ],
+    "sense": [
+        "คุณรู้สึกถึงแรงสั่นสะเทือนของวัฏจักรเวลา",
+        "หัวใจของคุณเต้นแรงขึ้นโดยไม่มีเหตุผล",
+        "ความเงียบรอบตัวหนักอึ้งกว่าปกติ",
+    ],
+    "insight": [
+        "ทุกการกระทำมีผลสะท้อนกลับมา",
+        "คำตอบอาจซ่อนอยู่ในรอบถัดไป",
+        "ความจริงของเมืองนี้ยังไม่ถูกเปิดเผยทั้งหมด",
+    ],
+    "closing": [
+        "วันหนึ่งผ่านไปอย่างมีความหมาย",
+        "แล้ววันนั้นก็ผ่านพ้นไป",
+        "เวลาเดินหน้าต่อไปอย่างไม่หยุดยั้ง",
+    ],
+}
+
+ERA_RULES = {
+    TimeEra.PAST: {
+        "opening": [
+            "เสียงสวดมนต์ของพระอาจารย์ก้องไปทั่วเมืองโบราณ",
+            "กลิ่นธูปและดอกมะลิลอยมาตามลม",
+            "ผู้คนในชุดผ้าไหมเดินผ่านไปมาอย่างสงบ",
+        ],
+        "event": [
+            "นักเวทย์คนหนึ่งร่ายมนตร์อยู่ริมทาง แสงสีทองวูบขึ้นชั่วครู่",
+            "เทวรูปองค์หนึ่งดูเหมือนจะหันมามองคุณ",
+        ],
+    },
+    TimeEra.PRESENT: {
+        "opening": [
+            "เสียงรถยนต์ปะปนกับเสียงกีบม้าบนถนน",
+            "แสงไฟนีออนสะท้อนบนผนังวัดเก่า",
+        ],
+        "event": [
+            "โทรศัพท์ของใครบางคนดังขึ้นพร้อมกับเสียงระฆังวัด",
+        ],
+    },
+    TimeEra.FUTURE: {
+        "opening": [
+            "ท้องฟ้าแห่งอนาคตเปล่งแสงแปลกตา",
+            "เครื่องจักรและยันต์โบราณทำงานเคียงข้างกัน",
+        ],
+        "event": [
+            "ภาพโฮโลแกรมของอดีตกระพริบขึ้นแล้วเลือนหาย",
+            "เงาของผลกรรมในอดีตทอดยาวไปทั่วเมือง",
+        ],
+    },
+}
+
+LOCATION_RULES = {
+    "central_plaza": {
+        "scene": [
+            "จัตุรัสกลางเมืองคึกคักไปด้วยผู้คน",
+            "น้ำพุกลางจัตุรัสส่งเสียงไหลเอื่อยๆ",
+        ],
+    },
+    "temple": {
+        "scene": [
+            "ภายในวัดพระแก้วเงียบสงบ มีเพียงเสียงใบโพธิ์ไหว",
+            "แสงเทียนในโบสถ์ไหววูบตามลมหายใจ",
+        ],
+    },
+    "market": {
+        "scene": [
+            "ตลาดโบราณเต็มไปด้วยเสียงต่อรองราคา",
+            "แผงเครื่องรางของขลังเรียงรายเต็มสองข้างทาง",
+        ],
+    },
+    "library": {
+        "scene": [
+            "ชั้นหนังสือในหอสมุดแห่งกาลสูงจนมองไม่เห็นเพดาน",
+            "ฝุ่นละอองลอยช้าๆ ท่ามกลางแสงที่ลอดผ่านหน้าต่าง",
+        ],
+    },
+    "palace": {
+        "scene": [
+            "ทางเดินในพระราชวังทอดยาวและเงียบงัน",
+            "ลวดลายทองบนผนังพระราชวังสะท้อนแสงระยิบระยับ",
+        ],
+    },
+}
+
+KARMA_RULES = {
+    "positive": {
+        "feeling": [
+            "แสงอบอุ่นโอบล้อมตัวคุณ และคุณรู้ว่า#insight#",
+            "ผู้คนส่งยิ้มให้คุณ #sense#",
+        ],
+        "closing": ["วันนั้นจบลงด้วยความอิ่มเอมใจ"],
+    },
+    "negative": {
+        "feeling": [
+            "เงามืดบางอย่างติดตามคุณมา และคุณรู้ว่า#insight#",
+            "ผู้คนหลบสายตาคุณ #sense#",
+        ],
+        "closing": ["วันนั้นจบลงพร้อมความหนักอึ้งในใจ"],
+    },
+    "neutral": {},
+}
+
+# Thai phrase and label for actions offered by World locations
+ACTIONS = {
+    "explore": ("ออกสำรวจรอบๆ", "สำรวจต่อไป"),
+    "observe": ("หยุดสังเกตสิ่งรอบตัว", "สังเกตการณ์"),
+    "talk_to_people": ("เข้าไปพูดคุยกับผู้คน", "คุยกับผู้คน"),
+    "meditate": ("นั่งลงทำสมาธิ", "ทำสมาธิ"),
+    "time_travel": ("สัมผัสกระแสแห่งกาลเวลา", "สัมผัสกระแสเวลา"),
+    "pray": ("สวดมนต์อย่างตั้งใจ", "สวดมนตร์"),
+    "learn_magic": ("ฝึกฝนเวทมนตร์", "เรียนเวทมนตร์"),
+    "study_texts": ("ศึกษาคัมภีร์โบราณ", "ศึกษาคัมภีร์"),
+    "buy": ("เลือกซื้อของแปลกตา", "ซื้อของ"),
+    "sell": ("นำของออกมาขาย", "ขายของ"),
+    "bargain": ("ต่อรองราคากับพ่อค้า", "ต่อรอง"),
+    "gather_information": ("สืบหาข่าวสาร", "หาข่าว"),
+    "research": ("ค้นคว้าตำรา", "ค้นคว้า"),
+    "read_books": ("อ่านหนังสือเก่า", "อ่านหนังสือ"),
+    "study_history": ("ศึกษาประวัติศาสตร์ของเมือง", "ศึกษาประวัติศาสตร์"),
+    "consult_librarian": ("ขอคำปรึกษาจากบรรณารักษ์", "ปรึกษาบรรณารักษ์"),
+    "investigate": ("ตรวจสอบร่องรอยลึกลับ", "ตรวจสอบ"),
+    "explore_throne_room": ("เข้าไปในห้องบัลลังก์", "สำรวจห้องบัลลังก์"),
+    "investigate_secrets": ("ค้นหาความลับที่ซ่อนอยู่", "ค้นหาความลับ"),
+    "talk_to_guards": ("พูดคุยกับทหารยาม", "คุยกับทหาร"),
+    "observe_artifacts": ("พินิจโบราณวัตถุ", "ชมโบราณวัตถุ"),
+}
+
+# Which stats an action tends to grow; anything else grows wisdom
+ACTION_STATS = {
+    "talk_to_people": ("charisma",),
+    "talk_to_guards": ("charisma", "strength"),
+    "bargain": ("charisma",),
+    "buy": ("charisma",),
+    "sell": ("charisma",),
+    "gather_information": ("charisma", "wisdom"),
+    "meditate": ("mysticism", "wisdom"),
+    "pray": ("mysticism", "karma"),
+    "learn_magic": ("mysticism",),
+    "time_travel": ("mysticism",),
+    "explore": ("wisdom", "strength"),
+    "explore_throne_room": ("mysticism", "wisdom"),
+}
+TIME_FRAGMENT_ACTIONS = frozenset(
+    {"research", "investigate", "investigate_secrets", "study_history", "time_travel"}
+)
+
+
+def _merge(*layers: Mapping[str, Sequence[str]]) -> Dict[str, List[str]]:
+    """Later layers add alternatives to earlier ones"""
+    merged: Dict[str, List[str]] = {}
+    for layer in layers:
+        for symbol, alternatives in layer.items():
+            merged.setdefault(symbol, []).extend(alternatives)
+    return merged
+
+
+class ProceduralNarrator:
+    """Fast, reproducible non-LLM tier producing full decision results"""
+
+    def __init__(self, location_actions: Optional[Mapping[str, List[str]]] = None):
+        self.location_actions = dict(location_actions or {})
+        self._grammars: Dict[Tuple[TimeEra, str, str], Grammar] = {}
+
+    def grammar_for(self, era: TimeEra, location: str, band: str) -> Grammar:
+        """Compiled grammar for an era/location/karma band, built once"""
+        key = (era, location, band)
+        grammar = self._grammars.get(key)
+        if grammar is None:
+            grammar = Grammar(
+                _merge(
+                    BASE_RULES,
+                    ERA_RULES.get(era, {}),
+                    LOCATION_RULES.get(location, {"scene": ["รอบตัวคุณเงียบสงบ"]}),
+                    KARMA_RULES.get(band, {}),
+                )
+            )
+            self._grammars[key] = grammar
+        return grammar
+
+    @staticmethod
+    def seed_for(decision: Mapping[str, Any], game_state) -> int:
+        """Same decision in the same game situation gives the same text"""
+        key = "|".join(
+            str(part)
+            for part in (
+                decision.get("choice", ""),
+                decision.get("id", ""),
+                game_state.current_location,
+                game_state.current_era.value,
+                game_state.loop_count,
+                game_state.current_day,
+                len(game_state.decisions_made),
+                game_state.player.name,
+            )
+        )
+        return zlib.crc32(key.encode("utf-8"))
+
+    def generate(
+        self, decision: Mapping[str, Any], game_state, seed: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Expand a narrative with consequences and next options"""
+        choice = decision.get("choice", "การกระทำ")
+        karma = game_state.player.stats.karma
+        band = karma_band(karma)
+        rng = SplitMix64(self.seed_for(decision, game_state) if seed is None else seed)
+
+        grammar = self.grammar_for(
+            game_state.current_era, game_state.current_location, band
+        )
+        deed = ACTIONS.get(choice, (f"ตัดสินใจ{choice}", None))[0]
+        narrative = grammar.expand(
+            "origin", rng, {"actor": game_state.player.name, "deed": deed}
+        )
+
+        return {
+            "narrative": narrative,
+            "consequences": self._consequences(choice, band, rng),
+            "next_options": self._next_options(choice, game_state, rng),
+        }
+
+    def _consequences(
+        self, choice: str, band: str, rng: SplitMix64
+    ) -> List[Dict[str, Any]]:
+        stat = rng.choice(ACTION_STATS.get(choice, ("wisdom",)))
+        value = 1
+        if stat == "karma" and band == "negative":
+            value = 2  # Sincere good deeds weigh more when karma is low
+        consequences = [
+            {"type": "stat_change", "stat": stat, "value": value},
+            {"type": "day_advance", "amount": 1},
+        ]
+        if choice in TIME_FRAGMENT_ACTIONS and rng.next() % 3 == 0:
+            consequences.append({"type": "time_fragment", "amount": 1})
+        return consequences
+
+    def _next_options(
+        self, choice: str, game_state, rng: SplitMix64
+    ) -> List[Dict[str, str]]:
+        candidates = [
+            action
+            for action in self.location_actions.get(
+                game_state.current_location, ["explore", "talk_to_people", "meditate"]
+            )
+            if action != choice and action in ACTIONS
+        ]
+        options = []
+        while candidates and len(options) < 3:
+            action = candidates.pop(rng.next() % len(candidates))
+            options.append({"id": action, "text": ACTIONS[action][1]})
+        return options
@@ -0,0 +1,302 @@
+import cProfile
+import functools
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Deque, Dict, Iterator, List, Optional
+
+_UNSAFE = re.compile(r"[^\w-]")
+
+
+@dataclass(frozen=True)
+class Capture:
+    session_id: str
+    entry: str
+    mode: str
+    started_at: float
+    seconds: float
+    # Collapsed ("folded") stacks, for flamegraph.pl or speedscope
+    folded_path: str
+    # cProfile stats, for pstats or snakeviz (deterministic mode only)
+    stats_path: Optional[str] = None
+
+
+def _label(func) -> str:
+    filename, _, name = func
+    if filename == "~":
+        return name  # Built-in, e.g. <built-in method time.sleep>
+    return f"{os.path.basename(filename)}:{name}"
+
+
+def folded_from_profile(profile: cProfile.Profile) -> Counter:
+    """Collapsed stacks (weighted in microseconds) from a cProfile run.
+
+    cProfile keeps caller -> callee edges, not whole stacks, so time is
+    pushed down each path in proportion to the edge's share of the
+    callee's total. That is exact when every function has one caller.
+    """
+    profile.create_stats()
+    stats = profile.stats
+    callees: Dict = {}
+    for func, (_, _, _, _, callers) in stats.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    stacks: Counter = Counter()
+
+    def walk(func, path, seconds):
+        _, _, self_time, total, _ = stats[func]
+        share = seconds / total if total else 0.0
+        path = path + (_label(func),)
+        micros = round(self_time * share * 1e6)
+        if micros:
+            stacks[";".join(path)] += micros
+        if len(path) >= 200:
+            return
+        for callee, edge_seconds in callees.get(func, ()):
+            if _label(callee) not in path:  # Recursion is folded into the caller
+                walk(callee, path, edge_seconds * share)
+
+    for func, (_, _, _, total, callers) in stats.items():
+        if not callers:
+            walk(func, (), total)
+    return stacks
+
+
+def write_folded(stacks: Counter, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+
+
+class StackSampler:
+    """Samples one thread's Python stack on a timer.
+
+    Stacks are kept collapsed (root;...;leaf -> sample count). Samples
+    include time spent waiting (e.g. on the LLM), which cProfile
+    attributes to a single blocking call.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.001):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="profile-sampler", daemon=True
+        )
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            frames = []
+            while frame is not None:
+                code = frame.f_code
+                frames.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                frame = frame.f_back
+            if frames:
+                self.stacks[";".join(reversed(frames))] += 1
+
+
+class Profiler:
+    """Profiles chosen sessions for their next N turns.
+
+    Arm a session with `arm` (or NAKARA_PROFILE_SESSIONS). Every
+    instrumented entry point it reaches is then profiled, and each
+    capture is written under `directory/<session id>/`:
+
+    - "deterministic" mode runs cProfile and writes its .prof stats plus
+      a .folded file of collapsed stacks derived from them. Best for the
+      CPU-bound fallback tier, where turns take about a millisecond.
+    - "sampling" mode samples the stack every `sample_interval` seconds
+      and writes only the .folded file. It is cheaper and shows
+      wall-clock time, including waits on the LLM.
+
+    Only one cProfile can be enabled in a process at a time, so a
+    deterministic capture that overlaps another one (a turn and a render
+    on different threads) is sampled instead.
+
+    Only the newest `keep` captures are kept on disk. Entry points
+    reached inside a capture, like make_decision inside execute, are part
+    of that capture. Each outermost GameEngine call counts as one turn.
+    The session is disarmed after its last turn.
+    """
+
+    MODES = ("deterministic", "sampling")
+
+    def __init__(
+        self,
+        directory: str = "profiles",
+        keep: int = 50,
+        mode: str = "deterministic",
+        sample_interval: float = 0.001,
+    ):
+        if mode not in self.MODES:
+            raise ValueError(f"mode must be one of {self.MODES}")
+        self.directory = directory
+        self.keep = keep
+        self.mode = mode
+        self.sample_interval = sample_interval
+        # session id -> turns left; "*" profiles every session
+        self.armed: Dict[str, int] = {}
+        self.captures: Deque[Capture] = deque()
+        self._lock = threading.Lock()
+        self._active = threading.local()
+        # Held by the one deterministic capture running in the process
+        self._cprofile_lock = threading.Lock()
+        self._counter = 0
+
+    def arm(self, session_id: str, turns: int = 5):
+        with self._lock:
+            self.armed[session_id] = turns
+
+    def disarm(self, session_id: str):
+        with self._lock:
+            self.armed.pop(session_id, None)
+
+    def is_armed(self, session_id: str) -> bool:
+        return session_id in self.armed or "*" in self.armed
+
+    def recent(self, session_id: Optional[str] = None) -> List[Capture]:
+        """Captures still on disk, newest first"""
+        with self._lock:
+            return [
+                capture
+                for capture in reversed(self.captures)
+                if session_id is None or capture.session_id == session_id
+            ]
+
+    @contextmanager
+    def capture(self, session_id: str, entry: str, turn: bool = False) -> Iterator:
+        """Profile the block if the session is armed (and nothing outer is)"""
+        if not self.armed or getattr(self._active, "on", False):
+            yield
+            return
+        if not self.is_armed(session_id):
+            yield
+            return
+
+        self._active.on = True
+        mode = self.mode
+        owns_cprofile = mode == "deterministic" and self._cprofile_lock.acquire(
+            blocking=False
+        )
+        if mode == "deterministic" and not owns_cprofile:
+            mode = "sampling"
+        if mode == "sampling":
+            profiler = StackSampler(threading.get_ident(), self.sample_interval)
+            start, stop = profiler.start, profiler.stop
+        else:
+            profiler = cProfile.Profile()
+            start, stop = profiler.enable, profiler.disable
+        started_at, started = time.time(), time.perf_counter()
+        start()
+        try:
+            yield
+        finally:
+            stop()
+            if owns_cprofile:
+                self._cprofile_lock.release()
+            self._active.on = False
+            seconds = time.perf_counter() - started
+            try:
+                self._save(session_id, entry, mode, started_at, seconds, profiler)
+            except OSError as e:
+                print(f"Error saving profile for session {session_id}: {e}")
+            if turn:
+                self._count_turn(session_id)
+
+    def _count_turn(self, session_id: str):
+        with self._lock:
+            key = session_id if session_id in self.armed else "*"
+            if key not in self.armed:
+                return
+            self.armed[key] -= 1
+            if self.armed[key] <= 0:
+                del self.armed[key]
+
+    def _save(self, session_id, entry, mode, started_at, seconds, profiler):
+        directory = os.path.join(self.directory, _UNSAFE.sub("_", session_id))
+        os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            self._counter += 1
+            stem = os.path.join(
+                directory, f"{int(started_at)}-{self._counter:05d}-{entry}"
+            )
+
+        stats_path = None
+        if mode == "sampling":
+            write_folded(profiler.stacks, f"{stem}.folded")
+        else:
+            stats_path = f"{stem}.prof"
+            profiler.dump_stats(stats_path)
+            write_folded(folded_from_profile(profiler), f"{stem}.folded")
+
+        capture = Capture(
+            session_id, entry, mode, started_at, seconds, f"{stem}.folded", stats_path
+        )
+        with self._lock:
+            self.captures.append(capture)
+            expired = []
+            while len(self.captures) > self.keep:
+                expired.append(self.captures.popleft())
+        for old in expired:
+            for path in (old.folded_path, old.stats_path):
+                if path is None:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    """Return the process-wide profiler, armed from NAKARA_PROFILE_SESSIONS"""
+    global _profiler
+    if _profiler is not None:
+        return _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler(
+                directory=os.getenv("NAKARA_PROFILE_DIR", "profiles"),
+                keep=int(os.getenv("NAKARA_PROFILE_KEEP", "50")),
+                mode=os.getenv("NAKARA_PROFILE_MODE", "deterministic"),
+            )
+            turns = int(os.getenv("NAKARA_PROFILE_TURNS", "5"))
+            sessions = os.getenv("NAKARA_PROFILE_SESSIONS", "")
+            for session_id in filter(None, sessions.split(",")):
+                _profiler.arm(session_id.strip(), turns)
+        return _profiler
+
+
+def profiled(entry: str):
+    """Method decorator profiling a GameEngine turn entry point"""
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = get_profiler()
+            if not profiler.armed:
+                return method(self, *args, **kwargs)
+            with profiler.capture(self.session_id, entry, turn=True):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
@@ -0,0 +1,206 @@
+import base64
+import functools
+import json
+import os
+import pickle
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import fields, is_dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from . import commands
+from .time_system import TimeEra
+
+RECORDING_VERSION = 1
+
+
+def encode_value(value: Any) -> Any:
+    """JSON-safe form of an engine call argument"""
+    if isinstance(value, TimeEra):
+        return {"era": value.value}
+    if is_dataclass(value) and hasattr(commands, type(value).__name__):
+        return {
+            "command": type(value).__name__,
+            "fields": {
+                f.name: encode_value(getattr(value, f.name)) for f in fields(value)
+            },
+        }
+    if isinstance(value, (list, tuple)):
+        return [encode_value(item) for item in value]
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    # Whole states (load_state) and anything else the engine is handed
+    return {"pickle": base64.b64encode(pickle.dumps(value)).decode("ascii")}
+
+
+def decode_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return [decode_value(item) for item in value]
+    if not isinstance(value, dict):
+        return value
+    if "era" in value:
+        return TimeEra(value["era"])
+    if "command" in value:
+        command = getattr(commands, value["command"])
+        return command(**{k: decode_value(v) for k, v in value["fields"].items()})
+    return pickle.loads(base64.b64decode(value["pickle"]))
+
+
+def _response_to_data(response) -> Dict[str, Any]:
+    usage = getattr(response, "usage", None)
+    return {
+        "content": response.choices[0].message.content,
+        "model": getattr(response, "model", None),
+        "tokens": getattr(usage, "total_tokens", None),
+    }
+
+
+def _response_from_data(data: Dict[str, Any]):
+    """Response object shaped like the OpenAI client's, as llm_stub builds"""
+    return SimpleNamespace(
+        model=data["model"],
+        choices=[SimpleNamespace(message=SimpleNamespace(content=data["content"]))],
+        usage=SimpleNamespace(total_tokens=data["tokens"]),
+    )
+
+
+class SessionRecorder:
+    """Records a session as a compact JSONL log of its inputs.
+
+    Each line is one outermost engine call (a UI turn is one `execute`):
+    its arguments, every LLM response and variant-pool draw it consumed,
+    and the event sequence number it ended on. The first line is a
+    header. A session restored from a snapshot keeps appending to the
+    same file. No seed is recorded: the rest of a turn is deterministic
+    (the procedural narrator seeds itself from the decision).
+    """
+
+    def __init__(self, session_id: str, path: str):
+        self.session_id = session_id
+        self.path = path
+        self.active = False
+        self._step: Optional[Dict[str, Any]] = None
+
+    @classmethod
+    def for_session(cls, session_id: str) -> Optional["SessionRecorder"]:
+        """A recorder under NAKARA_RECORD_DIR, or None when recording is off"""
+        record_dir = os.getenv("NAKARA_RECORD_DIR")
+        if not record_dir:
+            return None
+        os.makedirs(record_dir, exist_ok=True)
+        safe_id = "".join(c if c.isalnum() or c in "-_" else "_" for c in session_id)
+        return cls(session_id, os.path.join(record_dir, f"{safe_id}.jsonl"))
+
+    @contextmanager
+    def step(self, engine, op: str, args, kwargs) -> Iterator:
+        step = {"op": op, "args": encode_value(args)}
+        if kwargs:
+            step["kwargs"] = {k: encode_value(v) for k, v in kwargs.items()}
+        self._step, self.active = step, True
+        try:
+            yield
+        except Exception as e:
+            step["error"] = repr(e)
+            raise
+        finally:
+            self._step, self.active = None, False
+            step["seq"] = engine.events.seq
+            self._write(engine, step)
+
+    def _write(self, engine, step: Dict[str, Any]):
+        lines = []
+        if not os.path.exists(self.path):
+            header = {
+                "version": RECORDING_VERSION,
+                "session_id": self.session_id,
+                "llm": engine.narrative_engine.openai_available,
+                "created_at": time.time(),
+            }
+            lines.append(json.dumps(header))
+        lines.append(json.dumps(step, ensure_ascii=False))
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+        except OSError as e:
+            print(f"Error writing recording for session {self.session_id}: {e}")
+
+    def complete(self, call: Callable[[], Any]):
+        """Run an LLM completion and keep its response (or error)"""
+        try:
+            response = call()
+        except Exception as e:
+            self._add("llm", {"error": repr(e)})
+            raise
+        self._add("llm", _response_to_data(response))
+        return response
+
+    def draw(self, call: Callable[[], Optional[Dict[str, Any]]]):
+        """Run a variant-pool draw and keep what it returned"""
+        variant = call()
+        self._add("variants", variant)
+        return variant
+
+    def _add(self, kind: str, value):
+        if self._step is not None:
+            self._step.setdefault(kind, []).append(value)
+
+
+class ReplayError(Exception):
+    pass
+
+
+class Playback:
+    """Serves a recorded step's LLM responses and variant draws, in order.
+
+    Installed as NarrativeEngine.recording in place of a recorder, so the
+    engine does the same work without the LLM or the shared pool.
+    """
+
+    def __init__(self):
+        self.llm: Deque[Dict[str, Any]] = deque()
+        self.variants: Deque[Optional[Dict[str, Any]]] = deque()
+
+    def load(self, step: Dict[str, Any]):
+        self.llm = deque(step.get("llm", ()))
+        self.variants = deque(step.get("variants", ()))
+
+    def complete(self, call: Callable[[], Any]):
+        if not self.llm:
+            raise ReplayError("the engine made more LLM calls than were recorded")
+        data = self.llm.popleft()
+        if "error" in data:
+            raise ReplayError(f"recorded LLM error: {data['error']}")
+        return _response_from_data(data)
+
+    def draw(self, call: Callable[[], Optional[Dict[str, Any]]]):
+        if not self.variants:
+            raise ReplayError("the engine drew more variants than were recorded")
+        return self.variants.popleft()
+
+
+def read_recording(path: str):
+    """Header and steps of a recording file"""
+    with open(path, "r", encoding="utf-8") as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines or lines[0].get("version") != RECORDING_VERSION:
+        raise ValueError(f"{path} is not a version {RECORDING_VERSION} recording")
+    return lines[0], lines[1:]
+
+
+def recorded(op: str):
+    """Method decorator recording an outermost GameEngine call"""
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            recorder = self.recorder
+            if recorder is None or recorder.active:
+                return method(self, *args, **kwargs)
+            with recorder.step(self, op, args, kwargs):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
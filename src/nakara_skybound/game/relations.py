@@ -0,0 +1,241 @@
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# Column of the session's own player; other players get columns on demand
+DEFAULT_PLAYER = "player"
+
+Delta = Union[int, Sequence[int], np.ndarray]
+
+
+class RelationStore:
+    """How every NPC feels about every player, as columns of NumPy arrays.
+
+    Rows are NPCs and columns are players. Relationship, trust, the loop
+    of the last interaction and a change counter (the NPCMemory version
+    dialogue caches key on) are each an int array of that shape, so
+    world-wide effects such as decay or a loop reset's karma shift are one
+    vectorized update, and queries such as "NPCs here with trust >= 3"
+    are one comparison. Remembered actions and revealed secrets stay as
+    Python lists per cell. NPCMemory objects are views of one cell.
+    """
+
+    def __init__(self, players: Iterable[str] = (DEFAULT_PLAYER,), capacity: int = 8):
+        self.npc_ids: List[str] = []
+        self.npc_index: Dict[str, int] = {}
+        self.player_ids: List[str] = list(players)
+        self.player_index = {p: col for col, p in enumerate(self.player_ids)}
+        shape = (capacity, len(self.player_ids))
+        self.relationship = np.zeros(shape, dtype=np.int32)
+        self.trust = np.zeros(shape, dtype=np.int32)
+        self.last_interaction = np.full(shape, -1, dtype=np.int32)
+        self.version = np.zeros(shape, dtype=np.int64)
+        # (row, col) -> list
+        self.player_actions: Dict[Tuple[int, int], List[Dict[str, Any]]] = {}
+        self.secrets_revealed: Dict[Tuple[int, int], List[str]] = {}
+
+    # Rows and columns
+
+    def add_npc(self, npc_id: str) -> int:
+        """Row of `npc_id`, added with neutral values if new"""
+        row = self.npc_index.get(npc_id)
+        if row is not None:
+            return row
+        row = len(self.npc_ids)
+        if row == self.relationship.shape[0]:
+            extra = max(row, 1)
+            self.relationship = _grow(self.relationship, extra, 0, axis=0)
+            self.trust = _grow(self.trust, extra, 0, axis=0)
+            self.last_interaction = _grow(self.last_interaction, extra, -1, axis=0)
+            self.version = _grow(self.version, extra, 0, axis=0)
+        self.npc_ids.append(npc_id)
+        self.npc_index[npc_id] = row
+        return row
+
+    def add_player(self, player_id: str) -> int:
+        """Column of `player_id`, added with neutral values if new"""
+        col = self.player_index.get(player_id)
+        if col is not None:
+            return col
+        col = len(self.player_ids)
+        self.relationship = _grow(self.relationship, 1, 0, axis=1)
+        self.trust = _grow(self.trust, 1, 0, axis=1)
+        self.last_interaction = _grow(self.last_interaction, 1, -1, axis=1)
+        self.version = _grow(self.version, 1, 0, axis=1)
+        self.player_ids.append(player_id)
+        self.player_index[player_id] = col
+        return col
+
+    def adopt(self, npc_id: str, memory: "NPCMemoryView") -> "NPCMemoryView":
+        """Move a memory's values into this store and make it a view here"""
+        if memory.store is self:
+            return memory
+        row = self.add_npc(npc_id)
+        col = self.add_player(memory.player_id)
+        NPCMemoryView(self, row, col).assign(memory)
+        memory.store, memory.row, memory.col = self, row, col
+        return memory
+
+    def view(self, npc_id: str, player_id: str = DEFAULT_PLAYER) -> "NPCMemoryView":
+        return NPCMemoryView(self, self.add_npc(npc_id), self.add_player(player_id))
+
+    def _rows(self, npc_ids: Optional[Iterable[str]]) -> Union[slice, np.ndarray]:
+        if npc_ids is None:
+            return slice(0, len(self.npc_ids))
+        return np.fromiter(
+            (self.npc_index[npc_id] for npc_id in npc_ids), dtype=np.intp
+        )
+
+    def _cols(self, player_id: Optional[str]) -> Union[slice, int]:
+        if player_id is None:
+            return slice(None)
+        return self.player_index[player_id]
+
+    # Bulk updates
+
+    def adjust(
+        self,
+        npc_ids: Optional[Sequence[str]] = None,
+        relationship: Delta = 0,
+        trust: Delta = 0,
+        player_id: Optional[str] = DEFAULT_PLAYER,
+    ):
+        """Add to relationship and trust of many NPCs at once.
+
+        `npc_ids` None means every NPC and `player_id` None every player.
+        Deltas are scalars or one value per id; repeated ids add up.
+        """
+        rows, cols = self._rows(npc_ids), self._cols(player_id)
+        relationship = np.asarray(relationship, np.int32)
+        trust = np.asarray(trust, np.int32)
+        if isinstance(cols, slice):
+            # One value per NPC row, the same for every player column
+            relationship = relationship[:, None] if relationship.ndim else relationship
+            trust = trust[:, None] if trust.ndim else trust
+        if isinstance(rows, slice):
+            self.relationship[rows, cols] += relationship
+            self.trust[rows, cols] += trust
+            self.version[rows, cols] += 1
+            return
+        np.add.at(self.relationship, (rows, cols), relationship)
+        np.add.at(self.trust, (rows, cols), trust)
+        np.add.at(self.version, (rows, cols), 1)
+
+    def decay(self, step: int = 1, player_id: Optional[str] = None):
+        """Move every relationship and trust `step` closer to neutral (0)"""
+        n, cols = len(self.npc_ids), self._cols(player_id)
+        for column in (self.relationship, self.trust):
+            values = column[:n, cols]
+            changed = values != 0
+            self.version[:n, cols] += changed
+            column[:n, cols] = np.sign(values) * np.maximum(np.abs(values) - step, 0)
+
+    def touch(
+        self,
+        npc_ids: Sequence[str],
+        loop: int,
+        player_id: Optional[str] = DEFAULT_PLAYER,
+    ):
+        """Record an interaction with each NPC in `npc_ids` during `loop`"""
+        rows, cols = self._rows(npc_ids), self._cols(player_id)
+        self.last_interaction[rows, cols] = loop
+
+    # Queries
+
+    def select(
+        self,
+        npc_ids: Optional[Sequence[str]] = None,
+        player_id: str = DEFAULT_PLAYER,
+        min_trust: Optional[int] = None,
+        min_relationship: Optional[int] = None,
+        max_relationship: Optional[int] = None,
+    ) -> List[str]:
+        """Ids of the NPCs (of `npc_ids`, or all) meeting every threshold"""
+        rows = self._rows(npc_ids)
+        if isinstance(rows, slice):
+            rows = np.arange(len(self.npc_ids))
+        col = self.player_index[player_id]
+        mask = np.ones(len(rows), dtype=bool)
+        if min_trust is not None:
+            mask &= self.trust[rows, col] >= min_trust
+        if min_relationship is not None:
+            mask &= self.relationship[rows, col] >= min_relationship
+        if max_relationship is not None:
+            mask &= self.relationship[rows, col] <= max_relationship
+        return [self.npc_ids[row] for row in rows[mask]]
+
+
+def _grow(column: np.ndarray, extra: int, fill: int, axis: int) -> np.ndarray:
+    shape = list(column.shape)
+    shape[axis] = extra
+    return np.concatenate([column, np.full(shape, fill, dtype=column.dtype)], axis=axis)
+
+
+def _cell_property(column: str) -> property:
+    def get(self) -> int:
+        return getattr(self.store, column).item(self.row, self.col)
+
+    def set(self, value: int):
+        getattr(self.store, column)[self.row, self.col] = value
+
+    return property(get, set)
+
+
+def _list_property(column: str) -> property:
+    # Reading an empty cell stores nothing; add to a list with add_to()
+    def get(self) -> list:
+        return getattr(self.store, column).get((self.row, self.col), [])
+
+    def set(self, value: list):
+        getattr(self.store, column)[self.row, self.col] = value
+
+    return property(get, set)
+
+
+class NPCMemoryView:
+    """One NPC's memory of one player: a cell of a RelationStore"""
+
+    __slots__ = ("store", "row", "col")
+
+    relationship_level = _cell_property("relationship")
+    trust_level = _cell_property("trust")
+    last_interaction_loop = _cell_property("last_interaction")
+    # Bumped on every change, so caches keyed on it (e.g. dialogue) go stale
+    version = _cell_property("version")
+    player_actions = _list_property("player_actions")
+    secrets_revealed = _list_property("secrets_revealed")
+
+    def __init__(self, store: RelationStore, row: int, col: int):
+        self.store = store
+        self.row = row
+        self.col = col
+
+    @property
+    def player_id(self) -> str:
+        return self.store.player_ids[self.col]
+
+    def for_player(self, player_id: str) -> "NPCMemoryView":
+        """The same NPC's memory of another player"""
+        return NPCMemoryView(self.store, self.row, self.store.add_player(player_id))
+
+    def add_to(self, column: str, value):
+        """Append to a list column (player_actions or secrets_revealed)"""
+        getattr(self.store, column).setdefault((self.row, self.col), []).append(value)
+
+    def assign(self, other: "NPCMemoryView"):
+        """Copy another memory's values into this one"""
+        cell, other_cell = (self.row, self.col), (other.row, other.col)
+        for column in ("relationship", "trust", "last_interaction", "version"):
+            getattr(self.store, column)[cell] = getattr(other.store, column)[other_cell]
+        for column in ("player_actions", "secrets_revealed"):
+            values = getattr(other.store, column).get(other_cell)
+            if values is not None:
+                getattr(self.store, column)[cell] = values
+
+    def __getstate__(self):
+        return None, {"store": self.store, "row": self.row, "col": self.col}
+
+    def __setstate__(self, state):
+        _, slots = state
+        for name, value in slots.items():
+            setattr(self, name, value)
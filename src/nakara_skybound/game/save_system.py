@@ -5,6 +5,8 @@ from typing import Any, Dict, Optional
 
 from .character import CharacterClass, Item, Player, Stats
 from .game_engine import GameState
+from .persistent import pmap, pvector
+from .tracing import traced
 
 
 class SaveSystem:
@@ -17,6 +19,7 @@ class SaveSystem:
         if not os.path.exists(self.save_directory):
             os.makedirs(self.save_directory)
 
+    @traced("save_game")
     def save_game(self, game_state: GameState, save_name: str = None) -> bool:
         """Save current game state"""
         if save_name is None:
@@ -34,6 +37,7 @@ class SaveSystem:
             print(f"Error saving game: {e}")
             return False
 
+    @traced("load_game")
     def load_game(self, save_name: str) -> Optional[GameState]:
         """Load game state from save file"""
         try:
@@ -106,11 +110,16 @@ class SaveSystem:
             "current_location": game_state.current_location,
             "current_scene": game_state.current_scene,
             "player": self._serialize_player(game_state.player),
-            "world_state": game_state.world_state,
-            "active_quests": game_state.active_quests,
+            "world_state": dict(game_state.world_state.items()),
+            "active_quests": list(game_state.active_quests),
+            "completed_quests": list(game_state.completed_quests),
             "time_fragments": game_state.time_fragments,
             "loop_count": game_state.loop_count,
-            "decisions_made": game_state.decisions_made,
+            "current_day": game_state.current_day,
+            "decisions_made": [
+                {**decision, "era": decision["era"].value}
+                for decision in game_state.decisions_made
+            ],
             "save_timestamp": datetime.now().isoformat(),
         }
 
@@ -154,11 +163,16 @@ class SaveSystem:
         game_state.current_location = save_data["current_location"]
         game_state.current_scene = save_data["current_scene"]
         game_state.player = self._deserialize_player(save_data["player"])
-        game_state.world_state = save_data["world_state"]
-        game_state.active_quests = save_data["active_quests"]
+        game_state.world_state = pmap(save_data["world_state"])
+        game_state.active_quests = pvector(save_data["active_quests"])
+        game_state.completed_quests = pvector(save_data.get("completed_quests", []))
         game_state.time_fragments = save_data["time_fragments"]
         game_state.loop_count = save_data["loop_count"]
-        game_state.decisions_made = save_data["decisions_made"]
+        game_state.current_day = save_data.get("current_day", 1)
+        game_state.decisions_made = [
+            {**decision, "era": TimeEra(decision["era"])}
+            for decision in save_data["decisions_made"]
+        ]
 
         return game_state
 
@@ -0,0 +1,486 @@
+import hashlib
+import hmac
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+from weakref import WeakValueDictionary
+
+from .game_engine import GameEngine
+
+# Compact snapshot format; bump when GameEngine.snapshot() changes shape
+SNAPSHOT_VERSION = 1
+
+
+def encode_snapshot(engine: GameEngine) -> bytes:
+    payload = pickle.dumps(
+        {"version": SNAPSHOT_VERSION, "engine": engine.snapshot()},
+        protocol=pickle.HIGHEST_PROTOCOL,
+    )
+    return zlib.compress(payload, 6)
+
+
+def decode_snapshot(blob: bytes) -> GameEngine:
+    data = pickle.loads(zlib.decompress(blob))
+    if data.get("version") != SNAPSHOT_VERSION:
+        raise ValueError(f"Unsupported snapshot version {data.get('version')}")
+    return GameEngine.from_snapshot(data["engine"])
+
+
+class DirectorySnapshots:
+    """Hibernated sessions as one compressed file each"""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        return os.path.join(self.directory, f"{session_id}.snap")
+
+    def save(self, session_id: str, blob: bytes):
+        tmp_path = f"{self._path(session_id)}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(blob)
+        os.replace(tmp_path, self._path(session_id))
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        try:
+            with open(self._path(session_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def delete(self, session_id: str):
+        try:
+            os.remove(self._path(session_id))
+        except FileNotFoundError:
+            pass
+
+    def session_ids(self) -> List[str]:
+        return [
+            filename[: -len(".snap")]
+            for filename in os.listdir(self.directory)
+            if filename.endswith(".snap")
+        ]
+
+
+class SessionMoved(Exception):
+    """Raised when saving a session that another worker has since claimed"""
+
+
+class SQLiteSnapshots:
+    """Hibernated sessions in a SQLite file shared by several processes.
+
+    With an `owner` (the worker id), loading a session claims it and saving
+    only succeeds while this worker still holds the claim, so a worker that
+    lost a session in a handoff cannot overwrite the new owner's progress.
+    """
+
+    def __init__(self, path: str, owner: Optional[str] = None):
+        self.path = path
+        self.owner = owner
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "session_id TEXT PRIMARY KEY, owner TEXT, "
+            "snapshot BLOB NOT NULL, updated_at REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def save(self, session_id: str, blob: bytes):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO sessions VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET "
+                "snapshot = excluded.snapshot, owner = excluded.owner, "
+                "updated_at = excluded.updated_at "
+                "WHERE sessions.owner IS NULL OR excluded.owner IS NULL "
+                "OR sessions.owner = excluded.owner",
+                (session_id, self.owner, blob, time.time()),
+            )
+            if cursor.rowcount == 0:
+                raise SessionMoved(session_id)
+
+    def load(self, session_id: str) -> Optional[bytes]:
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT snapshot FROM sessions WHERE session_id = ?", (session_id,)
+            ).fetchone()
+            if row is not None and self.owner is not None:
+                self._conn.execute(
+                    "UPDATE sessions SET owner = ? WHERE session_id = ?",
+                    (self.owner, session_id),
+                )
+        return row[0] if row else None
+
+    def delete(self, session_id: str):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "DELETE FROM sessions WHERE session_id = ?", (session_id,)
+            )
+
+    def session_ids(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT session_id FROM sessions").fetchall()
+        return [row[0] for row in rows]
+
+
+class SessionStore:
+    """Keeps recently used GameEngines in memory and hibernates the rest.
+
+    Engines are held in LRU order. When more than `max_resident` are in
+    memory, or their estimated size exceeds `memory_budget` bytes, the
+    least recently used idle ones are written to `snapshots` and dropped.
+    `get()` rehydrates a hibernated session transparently. Sessions in use
+    via `session()` are pinned and never evicted mid-turn. Whatever reads
+    or changes an engine (a turn, a render) also holds `lock()`. With
+    `write_through`, every use is also saved on exit, so another process
+    sharing `snapshots` can take the session over at any time.
+    """
+
+    def __init__(
+        self,
+        snapshots,
+        max_resident: int = 200,
+        memory_budget: Optional[int] = None,
+        write_through: bool = False,
+    ):
+        self.snapshots = snapshots
+        self.max_resident = max_resident
+        self.memory_budget = memory_budget
+        self.write_through = write_through
+
+        self._resident: "OrderedDict[str, GameEngine]" = OrderedDict()
+        self._last_used: Dict[str, float] = {}
+        self._pins: Dict[str, int] = {}
+        # session id -> lock held while a turn, a render or I/O uses it
+        self._engine_locks: "WeakValueDictionary[str, threading.RLock]" = (
+            WeakValueDictionary()
+        )
+        # session id -> (event seq when measured, estimated bytes)
+        self._sizes: Dict[str, tuple] = {}
+        self._lock = threading.RLock()
+        self._rehydrate_ms: List[float] = []
+        self.stats = {"created": 0, "hibernated": 0, "rehydrated": 0}
+
+    def get(self, session_id: str) -> GameEngine:
+        """Return the session's engine, rehydrating or creating it"""
+        return self._checkout(session_id, pin=False)
+
+    def _checkout(self, session_id: str, pin: bool) -> GameEngine:
+        engine = self._touch(session_id, pin)
+        if engine is None:
+            # Loaded outside the store lock, so other sessions are served
+            # meanwhile; the session's lock stops a second load of it
+            with self.lock(session_id):
+                engine = self._touch(session_id, pin)
+                if engine is None:
+                    engine = self._rehydrate(session_id)
+                    created = engine is None
+                    if created:
+                        engine = GameEngine(session_id)
+                    with self._lock:
+                        if created:
+                            self.stats["created"] += 1
+                        self._resident[session_id] = engine
+                    self._touch(session_id, pin)
+        self._enforce_limits(keep=session_id)
+        return engine
+
+    def _touch(self, session_id: str, pin: bool) -> Optional[GameEngine]:
+        """The resident engine, marked as just used (and pinned), or None"""
+        with self._lock:
+            engine = self._resident.get(session_id)
+            if engine is not None:
+                self._resident.move_to_end(session_id)
+                self._last_used[session_id] = time.monotonic()
+                if pin:
+                    self._pins[session_id] = self._pins.get(session_id, 0) + 1
+            return engine
+
+    @contextmanager
+    def session(self, session_id: str) -> Iterator[GameEngine]:
+        """Use a session's engine, pinned in memory until the block exits"""
+        engine = self._checkout(session_id, pin=True)
+        try:
+            yield engine
+        finally:
+            with self._lock:
+                self._pins[session_id] -= 1
+                if not self._pins[session_id]:
+                    del self._pins[session_id]
+                self._last_used[session_id] = time.monotonic()
+            if self.write_through:
+                # Whoever still holds the session's lock saves it on exit
+                lock = self.lock(session_id)
+                if lock.acquire(blocking=False):
+                    try:
+                        with self._lock:
+                            resident = self._resident.get(session_id) is engine
+                        if resident:
+                            self._save(session_id, engine)
+                    finally:
+                        lock.release()
+            # The turn may have grown the engine past the budget
+            self._enforce_limits()
+
+    def lock(self, session_id: str) -> threading.RLock:
+        """The lock a session's turns, renders and disk I/O take turns on.
+
+        Take it inside `session()`, which keeps the engine resident. It
+        lives only while someone holds or waits for it.
+        """
+        with self._lock:
+            lock = self._engine_locks.get(session_id)
+            if lock is None:
+                lock = self._engine_locks[session_id] = threading.RLock()
+            return lock
+
+    def hibernate(self, session_id: str) -> bool:
+        """Write a resident, unpinned session to disk and drop it from memory"""
+        with self._lock:
+            if session_id not in self._resident or session_id in self._pins:
+                return False
+        lock = self.lock(session_id)
+        if not lock.acquire(blocking=False):
+            return False  # In use; it is pinned or about to be
+        try:
+            with self._lock:
+                engine = self._resident.get(session_id)
+                if engine is None or session_id in self._pins:
+                    return False
+                last_used = self._last_used.get(session_id)
+            saved = self._save(session_id, engine)
+            with self._lock:
+                if session_id in self._pins or (
+                    self._last_used.get(session_id) != last_used
+                ):
+                    return False  # Picked up again while it was being saved
+                if saved:
+                    self.stats["hibernated"] += 1
+                engine = self._resident.pop(session_id, None)
+                self._sizes.pop(session_id, None)
+        finally:
+            lock.release()
+        if engine is not None:
+            engine.close()
+        return True
+
+    def release(self, session_id: str) -> bool:
+        """Drop a resident, unpinned session without saving it"""
+        with self._lock:
+            if session_id in self._pins:
+                return False
+            engine = self._resident.pop(session_id, None)
+            self._sizes.pop(session_id, None)
+        if engine is not None:
+            engine.close()
+        return True
+
+    def resident_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._resident)
+
+    def _save(self, session_id: str, engine: GameEngine) -> bool:
+        try:
+            self.snapshots.save(session_id, encode_snapshot(engine))
+            return True
+        except SessionMoved:
+            # Another worker owns it now; our copy is stale
+            print(f"Session {session_id} moved to another worker, releasing it")
+            self.release(session_id)
+            return False
+
+    def hibernate_idle(self, max_idle_seconds: float) -> int:
+        """Hibernate every session unused for longer than `max_idle_seconds`"""
+        cutoff = time.monotonic() - max_idle_seconds
+        with self._lock:
+            idle = [
+                session_id
+                for session_id in self._resident
+                if self._last_used.get(session_id, 0) < cutoff
+            ]
+        return sum(self.hibernate(session_id) for session_id in idle)
+
+    def flush(self):
+        """Persist every resident session without evicting it"""
+        with self._lock:
+            resident = list(self._resident.items())
+        for session_id, engine in resident:
+            with self.lock(session_id):
+                self._save(session_id, engine)
+
+    def drop(self, session_id: str):
+        """Forget a session entirely, in memory and on disk"""
+        with self.lock(session_id):
+            with self._lock:
+                engine = self._resident.pop(session_id, None)
+                self._last_used.pop(session_id, None)
+                self._sizes.pop(session_id, None)
+            self.snapshots.delete(session_id)
+        if engine is not None:
+            engine.close()
+
+    def _rehydrate(self, session_id: str) -> Optional[GameEngine]:
+        started = time.perf_counter()
+        blob = self.snapshots.load(session_id)
+        if blob is None:
+            return None
+        try:
+            engine = decode_snapshot(blob)
+        except Exception as e:
+            print(f"Error rehydrating session {session_id}: {e}")
+            return None
+        with self._lock:
+            self._rehydrate_ms.append((time.perf_counter() - started) * 1000)
+            del self._rehydrate_ms[:-1000]
+            self.stats["rehydrated"] += 1
+        return engine
+
+    def _estimate_size(self, session_id: str, engine: GameEngine) -> int:
+        """Approximate bytes held by an engine, re-measured as its log grows.
+
+        Measured under the session's lock, outside the store lock; a
+        session busy with a turn keeps its last measurement until later.
+        """
+        with self._lock:
+            measured = self._sizes.get(session_id)
+        if measured is not None and engine.events.seq - measured[0] < 25:
+            return measured[1]
+        lock = self.lock(session_id)
+        if not lock.acquire(blocking=False):
+            return measured[1] if measured is not None else 0
+        try:
+            seq = engine.events.seq
+            size = len(pickle.dumps(engine.snapshot(), pickle.HIGHEST_PROTOCOL))
+        finally:
+            lock.release()
+        with self._lock:
+            if self._resident.get(session_id) is engine:
+                self._sizes[session_id] = (seq, size)
+        return size
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            resident = list(self._resident.items())
+        return sum(
+            self._estimate_size(session_id, engine) for session_id, engine in resident
+        )
+
+    def _over_limits(self) -> bool:
+        with self._lock:
+            if len(self._resident) > self.max_resident:
+                return True
+        return self.memory_budget is not None and (
+            self.resident_bytes() > self.memory_budget
+        )
+
+    def _enforce_limits(self, keep: Optional[str] = None):
+        with self._lock:
+            candidates = list(self._resident)
+        for session_id in candidates:
+            if not self._over_limits():
+                break
+            if session_id != keep:
+                self.hibernate(session_id)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            latencies = sorted(self._rehydrate_ms)
+            resident_ids = set(self._resident)
+            pinned = len(self._pins)
+        hibernated = len(set(self.snapshots.session_ids()) - resident_ids)
+
+        def percentile(p: float) -> float:
+            if not latencies:
+                return 0.0
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+        return {
+            **self.stats,
+            "resident": len(resident_ids),
+            "hibernated": hibernated,
+            "pinned": pinned,
+            "resident_bytes": self.resident_bytes(),
+            "memory_budget": self.memory_budget,
+            "rehydrate_ms_p50": percentile(0.5),
+            "rehydrate_ms_p95": percentile(0.95),
+            "rehydrate_ms_max": latencies[-1] if latencies else 0.0,
+        }
+
+
+_secret: Optional[bytes] = None
+_secret_lock = threading.Lock()
+
+
+def _session_secret() -> bytes:
+    """NAKARA_SESSION_SECRET (shared by every worker), else one per process"""
+    global _secret
+    with _secret_lock:
+        if _secret is None:
+            secret = os.getenv("NAKARA_SESSION_SECRET")
+            _secret = secret.encode() if secret else os.urandom(32)
+        return _secret
+
+
+def session_token(session_id: str) -> str:
+    """Token that lets its holder resume `session_id` from a link"""
+    return hmac.new(_session_secret(), session_id.encode(), hashlib.sha256).hexdigest()
+
+
+def check_session_token(session_id: str, token: Optional[str]) -> bool:
+    return bool(token) and hmac.compare_digest(token, session_token(session_id))
+
+
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Return the process-wide session store, configured from the environment"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            budget_mb = os.getenv("NAKARA_SESSION_MEMORY_MB")
+            session_db = os.getenv("NAKARA_SESSION_DB")
+            if session_db:
+                # Shared with other worker processes; see cluster.py
+                snapshots = SQLiteSnapshots(
+                    session_db, owner=os.getenv("NAKARA_WORKER_ID")
+                )
+            else:
+                snapshots = DirectorySnapshots(
+                    os.getenv("NAKARA_SESSION_DIR", "sessions")
+                )
+            _store = SessionStore(
+                snapshots,
+                max_resident=int(os.getenv("NAKARA_MAX_RESIDENT_SESSIONS", "200")),
+                memory_budget=int(budget_mb) * 1024 * 1024 if budget_mb else None,
+                write_through=bool(session_db),
+            )
+            idle_seconds = os.getenv("NAKARA_SESSION_IDLE_SECONDS")
+            if idle_seconds:
+                _start_idle_sweeper(_store, float(idle_seconds))
+        return _store
+
+
+def _start_idle_sweeper(store: SessionStore, idle_seconds: float):
+    """Hibernate idle sessions in the background, even with no new traffic"""
+
+    def sweep():
+        while True:
+            time.sleep(max(1.0, idle_seconds / 4))
+            try:
+                store.hibernate_idle(idle_seconds)
+            except Exception as e:
+                print(f"Error hibernating idle sessions: {e}")
+
+    threading.Thread(target=sweep, name="session-sweeper", daemon=True).start()
@@ -0,0 +1,84 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+from .persistent import PMap, PVector
+from .time_system import TimeEra
+
+
+@dataclass(frozen=True)
+class Branch:
+    """A point-in-time view of the world that can be resumed later.
+
+    `world_state` and `active_quests` are persistent structures shared
+    with the GameState they were taken from, so a fork is O(1) and only
+    later changes on either side allocate new nodes.
+    """
+
+    id: str
+    parent: Optional[str]
+    era: TimeEra
+    location: str
+    world_state: PMap
+    active_quests: PVector
+    player_stats: Dict[str, int]
+    time_fragments: int
+    loop: int
+    day: int
+
+    def to_era_state(self) -> Dict[str, Any]:
+        """The shape MemorySystem.get_era_state has always returned"""
+        return {
+            "world_state": self.world_state,
+            "active_quests": self.active_quests,
+            "location": self.location,
+            "player_stats": self.player_stats,
+        }
+
+
+class Timeline:
+    """Named branches of the game state, for era travel and what-if play"""
+
+    def __init__(self):
+        self.branches: Dict[str, Branch] = {}
+        self.current: Optional[str] = None
+
+    def fork(self, branch_id: str, game_state) -> Branch:
+        """Capture the current state as `branch_id`, replacing any older one"""
+        branch = Branch(
+            id=branch_id,
+            parent=self.current,
+            era=game_state.current_era,
+            location=game_state.current_location,
+            world_state=game_state.world_state,
+            active_quests=game_state.active_quests,
+            player_stats=game_state.player.stats.as_dict(),
+            time_fragments=game_state.time_fragments,
+            loop=game_state.loop_count,
+            day=game_state.current_day,
+        )
+        self.branches[branch_id] = branch
+        return branch
+
+    def get(self, branch_id: str) -> Optional[Branch]:
+        return self.branches.get(branch_id)
+
+    def switch_to(self, branch_id: str) -> Optional[Branch]:
+        branch = self.branches.get(branch_id)
+        if branch is not None:
+            self.current = branch_id
+        return branch
+
+    def lineage(self, branch_id: str) -> List[str]:
+        """Branch ids from `branch_id` back to the root"""
+        ids = []
+        branch = self.branches.get(branch_id)
+        while branch is not None and branch.id not in ids:
+            ids.append(branch.id)
+            branch = self.branches.get(branch.parent) if branch.parent else None
+        return ids
+
+    def __contains__(self, branch_id: str) -> bool:
+        return branch_id in self.branches
+
+    def __len__(self) -> int:
+        return len(self.branches)
@@ -0,0 +1,276 @@
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+TOKEN_BUCKETS = (100, 250, 500, 1000, 2000, 4000, 8000, 16000)
+
+# Labels are (name, value) pairs in a fixed order, so they can key a dict
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Prometheus-style cumulative histogram, one series per label set"""
+
+    def __init__(self, name: str, help_text: str, buckets: Tuple[float, ...]):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        # labels -> [count per bucket (+Inf last), sum]
+        self.series: Dict[Labels, List] = {}
+
+    def observe(self, value: float, labels: Labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help_text}",
+            f"# TYPE {self.name} histogram",
+        ]
+        for labels, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                le = _format_labels(labels + (("le", str(bound)),))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {total}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {cumulative}")
+        return lines
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in labels)
+    return "{" + pairs + "}"
+
+
+class Span:
+    """One timed step of a trace; use `set` to attach attributes"""
+
+    __slots__ = (
+        "tracer",
+        "name",
+        "attrs",
+        "parent",
+        "trace_id",
+        "span_id",
+        "token",
+        "start",
+        "wall_start",
+    )
+
+    def __init__(self, tracer: "Tracer", name: str, attrs: Dict[str, Any]):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+        self.parent: Optional[Span] = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    def __enter__(self) -> "Span":
+        self.parent = _current_span.get()
+        if self.parent is None:
+            self.trace_id = os.urandom(16).hex()
+        else:
+            self.trace_id = self.parent.trace_id
+        self.span_id = os.urandom(8).hex()
+        self.token = _current_span.set(self)
+        self.wall_start = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        _current_span.reset(self.token)
+        if exc_type is not None:
+            self.attrs["error"] = exc_type.__name__
+        self.tracer._finish(self, duration)
+        return False
+
+
+class _NullSpan:
+    """Stands in for Span when tracing is off; every method is a no-op"""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        pass
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+_current_span: contextvars.ContextVar = contextvars.ContextVar(
+    "nakara_span", default=None
+)
+
+
+class Tracer:
+    """Nested timing spans plus latency, token and cache-hit metrics.
+
+    Spans nest through a context variable, so each thread (and each turn)
+    builds its own tree. A trace's spans are appended to a JSONL log when
+    its root span ends, and every span's duration feeds a latency
+    histogram exported in the Prometheus text format. When disabled,
+    `span` returns a shared no-op object and the metric calls return
+    immediately.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        span_log_path: Optional[str] = None,
+        metrics_path: Optional[str] = None,
+        metrics_interval: float = 5.0,
+    ):
+        self.enabled = enabled
+        self.span_log_path = span_log_path
+        self.metrics_path = metrics_path
+        self.metrics_interval = metrics_interval
+        self.latency = Histogram(
+            "nakara_span_duration_seconds",
+            "Time spent in each traced step",
+            LATENCY_BUCKETS,
+        )
+        self.tokens = Histogram(
+            "nakara_llm_tokens", "LLM tokens used per call", TOKEN_BUCKETS
+        )
+        # (name, labels) -> count
+        self.counters: Dict[Tuple[str, Labels], int] = {}
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._metrics_written_at = 0.0
+
+    def span(self, name: str, **attrs):
+        """Context manager timing `name` as a child of the current span"""
+        if not self.enabled:
+            return _NULL_SPAN
+        return Span(self, name, attrs)
+
+    def observe_tokens(self, tokens: int, **labels):
+        if not self.enabled:
+            return
+        with self._lock:
+            self.tokens.observe(tokens, tuple(sorted(labels.items())))
+
+    def count(self, name: str, amount: int = 1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def cache_lookup(self, cache: str, hit: bool):
+        self.count(
+            "nakara_cache_lookups_total", cache=cache, result="hit" if hit else "miss"
+        )
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            lines = self.latency.render() + self.tokens.render()
+            names = sorted({name for name, _ in self.counters})
+            for name in names:
+                lines.append(f"# TYPE {name} counter")
+                for (counter, labels), value in sorted(self.counters.items()):
+                    if counter == name:
+                        lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_metrics(self, path: Optional[str] = None):
+        """Write the Prometheus text to a file (atomically)"""
+        path = path or self.metrics_path
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(self.render_prometheus())
+        os.replace(tmp_path, path)
+
+    def _finish(self, span: Span, duration: float):
+        record = {
+            "trace_id": span.trace_id,
+            "span_id": span.span_id,
+            "parent_id": span.parent.span_id if span.parent else None,
+            "name": span.name,
+            "start": span.wall_start,
+            "duration_ms": round(duration * 1000, 3),
+            "attrs": span.attrs,
+        }
+        with self._lock:
+            self.latency.observe(duration, (("span", span.name),))
+            self._pending.setdefault(span.trace_id, []).append(record)
+            if span.parent is not None:
+                return
+            # Root span: the whole trace is done
+            records = self._pending.pop(span.trace_id)
+            if self.span_log_path:
+                try:
+                    with open(self.span_log_path, "a", encoding="utf-8") as f:
+                        for entry in records:
+                            f.write(
+                                json.dumps(entry, ensure_ascii=False, default=str)
+                                + "\n"
+                            )
+                except OSError as e:
+                    print(f"Error writing span log: {e}")
+            write_metrics = (
+                self.metrics_path is not None
+                and time.monotonic() - self._metrics_written_at >= self.metrics_interval
+            )
+            if write_metrics:
+                self._metrics_written_at = time.monotonic()
+        if write_metrics:
+            try:
+                self.write_metrics()
+            except OSError as e:
+                print(f"Error writing metrics: {e}")
+
+
+_tracer: Optional[Tracer] = None
+_tracer_lock = threading.Lock()
+
+
+def get_tracer() -> Tracer:
+    """Return the process-wide tracer; NAKARA_TRACE=1 turns it on"""
+    global _tracer
+    if _tracer is not None:
+        return _tracer
+    with _tracer_lock:
+        if _tracer is None:
+            _tracer = Tracer(
+                enabled=os.getenv("NAKARA_TRACE") == "1",
+                span_log_path=os.getenv("NAKARA_TRACE_LOG"),
+                metrics_path=os.getenv("NAKARA_METRICS_PATH"),
+            )
+        return _tracer
+
+
+def traced(name: str):
+    """Method decorator running the call inside a span tagged with the
+    instance's session_id"""
+
+    def decorate(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            tracer = get_tracer()
+            if not tracer.enabled:
+                return method(self, *args, **kwargs)
+            with tracer.span(name, session=getattr(self, "session_id", None)):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorate
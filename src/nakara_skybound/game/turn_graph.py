@@ -0,0 +1,162 @@
+import os
+import threading
+import uuid
+from collections.abc import Mapping
+from enum import Enum
+from typing import Any, Dict, List, Optional, TypedDict
+
+from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import END, START, StateGraph
+
+from .time_system import TimeEra
+
+
+class TurnState(TypedDict, total=False):
+    decision_id: str
+    choice: str
+    # The decision record, with its era as a plain value for the checkpointer
+    decision: Dict[str, Any]
+    narrative: Dict[str, Any]
+    npc_reactions: List[Dict[str, Any]]
+    echoes: List[int]
+    result: Dict[str, Any]
+
+
+def _engine(config):
+    return config["configurable"]["engine"]
+
+
+def _decision(state: TurnState) -> Dict[str, Any]:
+    return {**state["decision"], "era": TimeEra(state["decision"]["era"])}
+
+
+def _plain(value: Any) -> Any:
+    """Node output as plain data the checkpointer can serialize"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, Mapping):
+        return {k: _plain(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v) for v in value]
+    return value
+
+
+def prepare_node(state: TurnState, config) -> TurnState:
+    decision = _engine(config)._prepare_decision(state["decision_id"], state["choice"])
+    return {"decision": _plain(decision)}
+
+
+def narrative_node(state: TurnState, config) -> TurnState:
+    return {"narrative": _plain(_engine(config)._narrate(_decision(state)))}
+
+
+def npc_reactions_node(state: TurnState, config) -> TurnState:
+    return {"npc_reactions": _plain(_engine(config)._npc_reactions())}
+
+
+def recall_node(state: TurnState, config) -> TurnState:
+    return {"echoes": _plain(_engine(config)._recall(_decision(state)))}
+
+
+def conclude_node(state: TurnState, config) -> TurnState:
+    result = _engine(config)._conclude_decision(
+        _decision(state),
+        state["narrative"],
+        state["npc_reactions"],
+        state["echoes"],
+    )
+    return {"result": result}
+
+
+def build_turn_graph(checkpointer=None):
+    """make_decision as a graph: prepare, then a parallel fan-out, then apply.
+
+    Narrative generation (the LLM call), NPC reactions and memory recall
+    only read the state, so they run concurrently and the turn takes as
+    long as the slowest of them. Only conclude changes state: it records
+    the decision and applies its consequences.
+    """
+    graph = StateGraph(TurnState)
+    graph.add_node("prepare", prepare_node)
+    graph.add_node("narrate", narrative_node)
+    graph.add_node("react", npc_reactions_node)
+    graph.add_node("recall", recall_node)
+    graph.add_node("conclude", conclude_node)
+
+    graph.add_edge(START, "prepare")
+    fan_out = ["narrate", "react", "recall"]
+    for node in fan_out:
+        graph.add_edge("prepare", node)
+    graph.add_edge(fan_out, "conclude")
+    graph.add_edge("conclude", END)
+    return graph.compile(checkpointer=checkpointer)
+
+
+class TurnGraph:
+    """The compiled turn graph and its checkpointer, shared by all sessions.
+
+    Every turn runs on its own checkpoint thread. When a node fails, the
+    engine keeps the thread as its interrupted turn, and the next
+    make_decision with the same input resumes it: finished nodes (the
+    LLM narrative in particular) are not run again. Checkpoints are
+    dropped once a turn completes or is abandoned. Nothing is recorded
+    before conclude, so an abandoned turn leaves no trace in the state.
+
+    Checkpoints live in this process only. An interrupted turn is not
+    part of an engine snapshot, so after hibernation (or on another
+    worker) the same decision simply runs again from the start.
+    """
+
+    def __init__(self):
+        self.checkpointer = MemorySaver()
+        self.graph = build_turn_graph(self.checkpointer)
+
+    def run(self, engine, decision_id: str, choice: str) -> Dict[str, Any]:
+        pending = engine.interrupted_turn
+        if pending is not None and pending[1:] == (decision_id, choice):
+            thread_id, inputs = pending[0], None
+        else:
+            if pending is not None:
+                self.checkpointer.delete_thread(pending[0])
+            thread_id = f"{engine.session_id}:{uuid.uuid4().hex}"
+            inputs = {"decision_id": decision_id, "choice": choice}
+
+        engine.interrupted_turn = (thread_id, decision_id, choice)
+        config = {"configurable": {"thread_id": thread_id, "engine": engine}}
+        final = self.graph.invoke(inputs, config)
+        engine.interrupted_turn = None
+        self.checkpointer.delete_thread(thread_id)
+        return final["result"]
+
+    def discard(self, engine):
+        """Drop the checkpoints of an engine's interrupted turn, if any"""
+        pending, engine.interrupted_turn = engine.interrupted_turn, None
+        if pending is not None:
+            self.checkpointer.delete_thread(pending[0])
+
+
+def wants_turn_graph(engine, decision_id: str) -> bool:
+    """Whether a decision runs on the graph (NAKARA_TURN_GRAPH).
+
+    "auto" uses it only for turns that wait on the LLM, since the
+    fallback tier takes well under the graph's own overhead.
+    """
+    mode = os.getenv("NAKARA_TURN_GRAPH", "auto")
+    if mode == "auto":
+        return engine.narrative_engine.needs_llm(decision_id)
+    return mode == "always"
+
+
+_turn_graph: Optional[TurnGraph] = None
+_turn_graph_lock = threading.Lock()
+
+
+def get_turn_graph() -> TurnGraph:
+    """Return the process-wide turn graph"""
+    global _turn_graph
+    if _turn_graph is not None:
+        return _turn_graph
+    with _turn_graph_lock:
+        if _turn_graph is None:
+            _turn_graph = TurnGraph()
+        return _turn_graph
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+from concurrent import futures
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from .commands import Command, CommandResult
+from .session_store import SessionStore, get_session_store
+
+
+class TurnHandle:
+    """A turn running in the background; poll done() and read outcomes()"""
+
+    def __init__(self, session_id: str, commands: List[Command], future: Future):
+        self.session_id = session_id
+        self.commands = commands
+        self.future = future
+        self.started_at = time.monotonic()
+
+    def done(self) -> bool:
+        return self.future.done()
+
+    def wait(self, timeout: float) -> bool:
+        """Block up to `timeout` seconds; True if the turn has finished"""
+        futures.wait([self.future], timeout=timeout)
+        return self.future.done()
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def outcomes(self) -> List[CommandResult]:
+        """Results of the turn's commands; re-raises if the turn failed"""
+        return self.future.result()
+
+
+class TurnRunner:
+    """Runs each session's turns on a background thread pool.
+
+    A session has at most one turn in flight: submitting while one is
+    pending returns the pending handle and drops the new commands, so a
+    double click can never start a second LLM call. A finished turn stays
+    available until the session collects it.
+    """
+
+    def __init__(self, store: SessionStore, max_workers: int = 8):
+        self.store = store
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="turn"
+        )
+        self._handles: Dict[str, TurnHandle] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, session_id: str, commands: List[Command]) -> TurnHandle:
+        with self._lock:
+            handle = self._handles.get(session_id)
+            if handle is not None:
+                return handle
+            future = self._executor.submit(self._run, session_id, commands)
+            handle = TurnHandle(session_id, commands, future)
+            self._handles[session_id] = handle
+            return handle
+
+    def pending(self, session_id: str) -> Optional[TurnHandle]:
+        """The session's current turn, finished or not, until collected"""
+        with self._lock:
+            return self._handles.get(session_id)
+
+    def collect(self, session_id: str) -> Optional[TurnHandle]:
+        """Take the session's turn if it has finished"""
+        with self._lock:
+            handle = self._handles.get(session_id)
+            if handle is None or not handle.done():
+                return None
+            return self._handles.pop(session_id)
+
+    def _run(self, session_id: str, commands: List[Command]) -> List[CommandResult]:
+        try:
+            # Pinned for the whole turn, so it cannot be hibernated mid-way,
+            # and locked, so no render reads the engine half-way through
+            with (
+                self.store.session(session_id) as game_engine,
+                self.store.lock(session_id),
+            ):
+                return game_engine.execute(commands)
+        except Exception as e:
+            print(f"Error running turn for session {session_id}: {e}")
+            raise
+
+
+_runner: Optional[TurnRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_turn_runner() -> TurnRunner:
+    """Return the process-wide turn runner"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = TurnRunner(
+                get_session_store(),
+                max_workers=int(os.getenv("NAKARA_TURN_WORKERS", "8")),
+            )
+        return _runner
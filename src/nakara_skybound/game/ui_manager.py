@@ -1,189 +1,328 @@
-from typing import Any, Dict, List
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Set
 
 import streamlit as st
 
-from .character import CharacterClass, Player
+from .character import Player
+from .commands import (
+    Command,
+    CreateCharacter,
+    MoveTo,
+    TakeAction,
+    TravelThroughTime,
+    TriggerLoop,
+)
+from .derived import view
+from .event_log import EventType
 from .game_engine import GameEngine, GameState
+from .profiling import get_profiler
+from .session_store import get_session_store
 from .time_system import TimeEra
+from .tracing import get_tracer
+from .turn_runner import get_turn_runner
+from .world import World
+
+# Which UI parts each kind of state change makes stale
+PART_EVENTS: Dict[str, Set[EventType]] = {
+    "sidebar": {
+        EventType.STAT_CHANGED,
+        EventType.STATS_CHANGED,
+        EventType.ITEM_GAINED,
+        EventType.FRAGMENTS_CHANGED,
+        EventType.DAY_ADVANCED,
+        EventType.LOCATION_CHANGED,
+        EventType.ERA_CHANGED,
+        EventType.LOOP_RESET,
+        EventType.CHARACTER_CREATED,
+        EventType.BRANCH_RESTORED,
+    },
+    "info": {
+        EventType.QUEST_UPDATED,
+        EventType.FRAGMENTS_CHANGED,
+        EventType.DAY_ADVANCED,
+        EventType.LOCATION_CHANGED,
+        EventType.ERA_CHANGED,
+        EventType.ERA_STATE_RESTORED,
+        EventType.LOOP_RESET,
+        EventType.BRANCH_RESTORED,
+    },
+    "scene": set(EventType),
+    "actions": set(EventType),
+}
+
+
+def _enqueue(command: Command):
+    """Button callback: queue a command for handle_user_actions"""
+    st.session_state.commands.push(command)
+
+
+@view(
+    "player.stats", "decisions_made", "current_day", "time_fragments", "active_quests"
+)
+def cycle_summary(engine: GameEngine) -> Dict[str, Any]:
+    """Narrative summary of the current cycle, rebuilt only when it changes"""
+    state = engine.state
+    # Create narrative summary instead of data tables
+    karma = state.player.stats.karma
+    decisions_count = len(state.decisions_made)
+    days_used = state.current_day if state.current_day <= 7 else 7
+
+    # Build narrative summary
+    summary_parts = []
+
+    # Opening
+    summary_parts.append(
+        f"ในวัฏจักรที่ผ่านไป คุณได้ใช้เวลา {days_used} วัน และตัดสินใจสำคัญไป {decisions_count} ครั้ง"
+    )
+
+    # Karma assessment with narrative
+    if karma > 15:
+        summary_parts.append(
+            "การกระทำของคุณได้สร้างกรรมดีอย่างล้นเหลือ ดวงวิญญาณของคุณเปล่งประกายด้วยความบริสุทธิ์"
+        )
+    elif karma > 10:
+        summary_parts.append("คุณได้สร้างกรรมดีไว้มากมาย ผู้คนจะจดจำความเมตตาของคุณ")
+    elif karma > 0:
+        summary_parts.append("คุณมีกรรมดีเล็กน้อย แต่ยังมีที่ให้ปรับปรุง")
+    elif karma == 0:
+        summary_parts.append("คุณรักษาสมดุลระหว่างดีและชั่วไว้ได้ ทางกลางคือภูมิปัญญา")
+    elif karma > -10:
+        summary_parts.append("คุณมีกรรมลบเล็กน้อย แต่ยังมีโอกาสแก้ไข")
+    else:
+        summary_parts.append("การกระทำของคุณได้สร้างกรรมลบไว้มาก เงาของความผิดติดตามคุณไป")
+
+    # Time fragments and wisdom
+    if state.time_fragments > 5:
+        summary_parts.append(
+            f"คุณรวบรวมเศษเวลาได้ {state.time_fragments} ชิ้น ซึ่งแสดงถึงความเข้าใจในธรรมชาติของเวลา"
+        )
 
+    if state.player.stats.wisdom > 20:
+        summary_parts.append("ปัญญาของคุณได้เติบโตจนกลายเป็นปราชญ์ผู้ยิ่งใหญ่")
+    elif state.player.stats.wisdom > 15:
+        summary_parts.append("ปัญญาของคุณเติบโตขึ้นอย่างน่าประทับใจ")
 
-class UIManager:
-    def __init__(self):
-        self.current_scene = None
+    # Quests
+    if state.active_quests:
+        if len(state.active_quests) == 1:
+            summary_parts.append(
+                f"คุณยังคงมีภารกิจ '{state.active_quests[0]}' ที่ต้องดำเนินการต่อ"
+            )
+        else:
+            summary_parts.append(
+                f"คุณมีภารกิจ {len(state.active_quests)} อย่างที่รอการดำเนินการ"
+            )
 
-    def render_game_state(self, state: GameState):
-        """Render the current game state UI"""
-        # Handle user input first to avoid loops
-        self._handle_pending_actions(state)
+    # Future prediction
+    if karma > 5:
+        summary_parts.append(
+            "\n\nในวัฏจักรหน้า ผู้คนจะต้อนรับคุณด้วยรอยยิ้ม และเปิดใจให้ความช่วยเหลือ กรรมดีที่คุณสั่งสมจะเป็นแสงนำทางในความมืด"
+        )
+    elif karma < -5:
+        summary_parts.append(
+            "\n\nในวัฏจักรหน้า ผู้คนจะหลีกเลี่ยงสายตาคุณ ความไม่ไว้วางใจจะเป็นเงาที่ตามติด แต่ยังมีโอกาสที่จะแก้ไขกรรมลบ"
+        )
+    else:
+        summary_parts.append(
+            "\n\nในวัฏจักรหน้า ทุกอย่างยังเป็นไปได้ ชะตากรรมยังไม่ถูกกำหนด และคุณยังมีอำนาจที่จะเปลี่ยนแปลงอนาคต"
+        )
 
-        # Sidebar with player info
-        self._render_sidebar(state)
+    return {
+        "narrative": " ".join(summary_parts),
+        "decisions": decisions_count,
+        "days": days_used,
+        "karma": karma,
+        "wisdom": state.player.stats.wisdom,
+        "fragments": state.time_fragments,
+        "quests": len(state.active_quests),
+    }
 
-        # Main game area
-        col1, col2 = st.columns([2, 1])
 
-        with col1:
-            self._render_main_scene(state)
+class UIManager:
+    """Renders the game as four fragments: sidebar, scene, action bar, info.
 
-        with col2:
-            self._render_info_panel(state)
+    A widget inside a fragment reruns only that fragment. If the engine's
+    event log has moved on since the page was last drawn (or a command
+    is waiting for handle_user_actions), the fragment escalates to a full
+    app rerun, so other parts never show stale state.
+    """
 
-    def _handle_pending_actions(self, state: GameState):
-        """Handle pending actions without causing infinite loops"""
-        # Handle character creation completion
-        if (
-            hasattr(st.session_state, "should_update_character")
-            and st.session_state.should_update_character
-        ):
-            # Update player info
-            state.player.name = st.session_state.player_name
-            state.player.character_class = CharacterClass(st.session_state.player_class)
+    def __init__(self):
+        self.current_scene = None
+        # Engine of the full run in progress; fragment reruns look it up
+        self._active_engine = None
 
-            # Reset stats based on new class
-            state.player._set_class_stats()
+    def render_game_state(self, session_id: str, game_engine: GameEngine):
+        """Render the current game state UI"""
+        st.session_state.rendered_version = game_engine.events.seq
+        self._active_engine = game_engine
+        profiler = get_profiler()
+        try:
+            with get_tracer().span("render", session=session_id), profiler.capture(
+                session_id, "UIManager.render_game_state"
+            ):
+                # Sidebar with player info
+                with st.sidebar:
+                    self._sidebar_fragment(session_id)
+
+                # Main game area
+                col1, col2 = st.columns([2, 1])
 
-            # Change scene to post-creation
-            state.current_scene = "character_created"
+                with col1:
+                    self._scene_fragment(session_id)
+                    self._action_bar_fragment(session_id)
 
-            # Give starting time fragments
-            state.time_fragments = 2
+                with col2:
+                    self._info_fragment(session_id)
+        finally:
+            self._active_engine = None
+
+    @contextmanager
+    def _engine(self, session_id: str, part: str) -> Iterator[GameEngine]:
+        # Fragments are replayed with their original arguments, so they take
+        # the session id and fetch the engine, which may have been
+        # hibernated and rehydrated since the last full run
+        tracer, profiler = get_tracer(), get_profiler()
+        with tracer.span(f"render_{part}", session=session_id), profiler.capture(
+            session_id, f"UIManager.render_{part}"
+        ):
+            if self._active_engine is not None:
+                yield self._active_engine
+                return
+            if get_turn_runner().pending(session_id):
+                # A turn started since the page was drawn; the full run
+                # shows its placeholder instead of waiting on it here
+                st.rerun(scope="app")
+            store = get_session_store()
+            with store.session(session_id) as game_engine, store.lock(session_id):
+                yield game_engine
+
+    def _sync(self, part: str, game_engine: GameEngine):
+        """Escalate a fragment rerun to a full rerun when needed.
+
+        That is when a command is waiting for handle_user_actions, or
+        when the state has changed in a way that other parts display.
+        """
+        if st.session_state.commands:
+            st.rerun(scope="app")
+
+        rendered = st.session_state.get("rendered_version", 0)
+        seq = game_engine.events.seq
+        if seq == rendered:
+            return
+        if seq < rendered or rendered < game_engine.events.base_seq:
+            # Rewound: anything on screen may be from a discarded future.
+            # Or the events since the last render already left memory.
+            st.rerun(scope="app")
+        changed = {event.type for event in game_engine.events.events_since(rendered)}
+        stale = {name for name, types in PART_EVENTS.items() if changed & types}
+        if stale - {part}:
+            st.rerun(scope="app")
+        st.session_state.rendered_version = seq
+
+    @st.fragment
+    def _sidebar_fragment(self, session_id: str):
+        with self._engine(session_id, "sidebar") as game_engine:
+            self._sync("sidebar", game_engine)
+            self._render_sidebar(game_engine)
+
+    @st.fragment
+    def _scene_fragment(self, session_id: str):
+        with self._engine(session_id, "scene") as game_engine:
+            self._sync("scene", game_engine)
+            self._render_main_scene(game_engine)
+
+    @st.fragment
+    def _action_bar_fragment(self, session_id: str):
+        with self._engine(session_id, "actions") as game_engine:
+            self._sync("actions", game_engine)
+            self._render_action_bar(game_engine)
+
+    @st.fragment
+    def _info_fragment(self, session_id: str):
+        with self._engine(session_id, "info") as game_engine:
+            self._sync("info", game_engine)
+            self._render_info_panel(game_engine)
+
+    def _render_sidebar(self, game_engine: GameEngine):
+        """Render player information sidebar"""
+        state = game_engine.get_current_state()
+        st.header(f"🧙‍♂️ {state.player.name}")
+        st.subheader(f"นัก{state.player.character_class.value}")
+
+        # Era and location indicator with more detailed info
+        era_info = {
+            TimeEra.PAST: ("🏛️", "อดีตกาล", "ยุคทองของอัษฎานคร"),
+            TimeEra.PRESENT: ("🏙️", "ปัจจุบันกาล", "ยุคแห่งการเปลี่ยนแปลง"),
+            TimeEra.FUTURE: ("🌆", "อนาคตกาล", "ยุคแห่งผลลัพธ์"),
+        }
+        era_icon, era_name, era_desc = era_info.get(
+            state.current_era, ("❓", "ไม่ทราบ", "")
+        )
+        st.write(f"**ยุค:** {era_icon} {era_name}")
+        if era_desc:
+            st.caption(era_desc)
 
-            # Clear the flag
-            st.session_state.should_update_character = False
-            st.session_state.character_created = True
+        # Location with Thai names
+        location_names = {
+            "central_plaza": "จัตุรัสกลางเมือง",
+            "temple": "วัดพระแก้ว",
+            "market": "ตลาดโบราณ",
+            "library": "หอสมุดแห่งกาล",
+            "palace": "พระราชวัง",
+        }
+        current_location_thai = location_names.get(
+            state.current_location, state.current_location
+        )
+        st.write(f"**สถานที่:** 📍 {current_location_thai}")
 
-    def _render_sidebar(self, state: GameState):
-        """Render player information sidebar"""
-        with st.sidebar:
-            st.header(f"🧙‍♂️ {state.player.name}")
-            st.subheader(f"นัก{state.player.character_class.value}")
-
-            # Era and location indicator with more detailed info
-            era_info = {
-                TimeEra.PAST: ("🏛️", "อดีตกาล", "ยุคทองของอัษฎานคร"),
-                TimeEra.PRESENT: ("🏙️", "ปัจจุบันกาล", "ยุคแห่งการเปลี่ยนแปลง"),
-                TimeEra.FUTURE: ("🌆", "อนาคตกาล", "ยุคแห่งผลลัพธ์"),
-            }
-            era_icon, era_name, era_desc = era_info.get(
-                state.current_era, ("❓", "ไม่ทราบ", "")
-            )
-            st.write(f"**ยุค:** {era_icon} {era_name}")
-            if era_desc:
-                st.caption(era_desc)
-
-            # Location with Thai names
-            location_names = {
-                "central_plaza": "จัตุรัสกลางเมือง",
-                "temple": "วัดพระแก้ว",
-                "market": "ตลาดโบราณ",
-                "library": "หอสมุดแห่งกาล",
-                "palace": "พระราชวัง",
-            }
-            current_location_thai = location_names.get(
-                state.current_location, state.current_location
-            )
-            st.write(f"**สถานที่:** 📍 {current_location_thai}")
+        # Player stats with more visual feedback
+        st.subheader("📊 สถานะ")
+        stats = state.player.stats
 
-            # Player stats with more visual feedback
-            st.subheader("📊 สถานะ")
-            stats = state.player.stats
+        # Changes since the sidebar was last drawn, from the event log
+        seen = st.session_state.get("stats_seen_seq")
+        deltas = None if seen is None else game_engine.views.get("stat_deltas", seen)
+        st.session_state.stats_seen_seq = game_engine.events.seq
 
-            col1, col2 = st.columns(2)
-            with col1:
-                st.metric(
-                    "ปัญญา",
-                    stats.wisdom,
-                    delta=(
-                        None
-                        if not hasattr(st.session_state, "last_wisdom")
-                        else stats.wisdom
-                        - st.session_state.get("last_wisdom", stats.wisdom)
-                    ),
-                )
-                st.metric(
-                    "กำลัง",
-                    stats.strength,
-                    delta=(
-                        None
-                        if not hasattr(st.session_state, "last_strength")
-                        else stats.strength
-                        - st.session_state.get("last_strength", stats.strength)
-                    ),
-                )
-                st.metric(
-                    "เวทมนตร์",
-                    stats.mysticism,
-                    delta=(
-                        None
-                        if not hasattr(st.session_state, "last_mysticism")
-                        else stats.mysticism
-                        - st.session_state.get("last_mysticism", stats.mysticism)
-                    ),
-                )
+        def delta(name: str):
+            return None if deltas is None else deltas[name]
 
-            with col2:
-                st.metric(
-                    "เสน่ห์",
-                    stats.charisma,
-                    delta=(
-                        None
-                        if not hasattr(st.session_state, "last_charisma")
-                        else stats.charisma
-                        - st.session_state.get("last_charisma", stats.charisma)
-                    ),
-                )
-                st.metric(
-                    "กรรม",
-                    stats.karma,
-                    delta=(
-                        None
-                        if not hasattr(st.session_state, "last_karma")
-                        else stats.karma
-                        - st.session_state.get("last_karma", stats.karma)
-                    ),
-                )
-                st.metric(
-                    "เศษเวลา",
-                    state.time_fragments,
-                    delta=(
-                        None
-                        if not hasattr(st.session_state, "last_fragments")
-                        else state.time_fragments
-                        - st.session_state.get("last_fragments", state.time_fragments)
-                    ),
-                )
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("ปัญญา", stats.wisdom, delta=delta("wisdom"))
+            st.metric("กำลัง", stats.strength, delta=delta("strength"))
+            st.metric("เวทมนตร์", stats.mysticism, delta=delta("mysticism"))
 
-            # Store current stats for next comparison
-            st.session_state.last_wisdom = stats.wisdom
-            st.session_state.last_strength = stats.strength
-            st.session_state.last_mysticism = stats.mysticism
-            st.session_state.last_charisma = stats.charisma
-            st.session_state.last_karma = stats.karma
-            st.session_state.last_fragments = state.time_fragments
-
-            # Day and loop counter with progress visualization
-            day_progress = state.current_day / 7
-            st.write(f"**วันที่:** {state.current_day}/7")
-            st.progress(day_progress, text=f"ความคืบหนาในวัฏจักร")
-            st.write(f"**รอบที่:** {state.loop_count + 1}")
-
-            # Show inventory if player has items
-            if state.player.inventory:
-                st.subheader("🎒 สิ่งของ")
-                for item in state.player.inventory[:3]:  # Show first 3 items
-                    # Handle both Item objects and dictionaries
-                    if hasattr(item, "name"):
-                        item_name = item.name
-                    elif isinstance(item, dict):
-                        item_name = item.get("name", "ไม่ทราบชื่อ")
-                    else:
-                        item_name = str(item)
-                    st.write(f"• {item_name}")
-                if len(state.player.inventory) > 3:
-                    st.caption(f"และอีก {len(state.player.inventory) - 3} รายการ...")
+        with col2:
+            st.metric("เสน่ห์", stats.charisma, delta=delta("charisma"))
+            st.metric("กรรม", stats.karma, delta=delta("karma"))
+            st.metric("เศษเวลา", state.time_fragments, delta=delta("time_fragments"))
+
+        # Day and loop counter with progress visualization
+        day_progress = state.current_day / 7
+        st.write(f"**วันที่:** {state.current_day}/7")
+        st.progress(day_progress, text=f"ความคืบหนาในวัฏจักร")
+        st.write(f"**รอบที่:** {state.loop_count + 1}")
+
+        # Show inventory if player has items
+        if state.player.inventory:
+            st.subheader("🎒 สิ่งของ")
+            for item in state.player.inventory[:3]:  # Show first 3 items
+                # Handle both Item objects and dictionaries
+                if hasattr(item, "name"):
+                    item_name = item.name
+                elif isinstance(item, dict):
+                    item_name = item.get("name", "ไม่ทราบชื่อ")
+                else:
+                    item_name = str(item)
+                st.write(f"• {item_name}")
+            if len(state.player.inventory) > 3:
+                st.caption(f"และอีก {len(state.player.inventory) - 3} รายการ...")
 
-    def _render_main_scene(self, state: GameState):
+    def _render_main_scene(self, game_engine: GameEngine):
         """Render the main game scene"""
+        state = game_engine.get_current_state()
         # Display location with era-specific styling
         location_names = {
             "central_plaza": "จัตุรัสกลางเมือง",
@@ -220,9 +359,9 @@ class UIManager:
         elif state.current_scene == "action_result":
             self._render_action_result_scene(state)
         elif state.current_scene == "loop_reset":
-            self._render_loop_reset_scene(state)
+            self._render_loop_reset_scene(state, game_engine.views.get("cycle_summary"))
         else:
-            self._render_standard_scene(state)
+            self._render_standard_scene(state, game_engine.world)
 
     def _display_action_result(self, result: Dict[str, Any]):
         """Display the result of an action as flowing narrative"""
@@ -292,6 +431,13 @@ class UIManager:
                     )
                     narrative_parts.append(f"\n\n{consequence_sentence}")
 
+        # NPCs who remember the player, and echoes of earlier loops
+        for reaction in result.get("npc_reactions", []):
+            narrative_parts.append(f"\n\n{reaction['text']}")
+        if result.get("echoes"):
+            loops = ", ".join(str(loop) for loop in result["echoes"])
+            narrative_parts.append(f"\n\nคุณรู้สึกคุ้นเคย ราวกับเคยทำเช่นนี้มาแล้วในรอบที่ {loops}")
+
         # Display as a single flowing narrative
         complete_narrative = "".join(narrative_parts)
 
@@ -300,19 +446,25 @@ class UIManager:
             st.markdown("### 📖 เรื่องราว")
             st.markdown(f"*{complete_narrative}*")
 
-    def _render_standard_scene(self, state: GameState):
-        """Render a standard game scene with enhanced actions"""
-        # Get location description from world
-        from .world import World
-
-        world = World()
-        world.initialize_locations()
-
+    def _render_standard_scene(self, state: GameState, world: World):
+        """Render a standard game scene; its actions are in the action bar"""
         location_desc = world.get_location_description(
             state.current_location, state.current_era
         )
         st.write(location_desc)
 
+    def _render_action_bar(self, game_engine: GameEngine):
+        """Render the actions and NPCs available in a standard scene"""
+        state = game_engine.get_current_state()
+        if state.current_scene in (
+            "game_start",
+            "character_created",
+            "action_result",
+            "loop_reset",
+        ):
+            return
+        world = game_engine.world
+
         # Enhanced available actions with variety
         available_actions = world.get_available_actions(state.current_location)
         if available_actions:
@@ -348,12 +500,12 @@ class UIManager:
                             "explore": "สำรวจ",
                             "investigate": "ตรวจสอบ",
                         }
-                        if st.button(
+                        st.button(
                             action_names.get(action, action),
                             key=f"explore_{action}_{i}",
-                        ):
-                            st.session_state.action_taken = action
-                            st.session_state.action_category = "exploration"
+                            on_click=_enqueue,
+                            args=(TakeAction(action, "exploration"),),
+                        )
 
             if social_actions:
                 st.write("**💬 การสื่อสาร:**")
@@ -365,11 +517,12 @@ class UIManager:
                             "gossip": "ฟังข่าวลือ",
                             "negotiate": "เจรจา",
                         }
-                        if st.button(
-                            action_names.get(action, action), key=f"social_{action}_{i}"
-                        ):
-                            st.session_state.action_taken = action
-                            st.session_state.action_category = "social"
+                        st.button(
+                            action_names.get(action, action),
+                            key=f"social_{action}_{i}",
+                            on_click=_enqueue,
+                            args=(TakeAction(action, "social"),),
+                        )
 
             if spiritual_actions:
                 st.write("**🧘 การปฏิบัติธรรม:**")
@@ -381,12 +534,12 @@ class UIManager:
                             "pray": "สวดมนตร์",
                             "study_texts": "ศึกษาคัมภีร์",
                         }
-                        if st.button(
+                        st.button(
                             action_names.get(action, action),
                             key=f"spiritual_{action}_{i}",
-                        ):
-                            st.session_state.action_taken = action
-                            st.session_state.action_category = "spiritual"
+                            on_click=_enqueue,
+                            args=(TakeAction(action, "spiritual"),),
+                        )
 
         # Show NPCs with interaction options
         npcs = world.get_npcs_in_location(state.current_location)
@@ -397,12 +550,16 @@ class UIManager:
                 with col1:
                     st.write(f"• **{npc.name}** - {npc.role}")
                 with col2:
-                    if st.button(f"คุย", key=f"talk_to_{npc.id}"):
-                        st.session_state.action_taken = f"talk_to_{npc.id}"
-                        st.session_state.action_category = "npc_interaction"
+                    st.button(
+                        f"คุย",
+                        key=f"talk_to_{npc.id}",
+                        on_click=_enqueue,
+                        args=(TakeAction(f"talk_to_{npc.id}", "npc_interaction"),),
+                    )
 
-    def _render_info_panel(self, state: GameState):
+    def _render_info_panel(self, game_engine: GameEngine):
         """Render information panel with all locations available"""
+        state = game_engine.get_current_state()
         st.subheader("📋 ข้อมูล")
 
         # Show current day progress with warning as it approaches 7
@@ -446,13 +603,20 @@ class UIManager:
 
         col1, col2 = st.columns(2)
         with col1:
-            if st.button("🚶 ไปเลย", key="instant_travel"):
-                st.session_state.new_location = selected_location
+            st.button(
+                "🚶 ไปเลย",
+                key="instant_travel",
+                on_click=_enqueue,
+                args=(MoveTo(selected_location),),
+            )
         with col2:
             # Time cost for travel (advances day)
-            if st.button("🏃 ไปอย่างรวดเร็ว", key="fast_travel"):
-                st.session_state.new_location = selected_location
-                st.session_state.advance_day = True
+            st.button(
+                "🏃 ไปอย่างรวดเร็ว",
+                key="fast_travel",
+                on_click=_enqueue,
+                args=(MoveTo(selected_location, advance_day=True),),
+            )
 
         # Time travel options
         st.subheader("⏰ การเดินทางข้ามเวลา")
@@ -462,19 +626,31 @@ class UIManager:
             st.write("🏛️ เดินทางสู่อดีต")
             st.caption(f"ต้องการเศษเวลา 3 ชิ้น (คุณมี {state.time_fragments} ชิ้น)")
         else:
-            if st.button("🏛️ เดินทางสู่อดีต", key="travel_past"):
-                st.session_state.pending_time_travel = TimeEra.PAST
+            st.button(
+                "🏛️ เดินทางสู่อดีต",
+                key="travel_past",
+                on_click=_enqueue,
+                args=(TravelThroughTime(TimeEra.PAST),),
+            )
 
         if state.time_fragments < 5:
             st.write("🌆 เดินทางสู่อนาคต")
             st.caption(f"ต้องการเศษเวลา 5 ชิ้น (คุณมี {state.time_fragments} ชิ้น)")
         else:
-            if st.button("🌆 เดินทางสู่อนาคต", key="travel_future"):
-                st.session_state.pending_time_travel = TimeEra.FUTURE
+            st.button(
+                "🌆 เดินทางสู่อนาคต",
+                key="travel_future",
+                on_click=_enqueue,
+                args=(TravelThroughTime(TimeEra.FUTURE),),
+            )
 
         if state.current_era != TimeEra.PRESENT:
-            if st.button("🏙️ กลับสู่ปัจจุบัน", key="travel_present"):
-                st.session_state.pending_time_travel = TimeEra.PRESENT
+            st.button(
+                "🏙️ กลับสู่ปัจจุบัน",
+                key="travel_present",
+                on_click=_enqueue,
+                args=(TravelThroughTime(TimeEra.PRESENT),),
+            )
 
         # Loop control with story completion check
         st.subheader("🔄 วัฏจักรเวลา")
@@ -483,8 +659,12 @@ class UIManager:
             st.write("คุณได้เรียนรู้อะไรบ้างในวัฏจักรนี้?")
             if st.button("📖 ดูบทสรุป", key="view_summary"):
                 st.session_state.show_summary = True
-            if st.button("🔄 เริ่มวัฏจักรใหม่", key="trigger_loop"):
-                st.session_state.trigger_loop = True
+            st.button(
+                "🔄 เริ่มวัฏจักรใหม่",
+                key="trigger_loop",
+                on_click=_enqueue,
+                args=(TriggerLoop(),),
+            )
         else:
             st.info(f"เหลืออีก {7 - state.current_day} วัน ก่อนวัฏจักรจะสิ้นสุด")
             # Show what will happen when cycle completes
@@ -492,95 +672,30 @@ class UIManager:
 
         # Show summary if requested
         if hasattr(st.session_state, "show_summary") and st.session_state.show_summary:
-            self._show_cycle_summary(state)
+            self._show_cycle_summary(game_engine.views.get("cycle_summary"))
 
-    def _show_cycle_summary(self, state: GameState):
+    def _show_cycle_summary(self, summary: Dict[str, Any]):
         """Show summary of the current cycle"""
         st.subheader("📜 บทสรุปวัฏจักรนี้")
+        self._render_cycle_summary(summary)
 
-        # Create narrative summary instead of data tables
-        karma = state.player.stats.karma
-        decisions_count = len(state.decisions_made)
-        days_used = state.current_day if state.current_day <= 7 else 7
-
-        # Build narrative summary
-        summary_parts = []
-
-        # Opening
-        summary_parts.append(
-            f"ในวัฏจักรที่ผ่านไป คุณได้ใช้เวลา {days_used} วัน และตัดสินใจสำคัญไป {decisions_count} ครั้ง"
-        )
-
-        # Karma assessment with narrative
-        if karma > 15:
-            summary_parts.append(
-                "การกระทำของคุณได้สร้างกรรมดีอย่างล้นเหลือ ดวงวิญญาณของคุณเปล่งประกายด้วยความบริสุทธิ์"
-            )
-        elif karma > 10:
-            summary_parts.append("คุณได้สร้างกรรมดีไว้มากมาย ผู้คนจะจดจำความเมตตาของคุณ")
-        elif karma > 0:
-            summary_parts.append("คุณมีกรรมดีเล็กน้อย แต่ยังมีที่ให้ปรับปรุง")
-        elif karma == 0:
-            summary_parts.append("คุณรักษาสมดุลระหว่างดีและชั่วไว้ได้ ทางกลางคือภูมิปัญญา")
-        elif karma > -10:
-            summary_parts.append("คุณมีกรรมลบเล็กน้อย แต่ยังมีโอกาสแก้ไข")
-        else:
-            summary_parts.append("การกระทำของคุณได้สร้างกรรมลบไว้มาก เงาของความผิดติดตามคุณไป")
-
-        # Time fragments and wisdom
-        if state.time_fragments > 5:
-            summary_parts.append(
-                f"คุณรวบรวมเศษเวลาได้ {state.time_fragments} ชิ้น ซึ่งแสดงถึงความเข้าใจในธรรมชาติของเวลา"
-            )
-
-        if state.player.stats.wisdom > 20:
-            summary_parts.append("ปัญญาของคุณได้เติบโตจนกลายเป็นปราชญ์ผู้ยิ่งใหญ่")
-        elif state.player.stats.wisdom > 15:
-            summary_parts.append("ปัญญาของคุณเติบโตขึ้นอย่างน่าประทับใจ")
-
-        # Quests
-        if state.active_quests:
-            if len(state.active_quests) == 1:
-                summary_parts.append(
-                    f"คุณยังคงมีภารกิจ '{state.active_quests[0]}' ที่ต้องดำเนินการต่อ"
-                )
-            else:
-                summary_parts.append(
-                    f"คุณมีภารกิจ {len(state.active_quests)} อย่างที่รอการดำเนินการ"
-                )
-
-        # Future prediction
-        if karma > 5:
-            summary_parts.append(
-                "\n\nในวัฏจักรหน้า ผู้คนจะต้อนรับคุณด้วยรอยยิ้ม และเปิดใจให้ความช่วยเหลือ กรรมดีที่คุณสั่งสมจะเป็นแสงนำทางในความมืด"
-            )
-        elif karma < -5:
-            summary_parts.append(
-                "\n\nในวัฏจักรหน้า ผู้คนจะหลีกเลี่ยงสายตาคุณ ความไม่ไว้วางใจจะเป็นเงาที่ตามติด แต่ยังมีโอกาสที่จะแก้ไขกรรมลบ"
-            )
-        else:
-            summary_parts.append(
-                "\n\nในวัฏจักรหน้า ทุกอย่างยังเป็นไปได้ ชะตากรรมยังไม่ถูกกำหนด และคุณยังมีอำนาจที่จะเปลี่ยนแปลงอนาคต"
-            )
-
-        # Display as flowing narrative
-        complete_summary = " ".join(summary_parts)
-
+    def _render_cycle_summary(self, summary: Dict[str, Any]):
+        """Show a cycle summary as flowing narrative"""
         with st.container():
-            st.markdown(f"*{complete_summary}*")
+            st.markdown(f"*{summary['narrative']}*")
 
         # Simple stats for reference
         with st.expander("📊 ดูรายละเอียดเพิ่มเติม"):
             col1, col2, col3 = st.columns(3)
             with col1:
-                st.metric("การตัดสินใจ", decisions_count)
-                st.metric("วันที่ใช้", days_used)
+                st.metric("การตัดสินใจ", summary["decisions"])
+                st.metric("วันที่ใช้", summary["days"])
             with col2:
-                st.metric("กรรม", karma)
-                st.metric("ปัญญา", state.player.stats.wisdom)
+                st.metric("กรรม", summary["karma"])
+                st.metric("ปัญญา", summary["wisdom"])
             with col3:
-                st.metric("เศษเวลา", state.time_fragments)
-                st.metric("ภารกิจ", len(state.active_quests))
+                st.metric("เศษเวลา", summary["fragments"])
+                st.metric("ภารกิจ", summary["quests"])
 
     def _render_intro_scene(self, state: GameState):
         """Render the game introduction scene"""
@@ -633,12 +748,18 @@ class UIManager:
         st.session_state.form_name = name
         st.session_state.form_class = character_class
 
-        if st.button("เริ่มการเดินทาง", key="start_journey_btn"):
-            # Store character creation data
-            st.session_state.player_name = name
-            st.session_state.player_class = character_class
-            st.session_state.should_update_character = True
-            # Don't call st.rerun() here - let the next render cycle handle it
+        # Read the widgets in the callback: an edit still in the text box
+        # arrives together with the click
+        st.button(
+            "เริ่มการเดินทาง",
+            key="start_journey_btn",
+            on_click=lambda: _enqueue(
+                CreateCharacter(
+                    st.session_state.character_name_input,
+                    st.session_state.character_class_select,
+                )
+            ),
+        )
 
     def _render_post_creation_scene(self, state: GameState):
         """Render scene after character creation"""
@@ -659,16 +780,28 @@ class UIManager:
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            if st.button("🔍 สำรวจรอบๆ", key="explore_btn"):
-                st.session_state.action_taken = "explore"
+            st.button(
+                "🔍 สำรวจรอบๆ",
+                key="explore_btn",
+                on_click=_enqueue,
+                args=(TakeAction("explore"),),
+            )
 
         with col2:
-            if st.button("💬 คุยกับคนใกล้ๆ", key="talk_btn"):
-                st.session_state.action_taken = "talk"
+            st.button(
+                "💬 คุยกับคนใกล้ๆ",
+                key="talk_btn",
+                on_click=_enqueue,
+                args=(TakeAction("talk"),),
+            )
 
         with col3:
-            if st.button("🧘 ทำสมาธิ", key="meditate_btn"):
-                st.session_state.action_taken = "meditate"
+            st.button(
+                "🧘 ทำสมาธิ",
+                key="meditate_btn",
+                on_click=_enqueue,
+                args=(TakeAction("meditate"),),
+            )
 
     def _render_action_result_scene(self, state: GameState):
         """Render scene after an action has been taken"""
@@ -682,26 +815,42 @@ class UIManager:
             cols = st.columns(min(len(last_result["next_options"]), 3))
             for i, option in enumerate(last_result["next_options"]):
                 with cols[i % 3]:
-                    if st.button(option["text"], key=f"next_option_{option['id']}_{i}"):
-                        st.session_state.action_taken = option["id"]
+                    st.button(
+                        option["text"],
+                        key=f"next_option_{option['id']}_{i}",
+                        on_click=_enqueue,
+                        args=(TakeAction(option["id"]),),
+                    )
         else:
             # Default continuing options
             st.subheader("🎯 ตัวเลือกถัดไป:")
             col1, col2, col3 = st.columns(3)
 
             with col1:
-                if st.button("🔍 สำรวจต่อไป", key="continue_explore"):
-                    st.session_state.action_taken = "explore"
+                st.button(
+                    "🔍 สำรวจต่อไป",
+                    key="continue_explore",
+                    on_click=_enqueue,
+                    args=(TakeAction("explore"),),
+                )
 
             with col2:
-                if st.button("💬 คุยกับคนอื่น", key="continue_talk"):
-                    st.session_state.action_taken = "talk"
+                st.button(
+                    "💬 คุยกับคนอื่น",
+                    key="continue_talk",
+                    on_click=_enqueue,
+                    args=(TakeAction("talk"),),
+                )
 
             with col3:
-                if st.button("🧘 ทำสมาธิ", key="continue_meditate"):
-                    st.session_state.action_taken = "meditate"
+                st.button(
+                    "🧘 ทำสมาธิ",
+                    key="continue_meditate",
+                    on_click=_enqueue,
+                    args=(TakeAction("meditate"),),
+                )
 
-    def _render_loop_reset_scene(self, state: GameState):
+    def _render_loop_reset_scene(self, state: GameState, summary: Dict[str, Any]):
         """Render the time loop reset scene with detailed summary"""
         st.markdown(
             f"""
@@ -716,111 +865,40 @@ class UIManager:
         )
 
         # Show detailed reset summary
-        self._show_reset_summary(state)
+        self._show_reset_summary(summary)
 
         # Continue options
         st.subheader("🎯 เริ่มต้นใหม่:")
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            if st.button("🔍 สำรวจด้วยความระมัดระวัง", key="cautious_explore"):
-                st.session_state.action_taken = "explore"
+            st.button(
+                "🔍 สำรวจด้วยความระมัดระวัง",
+                key="cautious_explore",
+                on_click=_enqueue,
+                args=(TakeAction("explore"),),
+            )
 
         with col2:
-            if st.button("💭 ใช้ความทรงจำจากอดีต", key="memory_action"):
-                st.session_state.action_taken = "use_memory"
+            st.button(
+                "💭 ใช้ความทรงจำจากอดีต",
+                key="memory_action",
+                on_click=_enqueue,
+                args=(TakeAction("use_memory"),),
+            )
 
         with col3:
-            if st.button("🧘 ทำสมาธิเพื่อเตรียมพร้อม", key="prepare_meditate"):
-                st.session_state.action_taken = "meditate"
+            st.button(
+                "🧘 ทำสมาธิเพื่อเตรียมพร้อม",
+                key="prepare_meditate",
+                on_click=_enqueue,
+                args=(TakeAction("meditate"),),
+            )
 
-    def _show_reset_summary(self, state: GameState):
+    def _show_reset_summary(self, summary: Dict[str, Any]):
         """Show comprehensive summary as flowing narrative"""
         st.subheader("📜 บทสรุปวัฏจักรที่ผ่านมา")
-
-        # Create narrative summary instead of data tables
-        karma = state.player.stats.karma
-        decisions_count = len(state.decisions_made)
-        days_used = state.current_day if state.current_day <= 7 else 7
-
-        # Build narrative summary
-        summary_parts = []
-
-        # Opening
-        summary_parts.append(
-            f"ในวัฏจักรที่ผ่านไป คุณได้ใช้เวลา {days_used} วัน และตัดสินใจสำคัญไป {decisions_count} ครั้ง"
-        )
-
-        # Karma assessment with narrative
-        if karma > 15:
-            summary_parts.append(
-                "การกระทำของคุณได้สร้างกรรมดีอย่างล้นเหลือ ดวงวิญญาณของคุณเปล่งประกายด้วยความบริสุทธิ์"
-            )
-        elif karma > 10:
-            summary_parts.append("คุณได้สร้างกรรมดีไว้มากมาย ผู้คนจะจดจำความเมตตาของคุณ")
-        elif karma > 0:
-            summary_parts.append("คุณมีกรรมดีเล็กน้อย แต่ยังมีที่ให้ปรับปรุง")
-        elif karma == 0:
-            summary_parts.append("คุณรักษาสมดุลระหว่างดีและชั่วไว้ได้ ทางกลางคือภูมิปัญญา")
-        elif karma > -10:
-            summary_parts.append("คุณมีกรรมลบเล็กน้อย แต่ยังมีโอกาสแก้ไข")
-        else:
-            summary_parts.append("การกระทำของคุณได้สร้างกรรมลบไว้มาก เงาของความผิดติดตามคุณไป")
-
-        # Time fragments and wisdom
-        if state.time_fragments > 5:
-            summary_parts.append(
-                f"คุณรวบรวมเศษเวลาได้ {state.time_fragments} ชิ้น ซึ่งแสดงถึงความเข้าใจในธรรมชาติของเวลา"
-            )
-
-        if state.player.stats.wisdom > 20:
-            summary_parts.append("ปัญญาของคุณได้เติบโตจนกลายเป็นปราชญ์ผู้ยิ่งใหญ่")
-        elif state.player.stats.wisdom > 15:
-            summary_parts.append("ปัญญาของคุณเติบโตขึ้นอย่างน่าประทับใจ")
-
-        # Quests
-        if state.active_quests:
-            if len(state.active_quests) == 1:
-                summary_parts.append(
-                    f"คุณยังคงมีภารกิจ '{state.active_quests[0]}' ที่ต้องดำเนินการต่อ"
-                )
-            else:
-                summary_parts.append(
-                    f"คุณมีภารกิจ {len(state.active_quests)} อย่างที่รอการดำเนินการ"
-                )
-
-        # Future prediction
-        if karma > 5:
-            summary_parts.append(
-                "\n\nในวัฏจักรหน้า ผู้คนจะต้อนรับคุณด้วยรอยยิ้ม และเปิดใจให้ความช่วยเหลือ กรรมดีที่คุณสั่งสมจะเป็นแสงนำทางในความมืด"
-            )
-        elif karma < -5:
-            summary_parts.append(
-                "\n\nในวัฏจักรหน้า ผู้คนจะหลีกเลี่ยงสายตาคุณ ความไม่ไว้วางใจจะเป็นเงาที่ตามติด แต่ยังมีโอกาสที่จะแก้ไขกรรมลบ"
-            )
-        else:
-            summary_parts.append(
-                "\n\nในวัฏจักรหน้า ทุกอย่างยังเป็นไปได้ ชะตากรรมยังไม่ถูกกำหนด และคุณยังมีอำนาจที่จะเปลี่ยนแปลงอนาคต"
-            )
-
-        # Display as flowing narrative
-        complete_summary = " ".join(summary_parts)
-
-        with st.container():
-            st.markdown(f"*{complete_summary}*")
-
-        # Simple stats for reference
-        with st.expander("📊 ดูรายละเอียดเพิ่มเติม"):
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                st.metric("การตัดสินใจ", decisions_count)
-                st.metric("วันที่ใช้", days_used)
-            with col2:
-                st.metric("กรรม", karma)
-                st.metric("ปัญญา", state.player.stats.wisdom)
-            with col3:
-                st.metric("เศษเวลา", state.time_fragments)
-                st.metric("ภารกิจ", len(state.active_quests))
+        self._render_cycle_summary(summary)
 
     def handle_user_input(self, game_engine: GameEngine):
         """Handle user input and actions - moved to main.py to avoid calling from render"""
@@ -0,0 +1,224 @@
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from dataclasses import astuple, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+# USD per million (prompt, completion) tokens, matched by model name prefix
+MODEL_PRICES: Dict[str, Tuple[float, float]] = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "local-stub": (0.0, 0.0),
+}
+
+# Columns usage can be grouped by
+DIMENSIONS = ("session_id", "call_type", "location", "loop", "model")
+
+# Dimensions with a new value per session or loop
+UNBOUNDED_DIMENSIONS = ("session_id", "loop")
+
+
+@dataclass(frozen=True)
+class UsageRecord:
+    """One LLM completion"""
+
+    session_id: str
+    call_type: str  # decision, time_travel, loop_reset, dialogue or variants
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    latency: float  # seconds
+    cost: float  # USD
+    loop: Optional[int] = None
+    location: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+
+
+@dataclass
+class UsageTotals:
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    latency: float = 0.0
+    cost: float = 0.0
+
+    def add(self, record: UsageRecord):
+        self.calls += 1
+        self.prompt_tokens += record.prompt_tokens
+        self.completion_tokens += record.completion_tokens
+        self.latency += record.latency
+        self.cost += record.cost
+
+
+def price_of(model: str, prompt_tokens: int, completion_tokens: int) -> float:
+    """USD cost of a completion; models without a known price cost 0"""
+    for prefix in sorted(MODEL_PRICES, key=len, reverse=True):
+        if model.startswith(prefix):
+            prompt_price, completion_price = MODEL_PRICES[prefix]
+            return (
+                prompt_tokens * prompt_price + completion_tokens * completion_price
+            ) / 1_000_000
+    return 0.0
+
+
+class UsageLedger:
+    """LLM token usage, latency and cost per completion.
+
+    Every record is added to in-memory totals per dimension value (e.g.
+    per session, per call type) and queued for the SQLite store at
+    `path`. The queue is written in one transaction once it holds
+    `batch_size` records, every `flush_interval` seconds from a
+    background thread, and at exit. With a store, totals per session and
+    per loop (which grow without end) are left to it; without one, each
+    of those keeps its `max_values` biggest spenders.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        batch_size: int = 50,
+        flush_interval: float = 10.0,
+        max_values: int = 10000,
+    ):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_values = max_values
+        # dimension -> value -> totals
+        self.totals: Dict[str, Dict[Any, UsageTotals]] = {
+            dimension: {}
+            for dimension in DIMENSIONS
+            if not (path and dimension in UNBOUNDED_DIMENSIONS)
+        }
+        self._pending: List[UsageRecord] = []
+        self._lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        self._closed = threading.Event()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS usage ("
+                "session_id TEXT, call_type TEXT, model TEXT, "
+                "prompt_tokens INTEGER, completion_tokens INTEGER, "
+                "latency REAL, cost REAL, loop INTEGER, location TEXT, "
+                "created_at REAL)"
+            )
+            self._conn.commit()
+            threading.Thread(
+                target=self._flush_periodically, name="usage-flush", daemon=True
+            ).start()
+
+    def record(self, record: UsageRecord):
+        with self._lock:
+            for dimension, by_value in self.totals.items():
+                value = getattr(record, dimension)
+                by_value.setdefault(value, UsageTotals()).add(record)
+                if len(by_value) > self.max_values:
+                    self._prune(by_value)
+            if self._conn is None:
+                return
+            self._pending.append(record)
+            due = len(self._pending) >= self.batch_size
+        if due:
+            self.flush()
+
+    def _prune(self, by_value: Dict[Any, UsageTotals]):
+        # Called with the lock held; keeps the bigger half of the spenders
+        ranked = sorted(by_value.items(), key=lambda item: item[1].cost, reverse=True)
+        by_value.clear()
+        by_value.update(ranked[: self.max_values // 2])
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Stop the background flushes and write what is queued"""
+        self._closed.set()
+        self.flush()
+
+    def flush(self):
+        """Write queued records to the store"""
+        with self._lock:
+            batch, self._pending = self._pending, []
+        if not batch or self._conn is None:
+            return
+        try:
+            with self._db_lock, self._conn:
+                self._conn.executemany(
+                    "INSERT INTO usage VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [astuple(record) for record in batch],
+                )
+        except sqlite3.Error as e:
+            print(f"Error writing LLM usage: {e}")
+
+    def top_spenders(
+        self, by: str = "session_id", limit: int = 10, since: Optional[float] = None
+    ) -> List[Dict[str, Any]]:
+        """Biggest spenders by cost, grouped by one dimension.
+
+        Reads the store (all workers, all time, or records newer than the
+        `since` timestamp) when there is one, else this process's totals.
+        """
+        if by not in DIMENSIONS:
+            raise ValueError(f"by must be one of {DIMENSIONS}")
+        if self._conn is None:
+            with self._lock:
+                rows = [
+                    {by: value, **vars(totals)}
+                    for value, totals in self.totals[by].items()
+                ]
+            rows.sort(
+                key=lambda row: (
+                    row["cost"],
+                    row["prompt_tokens"] + row["completion_tokens"],
+                ),
+                reverse=True,
+            )
+            return rows[:limit]
+
+        self.flush()
+        with self._db_lock:
+            cursor = self._conn.execute(
+                f"SELECT {by}, COUNT(*), SUM(prompt_tokens), "
+                "SUM(completion_tokens), SUM(latency), SUM(cost) FROM usage "
+                f"WHERE created_at >= ? GROUP BY {by} "
+                "ORDER BY SUM(cost) DESC, SUM(prompt_tokens + completion_tokens) DESC "
+                "LIMIT ?",
+                (since or 0.0, limit),
+            )
+            rows = cursor.fetchall()
+        return [
+            {
+                by: value,
+                "calls": calls,
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "latency": latency,
+                "cost": cost,
+            }
+            for value, calls, prompt_tokens, completion_tokens, latency, cost in rows
+        ]
+
+
+_ledger: Optional[UsageLedger] = None
+_ledger_lock = threading.Lock()
+
+
+def get_usage_ledger() -> UsageLedger:
+    """Return the process-wide ledger, stored in NAKARA_USAGE_DB if set"""
+    global _ledger
+    if _ledger is not None:
+        return _ledger
+    with _ledger_lock:
+        if _ledger is None:
+            _ledger = UsageLedger(
+                path=os.getenv("NAKARA_USAGE_DB"),
+                batch_size=int(os.getenv("NAKARA_USAGE_BATCH", "50")),
+            )
+            atexit.register(_ledger.close)
+        return _ledger
@@ -0,0 +1,187 @@
+import copy
+import json
+import os
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .time_system import TimeEra
+
+# (location, era, action, karma band)
+PoolKey = Tuple[str, str, str, str]
+
+ARTIFACT_VERSION = 1
+
+KARMA_BANDS = ("negative", "neutral", "positive")
+
+
+def karma_band(karma: int) -> str:
+    """Bucket karma the same way the fallback narratives do"""
+    if karma > 10:
+        return "positive"
+    elif karma < -10:
+        return "negative"
+    return "neutral"
+
+
+def make_pool_key(location: str, era: TimeEra, action: str, karma: int) -> PoolKey:
+    return (location, era.value, action, karma_band(karma))
+
+
+class VariantPool:
+    """Pre-generated narrative variants served without waiting on the LLM.
+
+    Each (location, era, action, karma band) key holds several complete
+    decision results, at most `max_per_key`. Players draw variants at
+    random without repeats, and a background refill is scheduled when a
+    player is running out of unseen variants for a key that still has room.
+    A player who has seen a full key gets misses (and the fallbacks).
+    """
+
+    def __init__(
+        self,
+        generator: Optional[Callable[[PoolKey], List[Dict[str, Any]]]] = None,
+        low_water: int = 2,
+        max_per_key: int = 64,
+        max_workers: int = 2,
+        seed: Optional[int] = None,
+    ):
+        self.generator = generator
+        self.low_water = low_water
+        self.max_per_key = max_per_key
+        self.variants: Dict[PoolKey, List[Dict[str, Any]]] = {}
+        self.refillable: Set[Tuple[str, str]] = set()  # (location, action)
+
+        # player id -> key -> indices of the variants they have drawn
+        self._seen: Dict[str, Dict[PoolKey, Set[int]]] = {}
+        self._inflight: Set[PoolKey] = set()
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="variant-refill"
+        )
+        self.stats = {"hits": 0, "misses": 0, "refills": 0, "refill_errors": 0}
+
+    def set_generator(self, generator: Callable[[PoolKey], List[Dict[str, Any]]]):
+        """Install the background generator if none is set yet"""
+        with self._lock:
+            if self.generator is None:
+                self.generator = generator
+
+    def register_actions(self, location: str, actions: Iterable[str]):
+        """Allow background refills for these actions at a location"""
+        with self._lock:
+            self.refillable.update((location, action) for action in actions)
+
+    def add_variants(self, key: PoolKey, variants: List[Dict[str, Any]]) -> int:
+        """Add generated variants to a key's pool, up to max_per_key.
+
+        Returns how many were kept.
+        """
+        with self._lock:
+            pool = self.variants.setdefault(key, [])
+            kept = variants[: max(self.max_per_key - len(pool), 0)]
+            pool.extend(kept)
+            return len(kept)
+
+    def draw(self, key: PoolKey, player_id: str) -> Optional[Dict[str, Any]]:
+        """Pick an unseen variant for this player, or None if there is none"""
+        with self._lock:
+            variants = self.variants.get(key, [])
+            seen = self._seen.setdefault(player_id, {}).setdefault(key, set())
+            unseen = [i for i in range(len(variants)) if i not in seen]
+
+            if len(unseen) <= self.low_water:
+                self._schedule_refill(key)
+
+            if not unseen:
+                self.stats["misses"] += 1
+                return None
+
+            index = self._rng.choice(unseen)
+            seen.add(index)
+            self.stats["hits"] += 1
+            variant = variants[index]
+
+        # Callers may append to the narrative, so hand out a private copy
+        return copy.deepcopy(variant)
+
+    def forget_player(self, player_id: str):
+        """Drop the no-repeat history for a player"""
+        with self._lock:
+            self._seen.pop(player_id, None)
+
+    def _schedule_refill(self, key: PoolKey):
+        # Called with the lock held
+        if self.generator is None or key in self._inflight:
+            return
+        if (key[0], key[2]) not in self.refillable:
+            return
+        if len(self.variants.get(key, ())) >= self.max_per_key:
+            return
+        self._inflight.add(key)
+        self._executor.submit(self._refill, key)
+
+    def _refill(self, key: PoolKey):
+        try:
+            variants = self.generator(key)
+            self.add_variants(key, variants)
+            with self._lock:
+                self.stats["refills"] += 1
+        except Exception as e:
+            print(f"Variant pool refill error for {key}: {e}")
+            with self._lock:
+                self.stats["refill_errors"] += 1
+        finally:
+            with self._lock:
+                self._inflight.discard(key)
+
+    def load_artifact(self, path: str) -> int:
+        """Load variants from an offline-generated artifact, return count"""
+        with open(path, "r", encoding="utf-8") as f:
+            artifact = json.load(f)
+
+        if artifact.get("version") != ARTIFACT_VERSION:
+            raise ValueError(f"Unsupported variant artifact version in {path}")
+
+        loaded = 0
+        for entry in artifact.get("entries", []):
+            key_data = entry["key"]
+            key = (
+                key_data["location"],
+                key_data["era"],
+                key_data["action"],
+                key_data["karma_band"],
+            )
+            loaded += self.add_variants(key, entry["variants"])
+        return loaded
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Pool size and hit/miss counters"""
+        with self._lock:
+            return {
+                **self.stats,
+                "keys": len(self.variants),
+                "variants": sum(len(v) for v in self.variants.values()),
+                "refills_in_flight": len(self._inflight),
+            }
+
+
+_pool: Optional[VariantPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_variant_pool() -> VariantPool:
+    """Return the process-wide pool, preloaded from NAKARA_VARIANT_POOL"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = VariantPool()
+            artifact_path = os.getenv("NAKARA_VARIANT_POOL")
+            if artifact_path and os.path.exists(artifact_path):
+                try:
+                    _pool.load_artifact(artifact_path)
+                except Exception as e:
+                    print(f"Error loading variant pool: {e}")
+        return _pool
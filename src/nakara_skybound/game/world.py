@@ -2,6 +2,7 @@ from dataclasses import dataclass, field
 from typing import Any, Dict, List
 
 from .character import NPC
+from .relations import RelationStore
 from .time_system import TimeEra
 
 
@@ -21,6 +22,8 @@ class World:
     def __init__(self):
         self.locations: Dict[str, Location] = {}
         self.npcs: Dict[str, NPC] = {}
+        # Every NPC's relationship and trust; NPC.memory views a cell of it
+        self.relations = RelationStore()
         self.current_era = TimeEra.PRESENT
 
     def initialize_locations(self):
@@ -138,6 +141,7 @@ class World:
             name="ปราชญ์เทวัญ",
             role="นักปราชญ์ผู้รู้เรื่องเวลา",
             location="central_plaza",
+            relations=self.relations,
         )
         self.npcs["sage_thewan"].personality_traits = ["wise", "mysterious", "helpful"]
         self.npcs["sage_thewan"].available_quests = [
@@ -152,6 +156,7 @@ class World:
             name="พ่อค้านิรันดร์",
             role="พ่อค้าของแปลก",
             location="central_plaza",
+            relations=self.relations,
         )
         self.npcs["merchant_niran"].personality_traits = [
             "greedy",
@@ -166,6 +171,7 @@ class World:
             name="พระสมเด็จ",
             role="พระอาจารย์ผู้สอนเวทมนตร์",
             location="temple",
+            relations=self.relations,
         )
         self.npcs["monk_somdej"].personality_traits = [
             "compassionate",
@@ -184,6 +190,7 @@ class World:
             name="บรรณารักษ์วิชัย",
             role="ผู้รักษาความรู้แห่งกาล",
             location="library",
+            relations=self.relations,
         )
         self.npcs["librarian_wichai"].personality_traits = [
             "knowledgeable",
@@ -207,6 +214,7 @@ class World:
             name="ทหารผู้พิทักษ์",
             role="ผู้คุ้มครองความลับของราชวัง",
             location="palace",
+            relations=self.relations,
         )
         self.npcs["royal_guard"].personality_traits = [
             "loyal",
@@ -223,11 +231,15 @@ class World:
             name="ปราชญ์ราชสำนัก",
             role="นักปราชญ์ผู้รู้ความลับของกาลเวลา",
             location="palace",
+            relations=self.relations,
         )
         self.npcs["court_sage"].personality_traits = ["wise", "secretive", "powerful"]
         self.npcs["court_sage"].available_quests = ["time_mastery", "royal_lineage"]
         self.npcs["court_sage"].special_abilities = ["time_reading", "prophecy"]
 
+        for npc in self.npcs.values():
+            npc.compile_dialogue()
+
     def get_location(self, location_id: str) -> Location:
         """Get location by ID"""
         return self.locations.get(location_id)
@@ -258,8 +270,19 @@ class World:
 
     def update_npc_memories(self, loop_memories: List[Dict[str, Any]]):
         """Update NPC memories with loop information"""
-        for npc in self.npcs.values():
-            npc.update_memory_from_loop(loop_memories)
+        # One bulk update of the relation store instead of a pass per NPC
+        npc_ids, relationship, trust = [], [], []
+        for memory in loop_memories:
+            npc = self.npcs.get(memory.get("npc_id"))
+            if npc is None:
+                continue
+            npc.memory.add_to("player_actions", memory)
+            karma = memory.get("karma_impact", 0)
+            npc_ids.append(npc.id)
+            relationship.append(1 if karma > 0 else -1 if karma < 0 else 0)
+            trust.append(1 if karma > 0 else -2 if karma < 0 else 0)
+        if npc_ids:
+            self.relations.adjust(npc_ids, relationship, trust)
 
     def get_connected_locations(self, location_id: str) -> List[str]:
         """Get locations connected to current location"""
@@ -1,48 +1,81 @@
+import hmac
+import os
+import uuid
+from typing import Optional
+
 import streamlit as st
+from game.commands import (
+    CommandQueue,
+    CreateCharacter,
+    MoveTo,
+    TakeAction,
+    TravelThroughTime,
+    TriggerLoop,
+)
 from game.game_engine import GameEngine
+from game.cluster import get_cluster_worker
+from game.profiling import get_profiler
 from game.save_system import SaveSystem
-from game.time_system import TimeEra
+from game.session_store import check_session_token, get_session_store, session_token
+from game.turn_runner import TurnHandle, get_turn_runner
 from game.ui_manager import UIManager
 
 
-def handle_user_actions(game_engine: GameEngine):
-    """Handle all user actions in one place to avoid infinite loops"""
+# Turns that finish this quickly (e.g. a pooled narrative) are shown in
+# the same run; slower ones get a placeholder that polls for the result
+INLINE_WAIT_SECONDS = 0.2
+POLL_SECONDS = 0.5
 
-    # Handle location change with optional day advancement
-    if hasattr(st.session_state, "new_location"):
-        state = game_engine.get_current_state()
-        old_location = state.current_location
-        state.current_location = st.session_state.new_location
-
-        # Check if fast travel was used (advances day)
-        if hasattr(st.session_state, "advance_day") and st.session_state.advance_day:
-            state.current_day += 1
-            st.success(
-                f"คุณได้เดินทางอย่างรวดเร็วจาก {old_location} ไปยัง {state.current_location} (ใช้เวลา 1 วัน)"
-            )
-            del st.session_state.advance_day
+
+def handle_user_actions(session_id: str, game_engine: GameEngine):
+    """Start queued commands as a background turn; show finished turns"""
+    runner = get_turn_runner()
+    commands = st.session_state.commands.drain()
+    if commands:
+        handle = runner.submit(session_id, commands)
+        if handle.commands is not commands:
+            # A turn is still running; ignore the click rather than queue it
+            st.toast("⏳ รอให้เหตุการณ์ก่อนหน้าจบก่อน")
         else:
-            st.success(f"คุณได้เดินทางจาก {old_location} ไปยัง {state.current_location}")
+            handle.wait(INLINE_WAIT_SECONDS)
+
+    handle = runner.collect(session_id)
+    if handle is not None:
+        show_turn_results(handle, game_engine)
 
-        # Reset scene to standard
-        state.current_scene = "standard"
 
-        # Clear action result
-        if hasattr(st.session_state, "last_action_result"):
-            del st.session_state.last_action_result
+def show_turn_results(handle: TurnHandle, game_engine: GameEngine):
+    """Show what a finished turn did and keep its result for the scene"""
+    try:
+        outcomes = handle.outcomes()
+    except Exception as e:
+        st.error(f"เกิดข้อผิดพลาด: {e}")
+        return
 
-        del st.session_state.new_location
-        st.rerun()
+    for outcome in outcomes:
+        command, result = outcome.command, outcome.result
+        state = game_engine.get_current_state()
 
-    # Handle loop trigger with story summary
-    if hasattr(st.session_state, "trigger_loop"):
-        result = game_engine.trigger_time_loop()
-        if result["success"]:
+        if isinstance(command, CreateCharacter):
+            st.session_state.character_created = True
+
+        elif isinstance(command, MoveTo):
+            if command.advance_day:
+                st.success(
+                    f"คุณได้เดินทางอย่างรวดเร็วจาก {result['old_location']} ไปยัง {state.current_location} (ใช้เวลา 1 วัน)"
+                )
+            else:
+                st.success(
+                    f"คุณได้เดินทางจาก {result['old_location']} ไปยัง {state.current_location}"
+                )
+            st.session_state.pop("last_action_result", None)
+
+        elif isinstance(command, TriggerLoop):
             st.success(f"วัฏจักรเวลารีเซ็ตแล้ว! รอบที่ {result['loop_count']}")
             st.info(result["narrative"])
 
             # Store loop result with cycle summary
-            cycle_summary = f"รอบที่ {result['loop_count'] - 1} สิ้นสุดแล้ว - กรรมสุดท้าย: {game_engine.get_current_state().player.stats.karma}, การตัดสินใจ: {len(game_engine.get_current_state().decisions_made)} ครั้ง"
+            cycle_summary = f"รอบที่ {result['loop_count'] - 1} สิ้นสุดแล้ว - กรรมสุดท้าย: {state.player.stats.karma}, การตัดสินใจ: {len(state.decisions_made)} ครั้ง"
 
             st.session_state.last_action_result = {
                 "narrative": result["narrative"] + f"\n\n📊 {cycle_summary}",
@@ -53,75 +86,27 @@ def handle_user_actions(game_engine: GameEngine):
                 ],
             }
 
-            # Change scene
-            state = game_engine.get_current_state()
-            state.current_scene = "action_result"
-
-        del st.session_state.trigger_loop
-
-    # Handle action taken with enhanced consequence processing
-    if hasattr(st.session_state, "action_taken"):
-        action = st.session_state.action_taken
-
-        # Process the action
-        result = game_engine.make_decision("general_action", action)
-
-        # Store the result for display
-        st.session_state.last_action_result = result
-
-        # Change scene to show action result
-        state = game_engine.get_current_state()
-        state.current_scene = "action_result"
-
-        # Apply all consequences including day advancement
-        if "consequences" in result:
-            for consequence in result["consequences"]:
-                if consequence["type"] == "stat_change":
-                    state.player.modify_stat(consequence["stat"], consequence["value"])
-                elif consequence["type"] == "time_fragment":
-                    state.time_fragments += consequence["amount"]
-                elif consequence["type"] == "day_advance":
-                    state.current_day += consequence["amount"]
-                    # Check if 7 days completed
-                    if state.current_day >= 7:
-                        st.warning("⚠️ วัฏจักรเวลาครบ 7 วัน! เตรียมพร้อมสำหรับการสรุป...")
-                elif consequence["type"] == "item_gain":
-                    from game.character import Item
-
-                    item_data = consequence["item"]
-                    # Create proper Item object
-                    item = Item(
-                        id=item_data["id"],
-                        name=item_data["name"],
-                        description=item_data["description"],
-                        type=item_data["type"],
-                        power=item_data.get("power", 0),
-                        magical_properties=item_data.get("magical_properties", {}),
-                    )
-                    state.player.add_item(item)
-                elif consequence["type"] == "quest_start":
-                    quest_name = consequence.get("quest_name", "ภารกิจใหม่")
-                    if quest_name not in state.active_quests:
-                        state.active_quests.append(quest_name)
-
-        # Clear the action
-        del st.session_state.action_taken
-        st.rerun()  # Force immediate update
-
-    # Handle pending time travel
-    if hasattr(st.session_state, "pending_time_travel"):
-        target_era = st.session_state.pending_time_travel
-        result = game_engine.travel_through_time(target_era)
-
-        if result["success"]:
-            st.success(f"เดินทางสู่{target_era.value}สำเร็จ!")
+        elif isinstance(command, TakeAction):
+            # Consequences were already applied by the engine
+            st.session_state.last_action_result = result
+            if state.current_day >= 7 and any(
+                consequence["type"] == "day_advance"
+                for consequence in result.get("consequences", [])
+            ):
+                st.warning("⚠️ วัฏจักรเวลาครบ 7 วัน! เตรียมพร้อมสำหรับการสรุป...")
+
+        elif isinstance(command, TravelThroughTime):
+            if not outcome.success:
+                st.error(result["message"])
+                continue
+            st.success(f"เดินทางสู่{command.era.value}สำเร็จ!")
             if "narrative" in result:
                 st.info(result["narrative"])
 
             # Store travel result
             st.session_state.last_action_result = {
                 "narrative": result.get("narrative", ""),
-                "consequences": [{"type": "era_change", "new_era": target_era.value}],
+                "consequences": [{"type": "era_change", "new_era": command.era.value}],
                 "next_options": [
                     {"id": "explore", "text": "สำรวจยุคใหม่"},
                     {"id": "meditate", "text": "ทำความเข้าใจกับสิ่งรอบตัว"},
@@ -129,13 +114,55 @@ def handle_user_actions(game_engine: GameEngine):
                 ],
             }
 
-            # Change scene
-            state = game_engine.get_current_state()
-            state.current_scene = "action_result"
-        else:
-            st.error(result["message"])
 
-        del st.session_state.pending_time_travel
+def requested_session() -> Optional[str]:
+    """Session id from the link, if its token (or the admin token) checks out.
+
+    An id alone is not enough, so a shared link cannot take a game over.
+    """
+    session_id = st.query_params.get("session")
+    if not session_id:
+        return None
+    if check_session_token(session_id, st.query_params.get("token")):
+        return session_id
+    admin_token = os.getenv("NAKARA_ADMIN_TOKEN")
+    if admin_token and hmac.compare_digest(
+        st.query_params.get("admin", ""), admin_token
+    ):
+        return session_id
+    return None
+
+
+def arm_profiler(session_id: str):
+    """Admin flag that profiles a session's next turns (game/profiling.py).
+
+    Open ?session=<id>&profile=<turns>&admin=<NAKARA_ADMIN_TOKEN>.
+    """
+    token = os.getenv("NAKARA_ADMIN_TOKEN")
+    turns = st.query_params.get("profile")
+    if not (
+        token
+        and turns
+        and hmac.compare_digest(st.query_params.get("admin", ""), token)
+    ):
+        return
+    del st.query_params["profile"]
+    del st.query_params["admin"]
+    try:
+        get_profiler().arm(session_id, int(turns))
+    except ValueError:
+        st.error("profile ต้องเป็นจำนวนเทิร์น")
+        return
+    st.toast(f"🔬 กำลังโปรไฟล์ {turns} เทิร์นถัดไป")
+
+
+@st.fragment(run_every=POLL_SECONDS)
+def await_turn(session_id: str):
+    """Placeholder shown while a turn runs; reruns the app once it is done"""
+    handle = get_turn_runner().pending(session_id)
+    if handle is None or handle.done():
+        st.rerun(scope="app")
+    st.info(f"⏳ เรื่องราวกำลังดำเนินไป... ({handle.elapsed():.0f} วินาที)")
 
 
 def main():
@@ -147,10 +174,26 @@ def main():
     )
 
     # Initialize game systems
-    if "game_engine" not in st.session_state:
-        st.session_state.game_engine = GameEngine()
+    if "session_id" not in st.session_state:
+        # Session id lets the shared LLM scheduler keep players fair, and
+        # keys the engine in the session store (which may hibernate it)
+        st.session_state.session_id = requested_session() or uuid.uuid4().hex
         st.session_state.ui_manager = UIManager()
         st.session_state.save_system = SaveSystem()
+        st.session_state.commands = CommandQueue()
+
+    # With several workers, each session is served by the one that owns it
+    cluster_worker = get_cluster_worker()
+    if cluster_worker:
+        session_id = st.session_state.session_id
+        token = session_token(session_id)
+        st.query_params["session"] = session_id
+        st.query_params["token"] = token
+        if not cluster_worker.is_owner(session_id):
+            _, address = cluster_worker.owner(session_id)
+            st.info("เกมของคุณอยู่บนเซิร์ฟเวอร์อื่น")
+            st.link_button("ไปต่อ", f"{address}/?session={session_id}&token={token}")
+            st.stop()
 
     # Game header with clean description
     st.markdown(
@@ -163,14 +206,23 @@ def main():
     )
 
     # Main game loop
-    game_engine = st.session_state.game_engine
     ui_manager = st.session_state.ui_manager
 
-    # Handle user actions first
-    handle_user_actions(game_engine)
-
-    # Render current game state
-    ui_manager.render_game_state(game_engine.get_current_state())
+    session_id = st.session_state.session_id
+    arm_profiler(session_id)
+    with get_session_store().session(session_id) as game_engine:
+        # Handle user actions first
+        with get_profiler().capture(session_id, "handle_user_actions"):
+            handle_user_actions(session_id, game_engine)
+        if get_turn_runner().pending(session_id):
+            # The turn owns the engine until it finishes; show only the
+            # placeholder, which reruns the app once the turn is done
+            await_turn(session_id)
+            return
+
+        # Render current game state; widgets inside a part rerun only that part
+        with get_session_store().lock(session_id):
+            ui_manager.render_game_state(session_id, game_engine)
 
 
 if __name__ == "__main__":
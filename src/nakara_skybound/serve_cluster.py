@@ -0,0 +1,84 @@
+"""Run several Streamlit workers that share one session database.
+
+Each worker is a separate process (so a separate GIL) on its own port.
+Sessions are assigned to workers by consistent hashing; a player who
+lands on the wrong worker is sent to the owner with ?session=<id>&token=..., and a
+dead worker's sessions are picked up by the others from the database.
+
+    python -m nakara_skybound.serve_cluster --workers 4 --base-port 8501
+"""
+
+import argparse
+import os
+import secrets
+import subprocess
+import sys
+import time
+from typing import List, Optional
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+def start_worker(index: int, args: argparse.Namespace, secret: str) -> subprocess.Popen:
+    port = args.base_port + index
+    env = {
+        **os.environ,
+        # Every worker must accept the session tokens the others hand out
+        "NAKARA_SESSION_SECRET": secret,
+        "NAKARA_WORKER_ID": f"worker-{index}",
+        "NAKARA_WORKER_ADDRESS": f"http://{args.host}:{port}",
+        "NAKARA_SESSION_DB": os.path.abspath(args.db),
+    }
+    command = [
+        sys.executable,
+        "-m",
+        "streamlit",
+        "run",
+        APP_PATH,
+        "--server.port",
+        str(port),
+        "--server.headless",
+        "true",
+    ]
+    print(f"worker-{index}: http://{args.host}:{port}")
+    return subprocess.Popen(command, env=env, cwd=os.path.dirname(APP_PATH))
+
+
+def run(args: argparse.Namespace) -> int:
+    secret = os.getenv("NAKARA_SESSION_SECRET") or secrets.token_hex(32)
+    workers = [start_worker(i, args, secret) for i in range(args.workers)]
+    try:
+        while True:
+            time.sleep(1)
+            for index, worker in enumerate(workers):
+                if worker.poll() is None:
+                    continue
+                print(
+                    f"worker-{index} exited with {worker.returncode}", file=sys.stderr
+                )
+                if args.restart:
+                    workers[index] = start_worker(index, args, secret)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for worker in workers:
+            worker.terminate()
+        for worker in workers:
+            worker.wait()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--base-port", type=int, default=8501)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--db", default="sessions.db", help="shared session database")
+    parser.add_argument(
+        "--restart", action="store_true", help="restart workers that exit"
+    )
+    return run(parser.parse_args(argv))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+import pytest
+
+from nakara_skybound.game.event_log import EventLog, EventType
+from nakara_skybound.game.game_engine import GameEngine, GameState
+
+
+def summary(state):
+    return {
+        "name": state.player.name,
+        "stats": state.player.stats.as_dict(),
+        "world": dict(state.world_state.items()),
+        "quests": list(state.active_quests),
+        "day": state.current_day,
+        "location": state.current_location,
+        "fragments": state.time_fragments,
+        "decisions": [d["choice"] for d in state.decisions_made],
+    }
+
+
+def play(log, state, turns, start=0):
+    for turn in range(start, start + turns):
+        log.record(state, EventType.STAT_CHANGED, stat="wisdom", value=1)
+        log.record(state, EventType.WORLD_CHANGED, key=f"k{turn % 7}", value=turn)
+        log.record(state, EventType.DECISION_RECORDED, choice=f"c{turn}", era="present")
+        if turn % 3 == 0:
+            log.record(
+                state, EventType.QUEST_UPDATED, quest_id=f"q{turn}", status="started"
+            )
+        if turn % 4 == 0:
+            log.record(state, EventType.DAY_ADVANCED, amount=1)
+
+
+@pytest.fixture
+def event_dir(tmp_path, monkeypatch):
+    monkeypatch.setenv("NAKARA_EVENT_LOG_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_replay_equals_live_state(tmp_path):
+    state = GameState()
+    log = EventLog(state, snapshot_every=5, path=str(tmp_path / "s.jsonl"))
+    play(log, state, 40)
+    log.close()
+
+    replayed, replayed_state = EventLog.from_file(
+        str(tmp_path / "s.jsonl"), GameState()
+    )
+    assert replayed.seq == log.seq
+    assert summary(replayed_state) == summary(state)
+    assert summary(log.state_at(log.seq)) == summary(state)
+
+
+def test_state_at_matches_live_states_across_base_seq():
+    state = GameState()
+    log = EventLog(state, snapshot_every=5, max_snapshots=3)
+    live = {}
+    for turn in range(30):
+        play(log, state, 1, start=turn)
+        live[log.seq] = summary(state)
+
+    assert log.base_seq > 0
+    for seq in range(log.base_seq, log.seq + 1):
+        if seq in live:
+            assert summary(log.state_at(seq)) == live[seq]
+    with pytest.raises(ValueError):
+        log.state_at(log.base_seq - 1)
+
+
+def test_rewind_across_base_seq_then_continue():
+    state = GameState()
+    log = EventLog(state, snapshot_every=5, max_snapshots=3)
+    live = {}
+    for turn in range(14):
+        play(log, state, 1, start=turn)
+        live[log.seq] = summary(state)
+    assert log.base_seq > 0
+    with pytest.raises(ValueError):
+        log.state_at(log.base_seq - 1)
+
+    # The oldest turn still in reach, older than every snapshot but the first
+    seq = min(s for s in live if s >= log.base_seq)
+    state = log.state_at(seq)
+    log.truncate(seq)
+    assert log.seq == seq
+    assert summary(state) == live[seq]
+
+    play(log, state, 3, start=99)
+    assert summary(log.state_at(log.seq)) == summary(state)
+    assert summary(log.state_at(seq)) == live[seq]
+
+
+def test_truncate_then_recover(event_dir):
+    engine = GameEngine("truncated")
+    play(engine.events, engine.state, 10)
+    seq, expected = engine.events.seq, summary(engine.state)
+    play(engine.events, engine.state, 5, start=10)
+    engine.rewind_to(seq)
+    engine.events.close()
+
+    recovered = GameEngine.recover("truncated")
+    assert recovered.events.seq == seq
+    assert summary(recovered.state) == expected
+
+
+def test_load_state_then_recover(event_dir):
+    saved = GameState()
+    saved.player.name = "x"
+    saved.decisions_made.extend({"choice": f"old{i}"} for i in range(3))
+    expected_base = summary(saved)
+    engine = GameEngine("loaded")
+    play(engine.events, engine.state, 5)
+    engine.load_state(saved)
+    play(engine.events, engine.state, 1, start=50)
+    engine.events.close()
+
+    recovered = GameEngine.recover("loaded")
+    assert recovered.state.player.name == "x"
+    assert len(recovered.state.decisions_made) == 4
+    assert summary(recovered.state) == summary(engine.state)
+
+    # Rewinding to the load point keeps the loaded state as the base
+    recovered.rewind_to(0)
+    recovered.events.close()
+    again = GameEngine.recover("loaded")
+    assert again.events.seq == 0
+    assert summary(again.state) == expected_base
+
+
+def test_completed_quests_move_out_of_active_quests():
+    state = GameState()
+    log = EventLog(state)
+    log.record(state, EventType.QUEST_UPDATED, quest_id="q1", status="started")
+    log.record(state, EventType.QUEST_UPDATED, quest_id="q2", status="started")
+    log.record(state, EventType.QUEST_UPDATED, quest_id="q1", status="completed")
+    log.record(state, EventType.QUEST_UPDATED, quest_id="q1", status="completed")
+    assert list(state.active_quests) == ["q2"]
+    assert list(state.completed_quests) == ["q1"]
+    assert list(log.state_at(2).completed_quests) == []
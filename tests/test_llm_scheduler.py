@@ -0,0 +1,111 @@
+import threading
+import time
+
+import pytest
+
+from nakara_skybound.game.llm_scheduler import LLMRateLimited, LLMScheduler, Priority
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def scheduler(clock):
+    # One request per second, and no requests left until the clock moves
+    scheduler = LLMScheduler(requests_per_minute=60, clock=clock)
+    scheduler.request_bucket.consume(60, clock())
+    return scheduler
+
+
+def queue_depth(scheduler):
+    return scheduler.get_metrics()["queue_depth"]
+
+
+def wait_for(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline, "scheduler did not get there"
+        time.sleep(0.001)
+
+
+def run_in_order(scheduler, clock, requests):
+    """Queue `requests` (label, priority, session) one after another, then
+    release one slot per clock second; returns labels in grant order."""
+    granted = []
+
+    def request(label, priority, session_id):
+        ticket = scheduler.acquire(priority, session_id)
+        granted.append((ticket.granted_at, label))
+
+    threads = []
+    for depth, (label, priority, session_id) in enumerate(requests, 1):
+        thread = threading.Thread(target=request, args=(label, priority, session_id))
+        thread.start()
+        threads.append(thread)
+        wait_for(lambda: queue_depth(scheduler) == depth)
+
+    for remaining in range(len(requests) - 1, -1, -1):
+        clock.now += 1
+        with scheduler._cond:
+            scheduler._cond.notify_all()
+        wait_for(lambda: queue_depth(scheduler) == remaining)
+    for thread in threads:
+        thread.join(5)
+    return [label for _, label in sorted(granted)]
+
+
+def test_waiting_requests_are_served_by_priority(scheduler, clock):
+    order = run_in_order(
+        scheduler,
+        clock,
+        [
+            ("pool", Priority.BACKGROUND, "pool"),
+            ("travel", Priority.NARRATIVE, "a"),
+            ("decision", Priority.INTERACTIVE, "b"),
+            ("batch", Priority.BACKGROUND, "batch"),
+            ("loop", Priority.NARRATIVE, "c"),
+        ],
+    )
+    assert order == ["decision", "travel", "loop", "pool", "batch"]
+
+
+def test_sessions_take_turns_within_a_priority(scheduler, clock):
+    order = run_in_order(
+        scheduler,
+        clock,
+        [
+            ("a1", Priority.INTERACTIVE, "a"),
+            ("a2", Priority.INTERACTIVE, "a"),
+            ("a3", Priority.INTERACTIVE, "a"),
+            ("b1", Priority.INTERACTIVE, "b"),
+            ("c1", Priority.INTERACTIVE, "c"),
+            ("b2", Priority.INTERACTIVE, "b"),
+        ],
+    )
+    assert order == ["a1", "b1", "c1", "a2", "b2", "a3"]
+
+
+def test_grants_follow_the_refill_rate(clock):
+    scheduler = LLMScheduler(requests_per_minute=60, clock=clock)
+    for _ in range(60):
+        scheduler.acquire(Priority.INTERACTIVE, "a")
+    with pytest.raises(LLMRateLimited):
+        scheduler.acquire(Priority.INTERACTIVE, "a", timeout=0)
+
+    clock.now += 1
+    ticket = scheduler.acquire(Priority.INTERACTIVE, "a", timeout=0)
+    assert ticket.granted_at == clock.now
+    metrics = scheduler.get_metrics()["priorities"]["interactive"]
+    assert metrics["granted"] == 61
+    assert metrics["rate_limited"] == 1
+    assert metrics["queue_depth"] == 0
@@ -0,0 +1,146 @@
+import random
+
+import pytest
+
+from nakara_skybound.game.persistent import PMap, PVector, pmap, pvector
+
+
+class Key:
+    """Key with a chosen hash, to force HAMT collisions"""
+
+    def __init__(self, name, key_hash):
+        self.name = name
+        self.key_hash = key_hash
+
+    def __hash__(self):
+        return self.key_hash
+
+    def __eq__(self, other):
+        return isinstance(other, Key) and self.name == other.name
+
+    def __repr__(self):
+        return f"Key({self.name!r})"
+
+
+def assert_same_map(persistent, expected):
+    assert len(persistent) == len(expected)
+    assert dict(persistent.items()) == expected
+    assert sorted(map(repr, persistent)) == sorted(map(repr, expected))
+    for key, value in expected.items():
+        assert key in persistent
+        assert persistent[key] == value
+
+
+def test_pmap_matches_dict_under_random_ops():
+    rng = random.Random(7)
+    persistent, expected = pmap(), {}
+    versions = []
+    for _ in range(3000):
+        key = rng.randrange(400)
+        if rng.random() < 0.3:
+            persistent = persistent.delete(key)
+            expected.pop(key, None)
+        else:
+            persistent = persistent.set(key, rng.random())
+            expected[key] = persistent[key]
+        if rng.random() < 0.01:
+            versions.append((persistent, dict(expected)))
+    assert_same_map(persistent, expected)
+    # Older versions are untouched by later changes
+    for version, contents in versions:
+        assert_same_map(version, contents)
+
+
+@pytest.mark.parametrize(
+    "hashes",
+    [
+        [5, 5, 5, 5],  # Full collisions
+        [1, 1 + (1 << 5), 1 + (1 << 10), 1 + (1 << 35)],  # Same low bits
+        [-1, (1 << 64) - 1, 3, 3],  # Equal after masking to 64 bits
+    ],
+)
+def test_pmap_collisions_set_get_delete(hashes):
+    keys = [Key(f"k{i}", key_hash) for i, key_hash in enumerate(hashes)]
+    persistent = pmap({key: i for i, key in enumerate(keys)})
+    expected = {key: i for i, key in enumerate(keys)}
+    assert_same_map(persistent, expected)
+    assert persistent.get(Key("missing", hashes[0])) is None
+
+    updated = persistent.set(keys[1], "new")
+    assert updated[keys[1]] == "new"
+    assert persistent[keys[1]] == 1
+    assert len(updated) == len(keys)
+
+    for key in keys:
+        persistent = persistent.delete(key)
+        del expected[key]
+        assert_same_map(persistent, expected)
+    assert persistent.delete(keys[0]) is persistent
+
+
+def test_pmap_update_and_noop_set():
+    base = pmap({"a": 1})
+    assert base.set("a", 1) is base
+    assert base.update({}) is base
+    merged = base.update([("b", 2), ("a", 3)])
+    assert dict(merged.items()) == {"a": 3, "b": 2}
+    assert dict(base.items()) == {"a": 1}
+    assert isinstance(merged, PMap)
+
+
+@pytest.mark.parametrize(
+    "size", [0, 1, 31, 32, 33, 64, 1023, 1024, 1025, 1056, 1057, 3000]
+)
+def test_pvector_append_and_index_match_list(size):
+    vector, expected = pvector(), []
+    for i in range(size):
+        vector = vector.append(i)
+        expected.append(i)
+    assert len(vector) == size
+    assert list(vector) == expected
+    assert vector == expected
+    assert [vector[i] for i in range(size)] == expected
+    if size:
+        assert vector[-1] == expected[-1]
+    with pytest.raises(IndexError):
+        vector[size]
+
+
+@pytest.mark.parametrize("size", [33, 100, 1025, 1100, 40000])
+def test_pvector_set_past_32_and_1024(size):
+    vector = PVector(range(size))
+    expected = list(range(size))
+    indexes = {0, 31, 32, 33, 1023, 1024, 1025, 32767, 32768}
+    indexes = {i for i in indexes if i < size} | {size // 2, size - 33, size - 1}
+    for index in sorted(indexes):
+        updated = vector.set(index, -index - 1)
+        expected_updated = list(expected)
+        expected_updated[index] = -index - 1
+        assert updated == expected_updated
+        assert vector == expected
+    assert vector.set(-1, "last")[size - 1] == "last"
+    with pytest.raises(IndexError):
+        vector.set(size, 0)
+
+
+@pytest.mark.parametrize("size", [1, 32, 33, 1025])
+def test_pvector_remove_matches_list(size):
+    values = [i % 40 for i in range(size)]
+    vector = pvector(values)
+    for value in (values[0], values[-1], values[size // 2]):
+        expected = list(values)
+        expected.remove(value)
+        removed = vector.remove(value)
+        assert removed == expected
+        assert len(removed) == len(expected)
+        assert removed.append("x") == expected + ["x"]
+        assert vector == values
+    with pytest.raises(ValueError):
+        vector.remove("missing")
+
+
+def test_pvector_slices_and_pvector_passthrough():
+    vector = pvector(range(100))
+    assert vector[10:50:3] == list(range(100))[10:50:3]
+    assert isinstance(vector[:5], PVector)
+    assert pvector(vector) is vector
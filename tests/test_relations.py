@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from nakara_skybound.game.relations import NPCMemoryView, RelationStore
+
+
+@pytest.fixture
+def store():
+    store = RelationStore(players=("p1", "p2"))
+    for npc_id in ("a", "b", "c"):
+        store.add_npc(npc_id)
+    return store
+
+
+def test_adjust_all_npcs_all_players_per_npc_deltas(store):
+    store.adjust(None, relationship=[1, 2, 3], trust=[4, 5, 6], player_id=None)
+    assert store.relationship[:3].tolist() == [[1, 1], [2, 2], [3, 3]]
+    assert store.trust[:3].tolist() == [[4, 4], [5, 5], [6, 6]]
+    assert store.version[:3].tolist() == [[1, 1], [1, 1], [1, 1]]
+
+
+def test_adjust_all_npcs_all_players_two_npcs():
+    store = RelationStore(players=("p1", "p2"))
+    store.add_npc("a")
+    store.add_npc("b")
+    store.adjust(None, relationship=[5, 7], player_id=None)
+    assert store.relationship[:2].tolist() == [[5, 5], [7, 7]]
+
+
+def test_adjust_ids_all_players_repeated_ids_add_up(store):
+    store.adjust(["a", "c", "a"], relationship=[1, 2, 3], trust=1, player_id=None)
+    assert store.relationship[:3].tolist() == [[4, 4], [0, 0], [2, 2]]
+    assert store.trust[:3].tolist() == [[2, 2], [0, 0], [1, 1]]
+    assert store.version[:3].tolist() == [[2, 2], [0, 0], [1, 1]]
+
+
+def test_adjust_one_player(store):
+    store.adjust(None, relationship=[1, 2, 3], player_id="p2")
+    store.adjust(["b"], trust=[-2], player_id="p1")
+    assert store.relationship[:3].tolist() == [[0, 1], [0, 2], [0, 3]]
+    assert store.trust[:3].tolist() == [[0, 0], [-2, 0], [0, 0]]
+
+
+def test_decay_and_select_per_player(store):
+    store.adjust(None, relationship=[4, -1, 0], trust=[3, 5, 1], player_id="p1")
+    store.adjust(["c"], trust=[9], player_id="p2")
+    store.decay(step=2)
+    assert store.relationship[:3, 0].tolist() == [2, 0, 0]
+    assert store.trust[:3, 0].tolist() == [1, 3, 0]
+    assert store.select(min_trust=3, player_id="p1") == ["b"]
+    assert store.select(["a", "c"], min_trust=3, player_id="p2") == ["c"]
+
+
+def test_new_player_column_starts_neutral(store):
+    store.adjust(None, relationship=1, player_id=None)
+    col = store.add_player("p3")
+    assert np.all(store.relationship[:3, col] == 0)
+    assert np.all(store.last_interaction[:3, col] == -1)
+
+
+def test_list_columns_store_nothing_on_read(store):
+    memory = NPCMemoryView(store, 0, 1)
+    assert memory.player_actions == []
+    assert memory.secrets_revealed == []
+    assert store.player_actions == {} and store.secrets_revealed == {}
+
+    memory.add_to("player_actions", {"action": "help"})
+    assert NPCMemoryView(store, 0, 1).player_actions == [{"action": "help"}]
+    assert NPCMemoryView(store, 0, 0).player_actions == []
+    assert list(store.player_actions) == [(0, 1)]
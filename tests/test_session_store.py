@@ -0,0 +1,91 @@
+import threading
+
+import pytest
+
+from nakara_skybound.game.event_log import EventType
+from nakara_skybound.game.session_store import (
+    DirectorySnapshots,
+    SessionStore,
+    decode_snapshot,
+)
+
+
+@pytest.fixture
+def snapshots(tmp_path):
+    return DirectorySnapshots(str(tmp_path / "sessions"))
+
+
+def advance(store, session_id, days=1):
+    with store.session(session_id) as engine, store.lock(session_id):
+        engine.record(EventType.DAY_ADVANCED, amount=days)
+
+
+def test_lru_eviction_hibernates_least_recently_used(snapshots):
+    store = SessionStore(snapshots, max_resident=2)
+    for session_id in ("a", "b", "c"):
+        store.get(session_id)
+    assert store.resident_ids() == ["b", "c"]
+
+    store.get("b")
+    store.get("d")
+    assert store.resident_ids() == ["b", "d"]
+    assert sorted(snapshots.session_ids()) == ["a", "c"]
+    assert store.stats["hibernated"] == 2
+
+
+def test_hibernate_rehydrate_round_trip(snapshots):
+    store = SessionStore(snapshots)
+    advance(store, "a", days=3)
+    before = store.get("a")
+    seq = before.events.seq
+
+    assert store.hibernate("a")
+    assert store.resident_ids() == []
+    after = store.get("a")
+    assert after is not before
+    assert after.state.current_day == 4
+    assert after.events.seq == seq
+    assert store.stats["rehydrated"] == 1
+
+    # Only one hibernated copy
+    assert store.get_stats()["hibernated"] == 0
+
+
+def test_pinned_session_survives_limits_and_is_written_through(snapshots):
+    store = SessionStore(snapshots, max_resident=1, write_through=True)
+    with store.session("a") as engine:
+        with store.lock("a"):
+            engine.record(EventType.DAY_ADVANCED, amount=1)
+        store.get("b")
+        assert not store.hibernate("a")
+        assert "a" in store.resident_ids()
+        assert store.get_stats()["pinned"] == 1
+
+    # Saved on exit, then evicted as the store is over max_resident
+    assert decode_snapshot(snapshots.load("a")).state.current_day == 2
+    assert len(store.resident_ids()) == 1
+    assert store.get("a").state.current_day == 2
+
+
+def test_hibernate_skips_session_whose_lock_is_held(snapshots):
+    store = SessionStore(snapshots)
+    advance(store, "a")
+    locked, done = threading.Event(), threading.Event()
+
+    def hold():
+        with store.lock("a"):
+            locked.set()
+            done.wait(5)
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    try:
+        assert locked.wait(5)
+        assert not store.hibernate("a")
+        assert store.resident_ids() == ["a"]
+        assert snapshots.load("a") is None
+    finally:
+        done.set()
+        holder.join()
+    assert store.hibernate("a")
+    assert snapshots.load("a") is not None